@@ -0,0 +1,176 @@
+"""
+ควบคุมจำนวนงานหนักที่รันพร้อมกันใน process (admission control)
+
+แต่ละประเภทงาน (inference, save) มีจำนวน slot จำกัด งานที่เกิน slot ต่อคิวแบบ FIFO
+session ที่มีหลายรูปขอ slot ทีละรูปและต่อท้ายคิวใหม่ทุกครั้ง จึงสลับกับ session อื่นแบบ round-robin
+ไม่มี session ใดถือ slot ไว้ทั้งชุด เมื่อคิวยาวเกิน max_queue หรือรอนานเกิน max_wait งานจะถูกปฏิเสธทันที
+(AdmissionRejected) แทนที่จะทำให้ทุกคนช้าลงพร้อมกัน
+"""
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class AdmissionRejected(Exception):
+    """
+    คิวเต็มหรือรอนานเกินกำหนด
+    """
+
+
+class AdmissionController:
+    """
+    slot จำนวนจำกัดพร้อมคิว FIFO (ใช้ร่วมกันทุก session ใน process)
+    """
+
+    def __init__(self, name, slots=1, max_queue=32, max_wait=None):
+        self.name = name
+        self.slots = max(1, int(slots))
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._condition = threading.Condition()
+        self._active = 0
+        self._waiting = deque()
+        self._stats = {"admitted": 0, "rejected": 0, "waited": 0, "total_wait": 0.0, "max_wait": 0.0}
+
+    def configure(self, slots, max_queue, max_wait=None):
+        with self._condition:
+            self.slots = max(1, int(slots))
+            self.max_queue = max_queue
+            self.max_wait = max_wait
+            self._condition.notify_all()
+
+    def check(self):
+        """
+        โยน AdmissionRejected ทันทีถ้าคิวเต็ม (ตรวจก่อนเริ่มงานทั้งชุด แทนที่จะถูกปฏิเสธกลางคัน)
+        """
+        with self._condition:
+            if self.max_queue and len(self._waiting) >= self.max_queue:
+                self._stats["rejected"] += 1
+                raise AdmissionRejected(f"คิว {self.name} เต็ม ({len(self._waiting)} งาน)")
+
+    @contextmanager
+    def slot(self, on_wait=None, poll=0.25):
+        """
+        รอจนได้ slot แล้วคืนค่าเวลาที่รอ (วินาที) ระหว่างรอเรียก on_wait(ลำดับในคิว) ทุก poll วินาที
+        on_wait ทำงานนอก lock จึงอัปเดต UI ได้ และถ้า on_wait โยน exception (เช่น Streamlit หยุดสคริปต์)
+        งานนี้จะถูกนำออกจากคิว
+        """
+        ticket = object()
+        start = time.perf_counter()
+        admitted = False
+        with self._condition:
+            if self._active < self.slots and not self._waiting:
+                self._active += 1
+                admitted = True
+            elif self.max_queue and len(self._waiting) >= self.max_queue:
+                self._stats["rejected"] += 1
+                raise AdmissionRejected(f"คิว {self.name} เต็ม ({len(self._waiting)} งาน)")
+            else:
+                self._waiting.append(ticket)
+        try:
+            while not admitted:
+                with self._condition:
+                    if self._waiting[0] is ticket and self._active < self.slots:
+                        self._waiting.popleft()
+                        self._active += 1
+                        admitted = True
+                        break
+                    if self.max_wait and time.perf_counter() - start > self.max_wait:
+                        self._stats["rejected"] += 1
+                        raise AdmissionRejected(f"รอคิว {self.name} นานเกิน {self.max_wait:.0f} วินาที")
+                    position = self._waiting.index(ticket) + 1
+                    self._condition.wait(poll)
+                if on_wait is not None:
+                    on_wait(position)
+            waited = time.perf_counter() - start
+            with self._condition:
+                self._stats["admitted"] += 1
+                if waited > 0.001:
+                    self._stats["waited"] += 1
+                    self._stats["total_wait"] += waited
+                    self._stats["max_wait"] = max(self._stats["max_wait"], waited)
+            yield waited
+        finally:
+            with self._condition:
+                if admitted:
+                    self._active -= 1
+                elif ticket in self._waiting:
+                    self._waiting.remove(ticket)
+                self._condition.notify_all()
+
+    def report(self):
+        with self._condition:
+            return dict(self._stats, slots=self.slots, active=self._active, waiting=len(self._waiting),
+                        max_queue=self.max_queue)
+
+
+_CONTROLLERS = {}
+_FILE_LOCKS = {}
+_LOCK = threading.Lock()
+
+
+def get_controller(name, slots, max_queue, max_wait=None):
+    """
+    controller ชื่อ name ของ process (สร้างครั้งแรก และปรับจำนวน slot/คิวตามค่าที่ส่งมาทุกครั้ง)
+    """
+    with _LOCK:
+        controller = _CONTROLLERS.get(name)
+        if controller is None:
+            controller = _CONTROLLERS[name] = AdmissionController(name, slots, max_queue, max_wait)
+    if (controller.slots, controller.max_queue, controller.max_wait) != (max(1, int(slots)), max_queue, max_wait):
+        controller.configure(slots, max_queue, max_wait)
+    return controller
+
+
+def admission_report():
+    with _LOCK:
+        controllers = list(_CONTROLLERS.values())
+    return {controller.name: controller.report() for controller in controllers}
+
+
+def _lock_file(f):
+    # import ตามระบบปฏิบัติการ (fcntl ไม่มีบน Windows, msvcrt มีเฉพาะบน Windows)
+    if os.name == "nt":
+        import msvcrt
+        f.seek(0)
+        while True:
+            try:
+                # LK_LOCK รอประมาณ 10 วินาทีแล้ว raise จึงวนจนกว่าจะได้ lock
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+    import fcntl
+    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+
+def _unlock_file(f):
+    if os.name == "nt":
+        import msvcrt
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        return
+    import fcntl
+    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def file_lock(path):
+    """
+    lock ของไฟล์ path สำหรับไฟล์ที่อ่าน-แก้-เขียนทั้งไฟล์ (เช่น data.xlsx และ aggregate ของ history store)
+    ถือ lock ของ thread ใน process นี้ก่อน แล้วจึง lock ไฟล์ <path>.lock ด้วย flock/msvcrt
+    ซึ่งกันทั้ง process อื่นบนเครื่องเดียวกัน (เช่น Streamlit หลาย replica หรือ CLI ที่รันพร้อมแอป)
+    """
+    path = os.path.abspath(path)
+    with _LOCK:
+        thread_lock = _FILE_LOCKS.setdefault(path, threading.Lock())
+    with thread_lock:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".lock", "a+b") as f:
+            _lock_file(f)
+            try:
+                yield
+            finally:
+                _unlock_file(f)
@@ -0,0 +1,615 @@
+"""
+Backend Registry สำหรับโมเดลแต่ละประเภท (model_type)
+
+แต่ละ backend ประกาศ loader และ classifier ของตัวเอง และ import dependency หนักๆ
+(tensorflow, pickle, joblib) ภายใน loader เท่านั้น การ import โมดูลนี้จึงไม่ทำให้แอปเริ่มช้า
+
+- loader() คืนค่า (model, class_names) หรือ raise BackendUnavailable ถ้าใช้งานไม่ได้
+- classifier(model, batch) รับภาพ uint8 ขนาด (n, H, W, 3) ตาม input_size ของ backend (ค่าเริ่มต้น 224x224)
+  และคืนค่า probability ขนาด (n, จำนวนคลาส)
+"""
+import json
+import logging
+import os
+import random
+import threading
+from collections import namedtuple
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from model_registry import compute_model_version, directory_signature
+from settings import get_setting
+
+MODEL_DIR = "model"
+LABELS_PATH = os.path.join(MODEL_DIR, "labels.txt")
+# top-1 agreement กับ Keras แบบ float ที่วัดด้วย evaluate_backends.py --record
+# (แต่ละค่าบันทึกคู่กับ model version ของไฟล์ที่วัด ค่าของไฟล์ที่เปลี่ยนไปแล้วถือว่ายังไม่เคยวัด)
+AGREEMENT_PATH = os.path.join(MODEL_DIR, "backend_agreement.json")
+INPUT_SIZE = (224, 224)
+
+# ลำดับ backend เมื่อเลือก "auto" (เหมือนลำดับ fallback เดิมของ load_lightweight_model)
+# (tensorflow_uint8 มาก่อน tensorflow: ผลเหมือนกันแต่ส่งภาพเป็น uint8 ตลอดทาง)
+AUTO_BACKENDS = ["tensorflow_uint8", "tensorflow", "tflite", "pickle", "joblib", "simple"]
+
+# class names ที่กฎของ simple/demo classifier อ้างอิงอยู่ (index 0 = P1)
+RULE_CLASS_NAMES = ["P1", "P2", "P3", "P4"]
+
+Backend = namedtuple("Backend", ["name", "loader", "classifier", "model_files", "input_size"])
+
+BACKENDS = {}
+
+logger = logging.getLogger("pm_ai.backends")
+
+
+class BackendUnavailable(Exception):
+    """
+    backend ใช้งานไม่ได้ในสภาพแวดล้อมนี้ (ไม่มีไฟล์โมเดล หรือไม่มี dependency)
+    """
+
+
+def register_backend(name, loader, classifier, model_files=(), input_size=INPUT_SIZE):
+    """
+    ลงทะเบียน backend ใหม่ใน registry
+    """
+    BACKENDS[name] = Backend(name, loader, classifier, tuple(model_files), tuple(input_size))
+    return BACKENDS[name]
+
+
+def parse_backend_spec(spec):
+    """
+    แปลงค่าการตั้งค่า backend เช่น "auto" หรือ "pickle,joblib,simple" เป็นรายชื่อ backend
+    """
+    if not spec or spec == "auto":
+        return list(AUTO_BACKENDS)
+    if isinstance(spec, str):
+        spec = spec.split(",")
+    names = [name.strip() for name in spec if name.strip()]
+    unknown = [name for name in names if name not in BACKENDS]
+    if unknown:
+        raise ValueError(f"ไม่รู้จัก backend: {', '.join(unknown)} (ที่มี: {', '.join(BACKENDS)})")
+    return names
+
+
+def backend_model_files(spec):
+    """
+    รายชื่อไฟล์ใน model/ ที่ backend ใดก็ได้ตาม spec อาจใช้ (สำหรับเฝ้าดูการเปลี่ยนแปลง)
+    """
+    files = []
+    for name in parse_backend_spec(spec):
+        # cascade ใช้ไฟล์ของ tier ที่ตั้งค่าไว้ (cascade_tiers)
+        names = backend_model_files(get_setting("cascade_tiers")) if name == "cascade" else BACKENDS[name].model_files
+        for file_name in names:
+            if file_name not in files:
+                files.append(file_name)
+    return tuple(files)
+
+
+_AGREEMENT_CACHE = {}
+_VERSION_CACHE = {}
+
+
+def backend_model_version(name, model_dir=MODEL_DIR):
+    """
+    content hash ของไฟล์ที่ backend ใช้ (แบบเดียวกับ Model Version) คำนวณใหม่เมื่อขนาด/เวลาแก้ไขของไฟล์เปลี่ยนเท่านั้น
+    """
+    file_names = backend_model_files(name)
+    signature = directory_signature(model_dir, file_names)
+    cached = _VERSION_CACHE.get((model_dir, file_names))
+    if cached is None or cached[0] != signature:
+        cached = _VERSION_CACHE[(model_dir, file_names)] = (signature, compute_model_version(model_dir, file_names))
+    return cached[1]
+
+
+def recorded_agreement(name, path=AGREEMENT_PATH):
+    """
+    agreement ของ backend ที่บันทึกไว้ อ่านไฟล์ใหม่เมื่อไฟล์เปลี่ยนเท่านั้น
+    คืนค่า None ถ้ายังไม่เคยวัด หรือไฟล์โมเดลใน model/ (โฟลเดอร์เดียวกับ path) ไม่ใช่เวอร์ชันที่วัดไว้
+    """
+    mtime = os.path.getmtime(path) if os.path.exists(path) else None
+    cached = _AGREEMENT_CACHE.get(path)
+    if cached is None or cached[0] != mtime:
+        agreement = {}
+        if mtime is not None:
+            with open(path, 'r', encoding='utf-8') as f:
+                agreement = json.load(f).get("agreement", {})
+        cached = _AGREEMENT_CACHE[path] = (mtime, agreement)
+    entry = cached[1].get(name)
+    if not isinstance(entry, dict) or entry.get("model_version") != backend_model_version(name, os.path.dirname(path)):
+        return None
+    return entry["agreement"]
+
+
+def below_agreement_gate(name, path=AGREEMENT_PATH):
+    """
+    agreement ที่บันทึกไว้ถ้าต่ำกว่า min_backend_agreement (backend ทดลอง) ไม่เช่นนั้น None
+    """
+    agreement = recorded_agreement(name, path)
+    if agreement is not None and agreement < float(get_setting("min_backend_agreement")):
+        return agreement
+    return None
+
+
+def loaded_model_files(model_type, model=None):
+    """
+    ไฟล์ใน model/ ที่ backend ซึ่งโหลดได้จริงใช้ (สำหรับคำนวณ model version ของโมเดลที่ให้บริการ)
+    โมเดลที่ประกอบจากหลายโมเดล (cascade) บอกไฟล์ของตัวเองผ่าน model.model_files()
+    """
+    if hasattr(model, "model_files"):
+        return model.model_files()
+    return BACKENDS[model_type].model_files
+
+
+def load_backend(spec="auto"):
+    """
+    ลองโหลด backend ตามลำดับใน spec และคืนค่า (model, class_names, model_type) ของตัวแรกที่ใช้ได้
+
+    backend ที่ agreement ต่ำกว่า min_backend_agreement ถูกข้ามเมื่อ spec มีหลายตัว (fallback)
+    และโหลดพร้อมคำเตือนเมื่อเลือกไว้ตัวเดียว
+    """
+    names = parse_backend_spec(spec)
+    errors = []
+    for name in names:
+        agreement = below_agreement_gate(name)
+        if agreement is not None:
+            if len(names) > 1:
+                errors.append(f"{name}: agreement {agreement:.1%} ต่ำกว่าเกณฑ์")
+                continue
+            logger.warning("backend %s เป็นรุ่นทดลอง: agreement กับ Keras %.1f%% ต่ำกว่า min_backend_agreement",
+                           name, agreement * 100)
+        try:
+            model, class_names = BACKENDS[name].loader()
+            return model, class_names, name
+        except Exception as e:
+            errors.append(f"{name}: {e}")
+    raise BackendUnavailable("ไม่มี backend ที่ใช้งานได้ (" + "; ".join(errors) + ")")
+
+
+def load_class_names(labels_path=LABELS_PATH):
+    """
+    อ่าน class names จาก labels.txt (รูปแบบ "<index> <ชื่อคลาส>" เช่น "0 P4")
+    """
+    if not os.path.exists(labels_path):
+        raise BackendUnavailable(f"ไม่พบไฟล์ {labels_path}")
+    labels = {}
+    with open(labels_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            parts = line.strip().split(' ', 1)
+            if len(parts) == 2:
+                labels[int(parts[0])] = parts[1].strip()
+    return [labels[i] for i in sorted(labels)]
+
+
+def backend_input_size(model_type):
+    """
+    ขนาดภาพ (กว้าง, สูง) ที่ backend ต้องการ
+    """
+    return BACKENDS[model_type].input_size
+
+
+def preprocess_image(image, size=INPUT_SIZE):
+    """
+    ปรับขนาดภาพให้เป็น size (ค่าเริ่มต้น 224x224) และคืนค่าเป็น numpy array แบบ uint8
+    """
+    image = ImageOps.fit(image, size, Image.Resampling.LANCZOS)
+    return np.asarray(image, dtype=np.uint8)
+
+
+def resize_batch(batch, size):
+    """
+    ปรับขนาดภาพใน batch ที่ preprocess มาแล้วให้เป็น size (เช่น ภาพ 224x224 ที่ cascade ส่งให้ student)
+    """
+    if batch.shape[2] == size[0] and batch.shape[1] == size[1]:
+        return batch
+    return np.stack([
+        np.asarray(Image.fromarray(image_array).resize(size, Image.Resampling.LANCZOS), dtype=np.uint8)
+        for image_array in batch
+    ])
+
+
+def normalize_batch(batch):
+    """
+    ทำให้ค่าสีเป็นปกติ (Normalize) ให้อยู่ในช่วง [-1, 1] ตามที่โมเดลถูกเทรนมา
+    """
+    return (batch.astype(np.float32) / 127.5) - 1
+
+
+def classify_batch(model_type, model, batch):
+    """
+    วิเคราะห์ภาพหลายภาพพร้อมกันด้วย backend ที่ระบุ
+    """
+    backend = BACKENDS[model_type]
+    return backend.classifier(model, resize_batch(batch, backend.input_size))
+
+
+def rule_probabilities(index, confidence, num_classes):
+    # แปลงผลแบบ (index, confidence) ของ rules-based classifier ให้เป็น probability vector
+    probabilities = np.full(num_classes, (1 - confidence) / (num_classes - 1), dtype=np.float32)
+    probabilities[index] = confidence
+    return probabilities
+
+
+# --- TensorFlow ---
+
+def import_tensorflow():
+    try:
+        import tensorflow as tf
+    except ImportError as e:
+        raise BackendUnavailable(str(e))
+    if tf.__version__ < "2.15.0":
+        raise BackendUnavailable(f"ต้องใช้ TensorFlow 2.15+ (พบ {tf.__version__})")
+    return tf
+
+
+def load_tensorflow_model(model_path=os.path.join(MODEL_DIR, "keras_model.h5")):
+    if not os.path.exists(model_path):
+        raise BackendUnavailable(f"ไม่พบไฟล์ {model_path}")
+    tf = import_tensorflow()
+    model = tf.keras.models.load_model(model_path, compile=False)
+    return model, load_class_names()
+
+
+def classify_tensorflow(model, batch):
+    return model.predict(normalize_batch(batch), verbose=0)
+
+
+register_backend("tensorflow", load_tensorflow_model, classify_tensorflow,
+                 model_files=("keras_model.h5", "labels.txt"))
+
+
+# --- TensorFlow แบบรับ uint8 (normalize อยู่ในโมเดล สร้างด้วย export_uint8_model.py) ---
+
+def load_tensorflow_uint8_model():
+    model_path = os.path.join(MODEL_DIR, "keras_model_uint8.h5")
+    if not os.path.exists(model_path):
+        raise BackendUnavailable(f"ไม่พบไฟล์ {model_path} (สร้างด้วย export_uint8_model.py)")
+    tf = import_tensorflow()
+    return tf.keras.models.load_model(model_path, compile=False), load_class_names()
+
+
+def classify_tensorflow_uint8(model, batch):
+    # ส่งภาพ uint8 ให้โมเดลโดยตรง ไม่สร้าง array float32 ขนาด 4 เท่าใน NumPy
+    return model.predict(batch, verbose=0)
+
+
+register_backend("tensorflow_uint8", load_tensorflow_uint8_model, classify_tensorflow_uint8,
+                 model_files=("keras_model_uint8.h5", "labels.txt"))
+
+
+# --- TensorFlow Lite (โมเดล quantized ที่สร้างด้วย quantize_model.py) ---
+
+class TFLiteModel:
+    """
+    ห่อ TFLite Interpreter ให้เรียกใช้จากหลาย session ได้ (Interpreter ไม่ thread-safe)
+    """
+
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.interpreter.allocate_tensors()
+        self.input_details = interpreter.get_input_details()[0]
+        self.output_details = interpreter.get_output_details()[0]
+        self._lock = threading.Lock()
+
+    def _quantize_input(self, image_array):
+        dtype = self.input_details['dtype']
+        if dtype == np.float32:
+            return normalize_batch(image_array[np.newaxis])
+        scale, zero_point = self.input_details['quantization']
+        if not scale:
+            # โมเดลที่ normalize ในกราฟเอง (export_uint8_model.py) รับค่า 0..255 ตรงๆ
+            return image_array[np.newaxis].astype(dtype)
+        quantized = np.round(normalize_batch(image_array[np.newaxis]) / scale + zero_point)
+        info = np.iinfo(dtype)
+        return np.clip(quantized, info.min, info.max).astype(dtype)
+
+    def _dequantize_output(self, output):
+        scale, zero_point = self.output_details['quantization']
+        if output.dtype == np.float32 or not scale:
+            return output.astype(np.float32)
+        return (output.astype(np.float32) - zero_point) * scale
+
+    def predict(self, batch):
+        outputs = []
+        with self._lock:
+            for image_array in batch:
+                self.interpreter.set_tensor(self.input_details['index'], self._quantize_input(image_array))
+                self.interpreter.invoke()
+                outputs.append(self._dequantize_output(self.interpreter.get_tensor(self.output_details['index'])[0]))
+        return np.stack(outputs)
+
+
+def load_tflite_interpreter(model_path):
+    """
+    สร้าง TFLite Interpreter จาก tflite_runtime (ถ้ามี เบากว่า) หรือจาก TensorFlow
+    """
+    from runtime_profile import tflite_num_threads
+
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        try:
+            import tensorflow as tf
+        except ImportError as e:
+            raise BackendUnavailable(str(e))
+        Interpreter = tf.lite.Interpreter
+    return Interpreter(model_path=model_path, num_threads=tflite_num_threads())
+
+
+def load_tflite_model():
+    model_path = os.path.join(MODEL_DIR, "model_quantized.tflite")
+    if not os.path.exists(model_path):
+        raise BackendUnavailable(f"ไม่พบไฟล์ {model_path}")
+    return TFLiteModel(load_tflite_interpreter(model_path)), load_class_names()
+
+
+def classify_tflite(model, batch):
+    return model.predict(batch)
+
+
+register_backend("tflite", load_tflite_model, classify_tflite,
+                 model_files=("model_quantized.tflite", "labels.txt"))
+
+
+def load_tflite_uint8_model():
+    model_path = os.path.join(MODEL_DIR, "model_uint8.tflite")
+    if not os.path.exists(model_path):
+        raise BackendUnavailable(f"ไม่พบไฟล์ {model_path} (สร้างด้วย export_uint8_model.py)")
+    model = TFLiteModel(load_tflite_interpreter(model_path))
+    if model.input_details['dtype'] != np.uint8:
+        raise BackendUnavailable(f"{model_path} ไม่ได้รับ input เป็น uint8")
+    return model, load_class_names()
+
+
+register_backend("tflite_uint8", load_tflite_uint8_model, classify_tflite,
+                 model_files=("model_uint8.tflite", "labels.txt"))
+
+
+# --- Student (โมเดลความละเอียดต่ำที่กลั่นจาก keras_model.h5 ด้วย distill_student.py) ---
+
+STUDENT_SIZES = (160, 128)
+
+
+def make_student_loader(size):
+    def load_student_model():
+        model_path = os.path.join(MODEL_DIR, f"student_{size}.tflite")
+        if not os.path.exists(model_path):
+            raise BackendUnavailable(f"ไม่พบไฟล์ {model_path} (สร้างด้วย distill_student.py)")
+        return TFLiteModel(load_tflite_interpreter(model_path)), load_class_names()
+    return load_student_model
+
+
+for _size in STUDENT_SIZES:
+    register_backend(f"student{_size}", make_student_loader(_size), classify_tflite,
+                     model_files=(f"student_{_size}.tflite", "labels.txt"), input_size=(_size, _size))
+
+
+# --- Lightweight (scikit-learn ที่บันทึกด้วย pickle หรือ joblib) ---
+
+def _sklearn_class_names(model):
+    # ใช้ชื่อคลาสจากโมเดลถ้ามี ไม่เช่นนั้นใช้ labels.txt
+    classes = getattr(model, "classes_", None)
+    if classes is not None and all(isinstance(c, str) for c in classes):
+        return list(classes)
+    return load_class_names()
+
+
+def load_pickle_model():
+    model_path = os.path.join(MODEL_DIR, "model_lightweight.pkl")
+    if not os.path.exists(model_path):
+        raise BackendUnavailable(f"ไม่พบไฟล์ {model_path}")
+    import pickle
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+    return model, _sklearn_class_names(model)
+
+
+def load_joblib_model():
+    model_path = os.path.join(MODEL_DIR, "model_lightweight.joblib")
+    if not os.path.exists(model_path):
+        raise BackendUnavailable(f"ไม่พบไฟล์ {model_path}")
+    try:
+        import joblib
+    except ImportError as e:
+        raise BackendUnavailable(str(e))
+    model = joblib.load(model_path)
+    return model, _sklearn_class_names(model)
+
+
+def classify_sklearn(model, batch):
+    # Flatten image for simple models
+    flattened = normalize_batch(batch).reshape(len(batch), -1)
+    return model.predict_proba(flattened)
+
+
+register_backend("pickle", load_pickle_model, classify_sklearn,
+                 model_files=("model_lightweight.pkl", "labels.txt"))
+register_backend("joblib", load_joblib_model, classify_sklearn,
+                 model_files=("model_lightweight.joblib", "labels.txt"))
+
+
+# --- Simple ML algorithm (fallback ที่ไม่ต้องใช้ไฟล์โมเดล) ---
+
+def extract_simple_features(image_array):
+    """
+    สกัด features แบบง่ายจากภาพ
+    """
+    # คำนวณ features ต่างๆ
+    features = {
+        'mean_brightness': np.mean(image_array),
+        'std_brightness': np.std(image_array),
+        'mean_red': np.mean(image_array[:, :, 0]),
+        'mean_green': np.mean(image_array[:, :, 1]),
+        'mean_blue': np.mean(image_array[:, :, 2]),
+        'contrast': np.max(image_array) - np.min(image_array),
+        'entropy': calculate_entropy(image_array)
+    }
+    return features
+
+
+def calculate_entropy(image_array):
+    """
+    คำนวณ entropy ของภาพ
+    """
+    hist, _ = np.histogram(image_array.flatten(), bins=256, range=[-1, 1])
+    hist = hist[hist > 0]
+    prob = hist / hist.sum()
+    entropy = -np.sum(prob * np.log2(prob))
+    return entropy
+
+
+def simple_classifier(features):
+    """
+    Simple classifier ใช้ features แบบง่าย
+    """
+    # ใช้ rules-based classification
+    brightness = features['mean_brightness']
+    contrast = features['contrast']
+    entropy = features['entropy']
+
+    # Classification rules
+    if brightness < -0.5 and contrast < 0.5:
+        index = 0  # P1 - ภาพมืดและ contrast ต่ำ
+    elif brightness < 0 and entropy < 4:
+        index = 1  # P2 - ภาพมืดปานกลาง
+    elif brightness > 0 and contrast > 1.0:
+        index = 2  # P3 - ภาพสว่างและ contrast สูง
+    else:
+        index = 3  # P4 - ภาพสว่างมาก
+
+    # Confidence based on feature strength
+    confidence = min(0.95, 0.7 + abs(brightness) * 0.2 + contrast * 0.1)
+
+    return index, confidence
+
+
+def load_simple_model():
+    return None, list(RULE_CLASS_NAMES)
+
+
+def classify_simple(model, batch):
+    normalized = normalize_batch(batch)
+    return np.stack([
+        rule_probabilities(*simple_classifier(extract_simple_features(image_array)), len(RULE_CLASS_NAMES))
+        for image_array in normalized
+    ])
+
+
+register_backend("simple", load_simple_model, classify_simple)
+
+
+# --- Demo (จำลองผลลัพธ์สำหรับ maincai_demo.py) ---
+
+def classify_demo(model, batch):
+    probabilities = []
+    for image_array in batch:
+        # จำลองการวิเคราะห์ - ใช้ค่าเฉลี่ยของสีเป็นตัวกำหนดผลลัพธ์
+        avg_color = np.mean(image_array)
+        index = min(int(avg_color // 64), 3)
+
+        # เพิ่มความสุ่มเล็กน้อย
+        if random.random() < 0.1:  # 10% chance to change
+            index = random.randint(0, 3)
+
+        confidence = random.uniform(0.7, 0.95)  # จำลองความมั่นใจ
+        probabilities.append(rule_probabilities(index, confidence, len(RULE_CLASS_NAMES)))
+    return np.stack(probabilities)
+
+
+register_backend("demo", load_simple_model, classify_demo)
+
+
+# --- Cascade (เริ่มจาก backend ที่ถูกที่สุด แล้วส่งต่อเฉพาะภาพที่ไม่มั่นใจ) ---
+
+class CascadeModel:
+    """
+    รันภาพทั้ง batch ผ่าน tier ที่ถูกที่สุดก่อน ภาพที่ความมั่นใจต่ำกว่า threshold ของ tier นั้น
+    จะถูกส่งต่อไปยัง tier ถัดไป และ tier สุดท้ายตัดสินภาพที่เหลือทั้งหมด
+
+    tiers คือ list ของ (model_type, model, class_names, threshold)
+    """
+
+    def __init__(self, tiers, class_names):
+        self.tiers = tiers
+        self.class_names = list(class_names)
+        # ลำดับคอลัมน์ของแต่ละ tier ให้ตรงกับ class_names ของ cascade
+        self._orders = [[names.index(name) for name in self.class_names] for _, _, names, _ in tiers]
+        self._resolved = {model_type: 0 for model_type, _, _, _ in tiers}
+        self._lock = threading.Lock()
+
+    def predict(self, batch):
+        probabilities = np.zeros((len(batch), len(self.class_names)), dtype=np.float32)
+        pending = np.arange(len(batch))
+        resolved = {}
+        for i, (model_type, model, _, threshold) in enumerate(self.tiers):
+            if len(pending) == 0:
+                break
+            tier_probabilities = np.asarray(classify_batch(model_type, model, batch[pending]))[:, self._orders[i]]
+            if i == len(self.tiers) - 1:
+                accepted = np.ones(len(pending), dtype=bool)
+            else:
+                accepted = tier_probabilities.max(axis=1) >= threshold
+            probabilities[pending[accepted]] = tier_probabilities[accepted]
+            resolved[model_type] = int(accepted.sum())
+            pending = pending[~accepted]
+        with self._lock:
+            for model_type, count in resolved.items():
+                self._resolved[model_type] += count
+        return probabilities
+
+    def model_files(self):
+        """
+        ไฟล์ของ tier ที่โหลดได้จริง (tier ที่ใช้งานไม่ได้ถูกข้ามตอนโหลด จึงไม่นับ)
+        """
+        files = []
+        for model_type, model, _, _ in self.tiers:
+            for file_name in loaded_model_files(model_type, model):
+                if file_name not in files:
+                    files.append(file_name)
+        return tuple(files)
+
+    def resolved_counts(self):
+        """
+        จำนวนภาพที่แต่ละ tier เป็นผู้ตัดสิน (ใช้ปรับ threshold)
+        """
+        with self._lock:
+            return dict(self._resolved)
+
+    def resolved_share(self):
+        """
+        สัดส่วนภาพที่แต่ละ tier เป็นผู้ตัดสิน
+        """
+        counts = self.resolved_counts()
+        total = sum(counts.values())
+        return {model_type: (count / total if total else 0.0) for model_type, count in counts.items()}
+
+
+def load_cascade_model():
+    tier_names = parse_backend_spec(get_setting("cascade_tiers"))
+    if "cascade" in tier_names:
+        raise ValueError("cascade_tiers ต้องไม่มี cascade ซ้อนอยู่")
+    default_threshold = float(get_setting("cascade_threshold"))
+    thresholds = get_setting("cascade_thresholds") or {}
+
+    tiers = []
+    for name in tier_names:
+        try:
+            model, class_names = BACKENDS[name].loader()
+        except Exception:
+            # ข้าม tier ที่ใช้งานไม่ได้ในเครื่องนี้
+            continue
+        tiers.append((name, model, class_names, float(thresholds.get(name, default_threshold))))
+    if not tiers:
+        raise BackendUnavailable(f"ไม่มี tier ที่ใช้งานได้ใน cascade ({', '.join(tier_names)})")
+
+    class_names = tiers[-1][2]
+    for name, _, names, _ in tiers:
+        if sorted(names) != sorted(class_names):
+            raise BackendUnavailable(f"class names ของ {name} ไม่ตรงกับ tier สุดท้าย")
+    return CascadeModel(tiers, class_names), list(class_names)
+
+
+def classify_cascade(model, batch):
+    return model.predict(batch)
+
+
+register_backend("cascade", load_cascade_model, classify_cascade)
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+แคชภาพใน Base/data ที่ผ่านการ preprocess แล้ว สำหรับการ evaluate และการเทรนซ้ำ
+
+แต่ละภาพถูก decode และปรับขนาดด้วย preprocess_image (เหมือนตอนใช้งานจริง) เพียงครั้งเดียว
+แล้วเก็บไว้ใน .cache/dataset/<ขนาด>/ เป็น
+- images.npy   : uint8 array ขนาด (N, H, W, 3) เปิดแบบ memory-map ไม่ต้องโหลดทั้งก้อนเข้า RAM
+- labels.npy   : index ของคลาสตาม model/labels.txt
+- manifest.json: path, mtime, ขนาดไฟล์ และ sha256 ของภาพแต่ละไฟล์ ใช้ตรวจว่าไฟล์ไหนต้อง preprocess ใหม่
+
+    python dataset_cache.py                 # สร้าง/อัปเดตแคชขนาด 224x224
+    python dataset_cache.py --size 160      # แคชสำหรับโมเดลขนาด input อื่น
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+from PIL import Image
+
+from backends import INPUT_SIZE, load_class_names, preprocess_image
+
+DATA_DIR = "Base-20241014T062516Z-001/Base/data"
+CACHE_DIR = os.path.join(".cache", "dataset")
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+MANIFEST_VERSION = 1
+
+
+def file_sha256(path):
+    """
+    คำนวณ sha256 ของไฟล์แบบอ่านทีละส่วน
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def list_labelled_images(data_dir, class_names):
+    """
+    รายการ (path แบบ relative, ชื่อคลาส) ของภาพในโฟลเดอร์ย่อยที่ชื่อตรงกับคลาส เช่น data/P1/*.jpg
+    """
+    items = []
+    for class_name in sorted(os.listdir(data_dir)):
+        class_dir = os.path.join(data_dir, class_name)
+        if class_name not in class_names or not os.path.isdir(class_dir):
+            continue
+        for file_name in sorted(os.listdir(class_dir)):
+            if file_name.lower().endswith(IMAGE_EXTENSIONS):
+                items.append((os.path.join(class_name, file_name), class_name))
+    return items
+
+
+def load_image_array(path, size=INPUT_SIZE):
+    """
+    decode และ preprocess ภาพหนึ่งไฟล์ด้วยขั้นตอนเดียวกับแอป
+    """
+    with Image.open(path) as image:
+        return preprocess_image(image.convert('RGB'), size)
+
+
+class PreprocessedDataset:
+    """
+    ชุดข้อมูลที่ preprocess แล้ว: images เป็น memory-map แบบอ่านอย่างเดียว
+    """
+
+    def __init__(self, cache_path):
+        with open(os.path.join(cache_path, "manifest.json"), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        self.cache_path = cache_path
+        self.data_dir = manifest["data_dir"]
+        self.class_names = manifest["class_names"]
+        self.paths = [entry["path"] for entry in manifest["entries"]]
+        self.images = np.load(os.path.join(cache_path, "images.npy"), mmap_mode='r')
+        self.labels = np.load(os.path.join(cache_path, "labels.npy"))
+
+    def __len__(self):
+        return len(self.paths)
+
+    def iter_batches(self, batch_size=32, shuffle=False, seed=0):
+        """
+        วนอ่านทีละ batch เป็น (images, labels, paths) โดยคัดลอกเฉพาะ batch ปัจจุบันเข้าหน่วยความจำ
+        """
+        order = np.arange(len(self))
+        if shuffle:
+            np.random.default_rng(seed).shuffle(order)
+        for start in range(0, len(order), batch_size):
+            # เรียง index ภายใน batch เพื่อให้อ่าน memory-map ต่อเนื่องกัน
+            indices = np.sort(order[start:start + batch_size])
+            yield np.asarray(self.images[indices]), self.labels[indices], [self.paths[i] for i in indices]
+
+
+def _read_manifest(cache_path):
+    try:
+        with open(os.path.join(cache_path, "manifest.json"), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def build_cache(data_dir=DATA_DIR, cache_dir=CACHE_DIR, size=INPUT_SIZE, class_names=None, verbose=False):
+    """
+    สร้างหรืออัปเดตแคช preprocess เฉพาะไฟล์ที่ใหม่หรือเนื้อหาเปลี่ยน และคืนค่าสถิติ
+    """
+    class_names = class_names or load_class_names()
+    cache_path = os.path.join(cache_dir, f"{size[0]}x{size[1]}")
+    os.makedirs(cache_path, exist_ok=True)
+
+    manifest = _read_manifest(cache_path)
+    if manifest is not None and (manifest["data_dir"] != os.path.abspath(data_dir) or manifest["class_names"] != class_names):
+        manifest = None
+    previous = {entry["path"]: entry for entry in manifest["entries"]} if manifest else {}
+    old_images = np.load(os.path.join(cache_path, "images.npy"), mmap_mode='r') if manifest else None
+
+    items = list_labelled_images(data_dir, class_names)
+    stats = {"total": len(items), "reused": 0, "processed": 0, "removed": len(set(previous) - {p for p, _ in items})}
+    entries = []
+    sources = []
+    for rel_path, class_name in items:
+        path = os.path.join(data_dir, rel_path)
+        stat = os.stat(path)
+        entry = {"path": rel_path, "label": class_name, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+        cached = previous.get(rel_path)
+        if cached is not None and (cached["mtime_ns"], cached["size"]) == (stat.st_mtime_ns, stat.st_size):
+            # ไฟล์ไม่เปลี่ยน ใช้แถวเดิมได้ทันทีโดยไม่ต้องคำนวณ hash
+            entry["sha256"] = cached["sha256"]
+        else:
+            entry["sha256"] = file_sha256(path)
+            if cached is not None and cached["sha256"] != entry["sha256"]:
+                cached = None
+        entries.append(entry)
+        sources.append(cached["index"] if cached is not None else None)
+
+    unchanged = (
+        manifest is not None
+        and [e["path"] for e in entries] == [e["path"] for e in manifest["entries"]]
+        and all(source == i for i, source in enumerate(sources))
+    )
+    if not unchanged:
+        # เขียน array ใหม่ลงไฟล์ชั่วคราวทีละแถว (ไม่ต้องถือข้อมูลทั้งหมดไว้ใน RAM)
+        images_tmp = os.path.join(cache_path, "images.npy.tmp")
+        images = np.lib.format.open_memmap(images_tmp, mode='w+', dtype=np.uint8,
+                                           shape=(len(entries), size[1], size[0], 3))
+        for i, (entry, source) in enumerate(zip(entries, sources)):
+            if source is not None:
+                images[i] = old_images[source]
+                stats["reused"] += 1
+            else:
+                images[i] = load_image_array(os.path.join(data_dir, entry["path"]), size)
+                stats["processed"] += 1
+                if verbose:
+                    print(f"   preprocess {entry['path']}")
+        images.flush()
+        del images, old_images
+        os.replace(images_tmp, os.path.join(cache_path, "images.npy"))
+    else:
+        stats["reused"] = len(entries)
+
+    for i, entry in enumerate(entries):
+        entry["index"] = i
+    labels = np.array([class_names.index(entry["label"]) for entry in entries], dtype=np.int16)
+    np.save(os.path.join(cache_path, "labels.npy"), labels)
+
+    manifest_tmp = os.path.join(cache_path, "manifest.json.tmp")
+    with open(manifest_tmp, 'w', encoding='utf-8') as f:
+        json.dump({
+            "version": MANIFEST_VERSION,
+            "data_dir": os.path.abspath(data_dir),
+            "size": list(size),
+            "class_names": class_names,
+            "entries": entries,
+        }, f, ensure_ascii=False)
+    os.replace(manifest_tmp, os.path.join(cache_path, "manifest.json"))
+    return cache_path, stats
+
+
+def load_dataset(data_dir=DATA_DIR, cache_dir=CACHE_DIR, size=INPUT_SIZE, class_names=None):
+    """
+    อัปเดตแคช (ถ้าจำเป็น) แล้วคืนค่า PreprocessedDataset
+    """
+    cache_path, _ = build_cache(data_dir, cache_dir, size, class_names)
+    return PreprocessedDataset(cache_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=DATA_DIR)
+    parser.add_argument("--cache", default=CACHE_DIR)
+    parser.add_argument("--size", type=int, default=INPUT_SIZE[0], help="ขนาดด้านของภาพสี่เหลี่ยมจัตุรัส")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    cache_path, stats = build_cache(args.data, args.cache, (args.size, args.size), verbose=args.verbose)
+    print(f"✅ แคช {cache_path}: {stats['total']} ภาพ "
+          f"(ใช้ของเดิม {stats['reused']}, preprocess ใหม่ {stats['processed']}, ลบออก {stats['removed']})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
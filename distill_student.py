@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+กลั่นความรู้ (knowledge distillation) จาก model/keras_model.h5 ไปยังโมเดล student ที่รับภาพความละเอียดต่ำกว่า
+
+ขั้นตอนเหมือน Base/AI/Trainer.ipynb (ภาพใน Base/data, แบ่ง train/val/test 70/20/10, Adam, ประเมินบน test)
+ต่างกันที่ label ที่ใช้สอนคือ probability ของโมเดล 224x224 (teacher) ผสมกับ label จริง
+ภาพทุกขนาดอ่านจาก dataset_cache จึง decode/resize เพียงครั้งเดียว
+
+- --arch mobilenet (ค่าเริ่มต้น): โครงสร้างเดียวกับ teacher ที่ input เล็กลง เริ่มจากน้ำหนักของ teacher
+- --arch cnn: CNN ขนาดเล็กแบบใน Trainer.ipynb เทรนใหม่ทั้งหมด
+
+ผลลัพธ์คือ model/student_<ขนาด>.h5 และ model/student_<ขนาด>.tflite (ใช้ผ่าน backend "student<ขนาด>")
+พร้อมตาราง accuracy / agreement กับ teacher (วัดบนชุด test ที่ไม่ได้ใช้เทรนเท่านั้น) / latency ต่อภาพ
+รายชื่อภาพในชุด test ถูกบันทึกใน model/held_out.json ให้ evaluate_backends.py วัด agreement บนชุดเดียวกัน
+
+    python distill_student.py                       # student 160 และ 128
+    python distill_student.py --sizes 160 --epochs 30 --json students.json
+    python distill_student.py --export-only         # แปลง .h5 ที่มีอยู่เป็น .tflite ใหม่และวัดผล (ไม่เทรน)
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from backends import INPUT_SIZE, MODEL_DIR, TFLiteModel, load_tflite_interpreter, normalize_batch
+from dataset_cache import CACHE_DIR, DATA_DIR, load_dataset
+from quantize_model import configure_quantization
+
+TEACHER_PATH = os.path.join(MODEL_DIR, "keras_model.h5")
+TEACHER_TFLITE_PATH = os.path.join(MODEL_DIR, "model_quantized.tflite")
+# ภาพชุด test ของแต่ละ student (path ในแคชของ dataset_cache) ที่ไม่ได้ใช้เทรนหรือเลือก epoch
+HELD_OUT_PATH = os.path.join(MODEL_DIR, "held_out.json")
+
+
+def student_paths(size, model_dir=MODEL_DIR):
+    """
+    path ของไฟล์ .h5 และ .tflite ของ student ขนาด size
+    """
+    return (os.path.join(model_dir, f"student_{size}.h5"), os.path.join(model_dir, f"student_{size}.tflite"))
+
+
+def split_indices(count, seed=0):
+    """
+    แบ่ง index เป็น train/val/test สัดส่วน 70/20/10 แบบคงที่ตาม seed
+    """
+    order = np.random.default_rng(seed).permutation(count)
+    train_end, val_end = int(count * .7), int(count * .9)
+    return order[:train_end], order[train_end:val_end], order[val_end:]
+
+
+def read_held_out(path=HELD_OUT_PATH):
+    """
+    {ชื่อ backend: รายชื่อภาพชุด test} ของ student ที่กลั่นไว้ ({} ถ้ายังไม่มี)
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_held_out(backend_name, paths, path=HELD_OUT_PATH):
+    held_out = read_held_out(path)
+    held_out[backend_name] = list(paths)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(held_out, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def build_mobilenet_student(teacher, size):
+    """
+    สร้าง student จาก backbone ของ teacher ที่ input ขนาด size (คืนค่า logits)
+    """
+    import tensorflow as tf
+
+    backbone, pooling = teacher.layers[0].layers
+    config = backbone.get_config()
+    for layer in config["layers"]:
+        if layer["class_name"] == "InputLayer":
+            layer["config"]["batch_input_shape"] = (None, size, size, 3)
+    student_backbone = tf.keras.Model.from_config(config)
+    student_backbone.set_weights(backbone.get_weights())
+
+    inputs = tf.keras.Input((size, size, 3))
+    # BatchNorm ของ backbone ใช้ค่าสถิติเดิมของ teacher (batch ของชุดข้อมูลนี้เล็กเกินกว่าจะประมาณใหม่)
+    x = tf.keras.layers.GlobalAveragePooling2D()(student_backbone(inputs, training=False))
+    head = teacher.layers[1].layers
+    for layer in head:
+        layer_config = layer.get_config()
+        if layer is head[-1]:
+            layer_config["activation"] = "linear"
+        x = layer.__class__.from_config(layer_config)(x)
+    model = tf.keras.Model(inputs, x)
+    for layer, teacher_layer in zip(model.layers[-len(head):], head):
+        layer.set_weights(teacher_layer.get_weights())
+    return model
+
+
+def build_cnn_student(size, num_classes):
+    """
+    CNN ขนาดเล็กแบบใน Trainer.ipynb (คืนค่า logits)
+    """
+    import tensorflow as tf
+    from tensorflow.keras import layers
+
+    return tf.keras.Sequential([
+        tf.keras.Input((size, size, 3)),
+        layers.Conv2D(16, (3, 3), 1, activation='relu'),
+        layers.MaxPooling2D(),
+        layers.Conv2D(32, (3, 3), 1, activation='relu'),
+        layers.MaxPooling2D(),
+        layers.Conv2D(16, (3, 3), 1, activation='relu'),
+        layers.MaxPooling2D(),
+        layers.Flatten(),
+        layers.Dense(256, activation='relu'),
+        layers.Dense(num_classes),
+    ])
+
+
+def teacher_probabilities(teacher, dataset, batch_size=32):
+    """
+    probability ของ teacher สำหรับทุกภาพ (ภาพขนาด 224x224 จากแคช)
+    """
+    return np.concatenate([
+        teacher.predict(normalize_batch(images), verbose=0)
+        for images, _, _ in dataset.iter_batches(batch_size=batch_size)
+    ])
+
+
+def distill(student, images, labels, soft_targets, train_idx, val_idx, epochs, batch_size, temperature, alpha,
+            learning_rate, seed=0):
+    """
+    เทรน student ด้วย loss = alpha * T^2 * KL(teacher || student) + (1 - alpha) * cross-entropy กับ label จริง
+    คืนค่าน้ำหนักของ epoch ที่ agreement กับ teacher บนชุด val สูงที่สุด
+    (label ในชุดข้อมูลมีสัญญาณรบกวนมาก จึงเลือกจากความใกล้เคียงกับ teacher แทน accuracy)
+    """
+    import tensorflow as tf
+
+    optimizer = tf.keras.optimizers.Adam(learning_rate)
+    teacher_logits = np.log(np.clip(soft_targets, 1e-7, 1.0)).astype(np.float32)
+    rng = np.random.default_rng(seed)
+
+    @tf.function
+    def train_step(x, y, t_logits):
+        with tf.GradientTape() as tape:
+            logits = student(x, training=True)
+            soft = tf.keras.losses.kl_divergence(tf.nn.softmax(t_logits / temperature), tf.nn.softmax(logits / temperature))
+            hard = tf.keras.losses.sparse_categorical_crossentropy(y, logits, from_logits=True)
+            loss = tf.reduce_mean(alpha * temperature ** 2 * soft + (1 - alpha) * hard)
+        gradients = tape.gradient(loss, student.trainable_variables)
+        optimizer.apply_gradients(zip(gradients, student.trainable_variables))
+        return loss
+
+    def agreement(indices):
+        indices = np.sort(indices)
+        logits = student.predict(normalize_batch(np.asarray(images[indices])), verbose=0)
+        return float((logits.argmax(axis=1) == soft_targets[indices].argmax(axis=1)).mean())
+
+    best_agreement, best_weights = agreement(val_idx), student.get_weights()
+    print(f"   epoch 0/{epochs} val agreement {best_agreement:.2%}")
+    for epoch in range(epochs):
+        order = rng.permutation(train_idx)
+        losses = []
+        for start in range(0, len(order), batch_size):
+            batch = np.sort(order[start:start + batch_size])
+            x = normalize_batch(np.asarray(images[batch]))
+            # augmentation เดียวที่ไม่เปลี่ยนความหมายของภาพป้าย: กลับซ้ายขวา
+            flip = rng.random(len(batch)) < 0.5
+            x[flip] = x[flip, :, ::-1]
+            losses.append(float(train_step(x, labels[batch], teacher_logits[batch])))
+        val_agreement = agreement(val_idx)
+        print(f"   epoch {epoch + 1}/{epochs} loss {np.mean(losses):.4f} val agreement {val_agreement:.2%}")
+        if val_agreement >= best_agreement:
+            best_agreement, best_weights = val_agreement, student.get_weights()
+    student.set_weights(best_weights)
+    return student
+
+
+def export_student(student, h5_path, tflite_path, dynamic_range=False):
+    """
+    บันทึก student (เพิ่ม softmax ต่อท้าย) เป็น .h5 และ .tflite (quantization แบบเดียวกับ quantize_model.py)
+    """
+    import tensorflow as tf
+
+    model = tf.keras.Model(student.inputs, tf.keras.layers.Softmax()(student.outputs[0]))
+    model.save(h5_path + ".tmp.h5")
+    os.replace(h5_path + ".tmp.h5", h5_path)
+    write_tflite(model, tflite_path, dynamic_range)
+    return model
+
+
+def write_tflite(model, tflite_path, dynamic_range=False):
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    configure_quantization(converter, dynamic_range)
+    tflite_model = converter.convert()
+    with open(tflite_path + ".tmp", 'wb') as f:
+        f.write(tflite_model)
+    os.replace(tflite_path + ".tmp", tflite_path)
+
+
+def measure_tflite(tflite_path, images, repeats=1):
+    """
+    ทำนายทุกภาพด้วย TFLite (แบบเดียวกับแอป คือทีละภาพ) คืนค่า probability และเวลาต่อภาพ (ms)
+    """
+    model = TFLiteModel(load_tflite_interpreter(tflite_path))
+    model.predict(images[:1])
+    start = time.perf_counter()
+    for _ in range(repeats):
+        probabilities = model.predict(images)
+    return probabilities, (time.perf_counter() - start) * 1000 / (len(images) * repeats)
+
+
+def table_row(name, size, probabilities, labels, test_idx, reference, latency_ms):
+    # ทั้ง accuracy และ agreement วัดบนชุด test เท่านั้น (ภาพชุด train ทำให้ agreement ของ student สูงเกินจริง)
+    predicted = probabilities[test_idx].argmax(axis=1)
+    return {
+        "model": name,
+        "input": f"{size}x{size}",
+        "test_accuracy": float((predicted == labels[test_idx]).mean()),
+        "agreement": float((predicted == reference[test_idx].argmax(axis=1)).mean()),
+        "latency_ms": latency_ms,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="160,128", help="ขนาด input ของ student คั่นด้วยจุลภาค")
+    parser.add_argument("--arch", choices=["mobilenet", "cnn"], default="mobilenet")
+    parser.add_argument("--epochs", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--temperature", type=float, default=4.0)
+    parser.add_argument("--alpha", type=float, default=0.9, help="น้ำหนักของ loss จาก teacher (ที่เหลือเป็น label จริง)")
+    parser.add_argument("--learning-rate", type=float, default=None,
+                        help="ค่าเริ่มต้น 1e-4 สำหรับ mobilenet (fine-tune) และ 1e-3 สำหรับ cnn")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data", default=DATA_DIR)
+    parser.add_argument("--cache", default=CACHE_DIR)
+    parser.add_argument("--output-dir", default=MODEL_DIR)
+    parser.add_argument("--json", help="บันทึกตารางผลเป็นไฟล์ JSON")
+    parser.add_argument("--dynamic-range", action="store_true", help="น้ำหนักของ .tflite เป็น int8 แทน float16")
+    parser.add_argument("--export-only", action="store_true",
+                        help="ไม่เทรน: แปลง student_<ขนาด>.h5 ที่มีอยู่เป็น .tflite ใหม่แล้ววัดผล")
+    args = parser.parse_args()
+
+    import tensorflow as tf
+    tf.keras.utils.set_random_seed(args.seed)
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    learning_rate = args.learning_rate or (1e-4 if args.arch == "mobilenet" else 1e-3)
+
+    teacher = tf.keras.models.load_model(TEACHER_PATH, compile=False)
+    teacher_dataset = load_dataset(args.data, args.cache, INPUT_SIZE)
+    labels = teacher_dataset.labels.astype(np.int64)
+    train_idx, val_idx, test_idx = split_indices(len(teacher_dataset), args.seed)
+    print(f"📊 {len(teacher_dataset)} ภาพ (train {len(train_idx)} / val {len(val_idx)} / test {len(test_idx)})")
+
+    soft_targets = teacher_probabilities(teacher, teacher_dataset)
+    rows = [table_row("teacher (keras)", INPUT_SIZE[0], soft_targets, labels, test_idx, soft_targets, None)]
+    if os.path.exists(TEACHER_TFLITE_PATH):
+        probabilities, latency = measure_tflite(TEACHER_TFLITE_PATH, np.asarray(teacher_dataset.images))
+        rows.append(table_row("teacher (tflite)", INPUT_SIZE[0], probabilities, labels, test_idx, soft_targets, latency))
+
+    for size in sizes:
+        print(f"\n🎓 student {size}x{size} ({'export only' if args.export_only else args.arch})")
+        dataset = load_dataset(args.data, args.cache, (size, size))
+        if dataset.paths != teacher_dataset.paths:
+            print("❌ ลำดับภาพในแคชไม่ตรงกับแคชขนาด 224 — ลองรัน dataset_cache.py ใหม่")
+            return 1
+        h5_path, tflite_path = student_paths(size, args.output_dir)
+        if args.export_only:
+            write_tflite(tf.keras.models.load_model(h5_path, compile=False), tflite_path, args.dynamic_range)
+        else:
+            if args.arch == "mobilenet":
+                student = build_mobilenet_student(teacher, size)
+            else:
+                student = build_cnn_student(size, len(teacher_dataset.class_names))
+            distill(student, dataset.images, labels, soft_targets, train_idx, val_idx, args.epochs, args.batch_size,
+                    args.temperature, args.alpha, learning_rate, args.seed)
+            export_student(student, h5_path, tflite_path, args.dynamic_range)
+        save_held_out(f"student{size}", [dataset.paths[i] for i in sorted(test_idx)],
+                      os.path.join(args.output_dir, os.path.basename(HELD_OUT_PATH)))
+        probabilities, latency = measure_tflite(tflite_path, np.asarray(dataset.images))
+        rows.append(table_row(f"student{size}", size, probabilities, labels, test_idx, soft_targets, latency))
+        print(f"✅ บันทึก {h5_path} และ {tflite_path}")
+
+    print(f"\n{'model':<18} {'input':>8} {'test acc':>9} {'agreement':>10} {'ms/image':>9}")
+    for row in rows:
+        latency = "-" if row["latency_ms"] is None else f"{row['latency_ms']:.2f}"
+        print(f"{row['model']:<18} {row['input']:>8} {row['test_accuracy']:>9.2%} {row['agreement']:>10.2%} {latency:>9}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"arch": args.arch, "class_names": teacher_dataset.class_names, "rows": rows}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+เฝ้าดูการกระจายของผลทำนาย (phase) และความมั่นใจ เพื่อจับโมเดลที่แย่ลงหรือกล้อง/สภาพการถ่ายที่เปลี่ยนไป
+
+ทุกการทำนายถูกบันทึกแบบ streaming ลง histogram ความมั่นใจ 100 bin ต่อคลาสต่อเวอร์ชันโมเดล
+แยกเป็น bucket รายชั่วโมง (เก็บเท่าที่ window ต้องใช้) หน่วยความจำจึงคงที่ และ quantile อ่านจาก bin ได้ละเอียด 0.01
+window ล่าสุดถูกเทียบกับ reference ที่ได้จากการทำนายรูปใน Base/data ด้วยโมเดลเวอร์ชันเดียวกัน
+ด้วย Jensen-Shannon divergence (0 = เหมือนกัน, 1 = ต่างกันสิ้นเชิง) ทั้งสัดส่วนของคลาสและ histogram ความมั่นใจของแต่ละคลาส
+
+    python drift_monitor.py reference    # สร้าง reference ของโมเดลปัจจุบันจาก Base/data (ทำหลังเปลี่ยนโมเดล)
+    python drift_monitor.py status       # reference ที่มีอยู่
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from backends import MODEL_DIR
+
+logger = logging.getLogger("pm_ai.drift")
+
+REFERENCE_PATH = os.path.join(MODEL_DIR, "drift_reference.json")
+CONFIDENCE_BINS = 100
+# histogram ที่ใช้เทียบกับ reference หยาบกว่าที่เก็บ เพื่อไม่ให้ window ที่มีตัวอย่างน้อยดูต่างเพราะ noise
+COMPARE_BINS = 10
+BUCKET_SECONDS = 3600
+MAX_VERSIONS = 4
+
+
+class ConfidenceSketch:
+    """
+    histogram ความมั่นใจ (0..1) แบบ bin คงที่: เพิ่มค่าเป็น O(1) รวมกันได้ และ quantile คลาดเคลื่อนไม่เกิน 1/bins
+    """
+
+    def __init__(self, counts=None, bins=CONFIDENCE_BINS):
+        self.counts = np.zeros(bins, dtype=np.int64) if counts is None else np.asarray(counts, dtype=np.int64)
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    def add(self, confidence):
+        self.counts[min(int(confidence * len(self.counts)), len(self.counts) - 1)] += 1
+
+    def merge(self, other):
+        self.counts += other.counts
+        return self
+
+    def quantile(self, q):
+        """
+        ค่าที่ quantile q (ประมาณเชิงเส้นภายใน bin) หรือ None ถ้ายังไม่มีข้อมูล
+        """
+        total = self.total
+        if not total:
+            return None
+        cumulative = np.cumsum(self.counts)
+        index = int(np.searchsorted(cumulative, q * total))
+        index = min(index, len(self.counts) - 1)
+        before = cumulative[index - 1] if index else 0
+        fraction = (q * total - before) / self.counts[index] if self.counts[index] else 0
+        return (index + min(max(fraction, 0), 1)) / len(self.counts)
+
+    def coarse(self, bins=COMPARE_BINS):
+        return self.counts.reshape(bins, -1).sum(axis=1)
+
+    def to_list(self):
+        return self.counts.tolist()
+
+
+def js_divergence(p, q):
+    """
+    Jensen-Shannon divergence (log ฐาน 2 จึงอยู่ในช่วง 0..1) ของ histogram สองชุด
+    """
+    p = np.asarray(p, dtype=np.float64)
+    q = np.asarray(q, dtype=np.float64)
+    if not p.sum() or not q.sum():
+        return 0.0
+    p, q = p / p.sum(), q / q.sum()
+    m = (p + q) / 2
+
+    def kl(a, b):
+        mask = a > 0
+        return float(np.sum(a[mask] * np.log2(a[mask] / b[mask])))
+
+    return max(0.0, 0.5 * kl(p, m) + 0.5 * kl(q, m))
+
+
+class DriftMonitor:
+    """
+    สถิติของการทำนายแยกตามเวอร์ชันโมเดล: bucket รายชั่วโมงของ {คลาส: ConfidenceSketch}
+    เก็บ bucket ไม่เกิน window_hours อันล่าสุด และเวอร์ชันไม่เกิน MAX_VERSIONS เวอร์ชัน
+    """
+
+    def __init__(self, window_hours=24, clock=time.time):
+        self.window_hours = window_hours
+        self.clock = clock
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def record(self, model_version, class_name, confidence):
+        bucket_start = int(self.clock() // BUCKET_SECONDS) * BUCKET_SECONDS
+        with self._lock:
+            buckets = self._versions.pop(model_version, None)
+            if buckets is None:
+                buckets = deque(maxlen=max(1, int(self.window_hours)))
+                if len(self._versions) >= MAX_VERSIONS:
+                    del self._versions[next(iter(self._versions))]
+            # เรียงเวอร์ชันตามการใช้งานล่าสุด (ตัวที่ไม่ถูกใช้นานที่สุดถูกลบก่อน)
+            self._versions[model_version] = buckets
+            if not buckets or buckets[-1][0] != bucket_start:
+                buckets.append((bucket_start, {}))
+            sketches = buckets[-1][1]
+            sketch = sketches.get(class_name)
+            if sketch is None:
+                sketch = sketches[class_name] = ConfidenceSketch()
+            sketch.add(float(confidence))
+
+    def versions(self):
+        with self._lock:
+            return list(self._versions)
+
+    def window(self, model_version, hours=None):
+        """
+        {คลาส: ConfidenceSketch} รวมของ bucket ใน hours ชั่วโมงล่าสุด
+        """
+        since = self.clock() - (hours or self.window_hours) * BUCKET_SECONDS
+        merged = {}
+        with self._lock:
+            for bucket_start, sketches in self._versions.get(model_version, ()):
+                if bucket_start + BUCKET_SECONDS <= since:
+                    continue
+                for class_name, sketch in sketches.items():
+                    merged.setdefault(class_name, ConfidenceSketch()).merge(sketch)
+        return merged
+
+
+def compare(window, reference, min_samples=50, threshold=0.1):
+    """
+    เทียบ window กับ reference ({"classes": {คลาส: counts}}) คืนค่ารายงานพร้อมรายการ alert
+    ไม่เตือนจนกว่า window จะมีอย่างน้อย min_samples ตัวอย่าง (ต่อคลาสสำหรับ histogram ความมั่นใจ)
+    """
+    reference_sketches = {name: ConfidenceSketch(counts) for name, counts in reference["classes"].items()}
+    class_names = sorted(set(reference_sketches) | set(window))
+    window_counts = [window[name].total if name in window else 0 for name in class_names]
+    reference_counts = [reference_sketches[name].total if name in reference_sketches else 0 for name in class_names]
+    samples = sum(window_counts)
+    report = {
+        "samples": samples,
+        "class_divergence": js_divergence(window_counts, reference_counts),
+        "classes": {},
+        "alerts": [],
+    }
+    for name, window_count, reference_count in zip(class_names, window_counts, reference_counts):
+        window_sketch = window.get(name, ConfidenceSketch())
+        reference_sketch = reference_sketches.get(name, ConfidenceSketch())
+        divergence = js_divergence(window_sketch.coarse(), reference_sketch.coarse())
+        report["classes"][name] = {
+            "share": window_count / samples if samples else None,
+            "reference_share": reference_count / sum(reference_counts) if sum(reference_counts) else None,
+            "count": window_count,
+            "quantiles": [window_sketch.quantile(q) for q in (0.1, 0.5, 0.9)],
+            "reference_quantiles": [reference_sketch.quantile(q) for q in (0.1, 0.5, 0.9)],
+            "confidence_divergence": divergence,
+        }
+        if window_count >= min_samples and reference_count and divergence > threshold:
+            report["alerts"].append(f"ความมั่นใจของ {name} ต่างจาก reference (JS {divergence:.2f})")
+    if samples >= min_samples and report["class_divergence"] > threshold:
+        report["alerts"].insert(0, f"สัดส่วนของ phase ต่างจาก reference (JS {report['class_divergence']:.2f})")
+    return report
+
+
+# --- reference จาก Base/data ---
+
+def build_reference(snapshot, dataset, batch_size=32):
+    """
+    ทำนายทุกรูปใน dataset (PreprocessedDataset ขนาด input ของโมเดล) แล้วคืนค่า reference
+    """
+    from backends import classify_batch
+
+    sketches = {name: ConfidenceSketch() for name in snapshot.class_names}
+    for images, _, _ in dataset.iter_batches(batch_size=batch_size):
+        for probabilities in classify_batch(snapshot.model_type, snapshot.model, images):
+            index = int(np.argmax(probabilities))
+            sketches[snapshot.class_names[index]].add(float(probabilities[index]))
+    return {
+        "model_type": snapshot.model_type,
+        "samples": sum(sketch.total for sketch in sketches.values()),
+        "built_at": time.strftime('%Y-%m-%d %H:%M:%S'),
+        "classes": {name: sketch.to_list() for name, sketch in sketches.items()},
+    }
+
+
+def read_references(path=REFERENCE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_reference(version, reference, path=REFERENCE_PATH):
+    """
+    เพิ่ม/แทนที่ reference ของเวอร์ชันนี้ในไฟล์ (เขียนไฟล์ชั่วคราวก่อนแทนที่)
+    """
+    references = read_references(path)
+    references[version] = reference
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(references, f)
+    os.replace(tmp_path, path)
+
+
+_REFERENCE_CACHE = {}
+
+
+def load_reference(version, path=REFERENCE_PATH):
+    """
+    reference ของเวอร์ชันโมเดล (None ถ้ายังไม่ได้สร้าง) อ่านไฟล์ใหม่เมื่อไฟล์เปลี่ยนเท่านั้น
+    """
+    mtime = os.path.getmtime(path) if os.path.exists(path) else None
+    cached = _REFERENCE_CACHE.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = _REFERENCE_CACHE[path] = (mtime, read_references(path))
+    return cached[1].get(version)
+
+
+# --- monitor ของ process ---
+
+_MONITOR = DriftMonitor()
+_ALERTED = set()
+
+
+def record_prediction(model_version, class_name, confidence):
+    """
+    บันทึกผลทำนายหนึ่งครั้ง (เรียกทุกครั้งที่ทำนาย ใช้เวลาระดับไมโครวินาที)
+    """
+    _MONITOR.record(model_version, class_name, confidence)
+
+
+def drift_report(window_hours=24, min_samples=50, threshold=0.1, path=REFERENCE_PATH):
+    """
+    รายงานของทุกเวอร์ชันที่มีการทำนายใน process นี้ {เวอร์ชัน: รายงาน หรือ None ถ้ายังไม่มี reference}
+    log alert ใหม่ที่ logger "pm_ai.drift" ครั้งเดียวต่อข้อความ
+    """
+    _MONITOR.window_hours = window_hours
+    reports = {}
+    for version in _MONITOR.versions():
+        reference = load_reference(version, path)
+        if reference is None:
+            reports[version] = None
+            continue
+        report = reports[version] = compare(_MONITOR.window(version, window_hours), reference, min_samples, threshold)
+        for alert in report["alerts"]:
+            if (version, alert.split(" (")[0]) not in _ALERTED:
+                _ALERTED.add((version, alert.split(" (")[0]))
+                logger.warning("drift alert model=%s %s (%d samples)", version, alert, report["samples"])
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["reference", "status"])
+    parser.add_argument("--backend", default=None, help="ค่าเริ่มต้นตาม backend ใน settings")
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    if args.command == "status":
+        references = read_references()
+        if not references:
+            print(f"❌ ยังไม่มี reference ({REFERENCE_PATH})")
+        for version, reference in references.items():
+            print(f"✅ {version} · {reference['model_type']} · {reference['samples']} รูป · สร้างเมื่อ {reference['built_at']}")
+        return 0
+
+    from backends import backend_input_size
+    from dataset_cache import load_dataset
+    from rescore import load_current_model
+
+    snapshot = load_current_model(args.backend)
+    dataset = load_dataset(size=backend_input_size(snapshot.model_type), class_names=snapshot.class_names)
+    print(f"📐 สร้าง reference ของ {snapshot.model_type} เวอร์ชัน {snapshot.version} จาก {len(dataset)} รูป")
+    reference = build_reference(snapshot, dataset, args.batch_size)
+    save_reference(snapshot.version, reference)
+    for name, counts in reference["classes"].items():
+        sketch = ConfidenceSketch(counts)
+        median = sketch.quantile(0.5)
+        print(f"   {name:<4} {sketch.total:>5} รูป · ความมั่นใจมัธยฐาน {'-' if median is None else f'{median:.2f}'}")
+    print(f"✅ บันทึก {REFERENCE_PATH}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+ตรวจสอบความคลาดเคลื่อน (accuracy drift) ของ backend ทางเลือกเทียบกับโมเดล Keras แบบ float
+
+รันทุก backend ที่ใช้งานได้กับภาพที่มี label ใน Base/data/P1..P4 (ผ่าน dataset_cache) แล้วรายงาน
+confusion matrix, top-1 agreement กับ reference, ค่าความมั่นใจที่ต่างกันมากที่สุด และจำนวนภาพต่อวินาที
+จบด้วย exit code 1 ถ้า agreement ของ backend ใดต่ำกว่า threshold
+student ที่มีรายชื่อภาพชุด test ใน model/held_out.json (จาก distill_student.py) วัดเฉพาะภาพชุดนั้น
+--record บันทึก agreement ลง model/backend_agreement.json ซึ่ง load_backend ใช้ข้ามหรือเตือน backend ที่ต่ำกว่าเกณฑ์
+
+    python evaluate_backends.py
+    python evaluate_backends.py --backends tflite,cascade --min-agreement 0.97 --json report.json
+    python evaluate_backends.py --backends student160,student128 --record
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from backends import AGREEMENT_PATH, BACKENDS, INPUT_SIZE, backend_model_version, classify_batch, parse_backend_spec
+from dataset_cache import CACHE_DIR, DATA_DIR, load_dataset
+from distill_student import read_held_out
+from settings import get_setting
+
+REFERENCE_BACKEND = "tensorflow"
+# backend ที่ตรวจโดยค่าเริ่มต้น (simple/demo เป็นกฎตายตัว ไม่ใช่ตัวเลือกสำหรับ production
+# student เป็นรุ่นทดลองที่ agreement ยังต่ำกว่าเกณฑ์ ตรวจเมื่อระบุใน --backends)
+DEFAULT_CANDIDATES = "tensorflow_uint8,tflite,tflite_uint8,pickle,joblib,cascade"
+
+
+def run_backend(model_type, model, backend_class_names, class_names, dataset, batch_size):
+    """
+    รัน backend กับทุกภาพในชุดข้อมูล คืนค่า probability (เรียงคอลัมน์ตาม class_names) และเวลาที่ใช้
+    """
+    order = [backend_class_names.index(name) for name in class_names]
+    outputs, elapsed = [], 0.0
+    for images, _, _ in dataset.iter_batches(batch_size=batch_size):
+        start = time.perf_counter()
+        probabilities = np.asarray(classify_batch(model_type, model, images), dtype=np.float32)
+        elapsed += time.perf_counter() - start
+        outputs.append(probabilities[:, order])
+    return np.concatenate(outputs), elapsed
+
+
+def confusion_matrix(true_labels, predicted_labels, num_classes):
+    matrix = np.zeros((num_classes, num_classes), dtype=np.int64)
+    np.add.at(matrix, (true_labels, predicted_labels), 1)
+    return matrix
+
+
+def evaluate(model_type, probabilities, elapsed, labels, reference, class_names):
+    """
+    สรุปผลของ backend หนึ่งตัวเทียบกับ label จริงและกับ reference
+    """
+    predicted = probabilities.argmax(axis=1)
+    report = {
+        "backend": model_type,
+        "images": int(len(labels)),
+        "accuracy": float((predicted == labels).mean()),
+        "images_per_second": float(len(labels) / elapsed) if elapsed else None,
+        "confusion_matrix": confusion_matrix(labels, predicted, len(class_names)).tolist(),
+    }
+    if reference is not None:
+        report["agreement"] = float((predicted == reference.argmax(axis=1)).mean())
+        report["max_confidence_deviation"] = float(np.abs(probabilities - reference).max())
+    return report
+
+
+def format_report(report, class_names):
+    lines = [f"\n🔍 {report['backend']}" + (f" (ชุด test {report['images']} ภาพ)" if report.get("held_out") else "")]
+    lines.append(f"   accuracy: {report['accuracy']:.2%} · {report['images_per_second']:.1f} images/s")
+    if "agreement" in report:
+        lines.append(f"   top-1 agreement กับ {REFERENCE_BACKEND}: {report['agreement']:.2%} · "
+                     f"max confidence deviation: {report['max_confidence_deviation']:.4f}")
+    if "tier_share" in report:
+        lines.append("   cascade: " + " → ".join(f"{tier} {share:.0%}" for tier, share in report["tier_share"].items()))
+    width = max(len(name) for name in class_names) + 2
+    lines.append("   true\\pred " + "".join(name.rjust(width) for name in class_names))
+    for name, row in zip(class_names, report["confusion_matrix"]):
+        lines.append("   " + name.ljust(10) + "".join(str(count).rjust(width) for count in row))
+    return "\n".join(lines)
+
+
+def record_agreement(reports, path=AGREEMENT_PATH):
+    """
+    รวม agreement ของ backend ที่ตรวจครั้งนี้เข้ากับค่าที่บันทึกไว้เดิม
+    แต่ละค่าเก็บคู่กับ model version ของไฟล์ที่วัด (load_backend ไม่ใช้ค่าที่ version ไม่ตรงกับไฟล์ปัจจุบัน)
+    """
+    record = {"reference": REFERENCE_BACKEND, "agreement": {}}
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            record = json.load(f)
+    for report in reports:
+        if "agreement" in report:
+            record["agreement"][report["backend"]] = {
+                "agreement": round(report["agreement"], 4),
+                "model_version": report["model_version"],
+            }
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(record, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default=DEFAULT_CANDIDATES, help="backend ที่จะตรวจ คั่นด้วยจุลภาค")
+    parser.add_argument("--min-agreement", type=float, default=None,
+                        help="agreement ขั้นต่ำ (ค่าเริ่มต้นจาก min_backend_agreement ใน settings)")
+    parser.add_argument("--data", default=DATA_DIR)
+    parser.add_argument("--cache", default=CACHE_DIR)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--json", help="บันทึกรายงานเป็นไฟล์ JSON")
+    parser.add_argument("--record", action="store_true", help=f"บันทึก agreement ลง {AGREEMENT_PATH}")
+    args = parser.parse_args()
+
+    min_agreement = args.min_agreement if args.min_agreement is not None else float(get_setting("min_backend_agreement"))
+    candidates = [name for name in parse_backend_spec(args.backends) if name != REFERENCE_BACKEND]
+
+    dataset = load_dataset(args.data, args.cache)
+    datasets = {INPUT_SIZE: dataset}
+    class_names = dataset.class_names
+    labels = dataset.labels.astype(np.int64)
+    print(f"📊 ชุดข้อมูล {len(dataset)} ภาพ · class mapping จาก labels.txt: {class_names}")
+
+    try:
+        model, backend_class_names = BACKENDS[REFERENCE_BACKEND].loader()
+    except Exception as e:
+        print(f"❌ โหลด reference backend '{REFERENCE_BACKEND}' ไม่สำเร็จ: {e}")
+        return 2
+    reference, elapsed = run_backend(REFERENCE_BACKEND, model, backend_class_names, class_names, dataset, args.batch_size)
+    reports = [evaluate(REFERENCE_BACKEND, reference, elapsed, labels, None, class_names)]
+    print(format_report(reports[0], class_names))
+
+    held_out = read_held_out()
+    failed = []
+    for model_type in candidates:
+        # version ก่อนโหลด: ถ้าไฟล์เปลี่ยนระหว่างตรวจ ค่าที่บันทึกจะไม่ตรงกับไฟล์ใหม่และถูกมองว่ายังไม่เคยวัด
+        model_version = backend_model_version(model_type)
+        try:
+            model, backend_class_names = BACKENDS[model_type].loader()
+        except Exception as e:
+            print(f"\n⏭️  ข้าม {model_type}: {e}")
+            continue
+        # student ใช้แคชที่ resize จากภาพต้นฉบับตรงๆ ตามขนาด input ของตัวเอง
+        input_size = BACKENDS[model_type].input_size
+        if input_size not in datasets:
+            datasets[input_size] = load_dataset(args.data, args.cache, input_size)
+        probabilities, elapsed = run_backend(model_type, model, backend_class_names, class_names,
+                                             datasets[input_size], args.batch_size)
+        if model_type in held_out:
+            # ภาพที่ student เห็นตอนเทรนทำให้ agreement สูงเกินจริง — วัดเฉพาะชุด test
+            index = {path: i for i, path in enumerate(dataset.paths)}
+            subset = np.array([index[path] for path in held_out[model_type] if path in index], dtype=np.int64)
+            report = evaluate(model_type, probabilities[subset], elapsed * len(subset) / len(dataset),
+                              labels[subset], reference[subset], class_names)
+            report["held_out"] = True
+        else:
+            report = evaluate(model_type, probabilities, elapsed, labels, reference, class_names)
+        report["model_version"] = model_version
+        if hasattr(model, "resolved_share"):
+            report["tier_share"] = model.resolved_share()
+        reports.append(report)
+        print(format_report(report, class_names))
+        if report["agreement"] < min_agreement:
+            failed.append(model_type)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"class_names": class_names, "min_agreement": min_agreement, "reports": reports}, f, indent=2)
+    if args.record:
+        record_agreement(reports)
+        print(f"📝 บันทึก agreement ลง {AGREEMENT_PATH}")
+
+    print("\n" + "=" * 60)
+    if failed:
+        print(f"❌ agreement ต่ำกว่า {min_agreement:.2%}: {', '.join(failed)}")
+        return 1
+    print(f"✅ ทุก backend ที่ตรวจมี agreement ≥ {min_agreement:.2%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
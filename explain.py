@@ -0,0 +1,126 @@
+"""
+อธิบายผลการทำนาย: heatmap ของบริเวณในภาพที่โมเดลใช้ตัดสินคลาส
+
+- backend Keras (tensorflow, tensorflow_uint8) ใช้ Grad-CAM: gradient ของคะแนนคลาสเทียบกับ feature map
+  ชั้น convolution สุดท้าย (forward + backward หนึ่งครั้ง)
+- backend อื่น (TFLite, sklearn, rules) ไม่มี gradient จึงใช้ occlusion: บังภาพทีละช่องในตาราง grid x grid
+  แล้ววัดว่าความมั่นใจลดลงเท่าไร (classify_batch หนึ่งครั้ง grid² + 1 ภาพ)
+
+รับภาพ uint8 ที่ preprocess แล้ว (ขนาด input ของ backend) ชุดเดียวกับที่ใช้ทำนาย
+"""
+import hashlib
+from collections import namedtuple
+
+import numpy as np
+from PIL import Image
+
+from backends import classify_batch, import_tensorflow, normalize_batch
+
+# backend ที่ใช้ Grad-CAM ได้ → ต้อง normalize ภาพก่อนส่งให้โมเดลหรือไม่ (โมเดล uint8 normalize ในตัวเอง)
+GRADCAM_BACKENDS = {"tensorflow": True, "tensorflow_uint8": False}
+OCCLUSION_GRID = 7
+# สีของ heatmap จากค่าต่ำไปสูง (น้ำเงิน → ฟ้า → เหลือง → แดง)
+HEATMAP_COLORS = np.array([[0, 0, 128], [0, 0, 255], [0, 255, 255], [255, 255, 0], [255, 0, 0], [128, 0, 0]],
+                          dtype=np.float32)
+
+Explanation = namedtuple("Explanation", ["method", "heatmap", "image"])
+
+
+def image_hash(image_array):
+    """
+    hash ของภาพที่ preprocess แล้ว (ใช้เป็น key ของ cache คู่กับเวอร์ชันโมเดล)
+    """
+    return hashlib.sha1(np.ascontiguousarray(image_array).tobytes()).hexdigest()[:16]
+
+
+def keras_layer_chain(model):
+    """
+    แตก Sequential ที่ซ้อนกัน (แบบโมเดลจาก Teachable Machine) เป็นรายการ layer ที่เรียกต่อกันได้ทีละชั้น
+    Functional ที่ไม่มี model ซ้อนอยู่ข้างใน (เช่น MobileNet) ถือเป็นชั้นเดียว
+    """
+    tf = import_tensorflow()
+    chain = []
+    for layer in model.layers:
+        if isinstance(layer, tf.keras.layers.InputLayer):
+            continue
+        nested = getattr(layer, "layers", None)
+        if isinstance(layer, tf.keras.Sequential) or (nested and any(hasattr(inner, "layers") for inner in nested)):
+            chain.extend(keras_layer_chain(layer))
+        else:
+            chain.append(layer)
+    return chain
+
+
+def grad_cam(model, batch, class_index):
+    """
+    Grad-CAM ของภาพเดียว (batch ขนาด 1 ในรูปแบบที่โมเดลรับ) คืนค่า heatmap 0..1 ขนาดเท่า feature map
+    """
+    tf = import_tensorflow()
+    x = tf.convert_to_tensor(batch, dtype=tf.float32)
+    features = None
+    with tf.GradientTape() as tape:
+        for layer in keras_layer_chain(model):
+            x = layer(x, training=False)
+            # output 4 มิติชั้นสุดท้ายคือ feature map ของ convolution ก่อน pooling
+            if len(x.shape) == 4:
+                features = x
+                tape.watch(features)
+        score = x[:, class_index]
+    if features is None:
+        raise ValueError("ไม่พบชั้น convolution ในโมเดล")
+    gradients = tape.gradient(score, features)[0]
+    weights = tf.reduce_mean(gradients, axis=(0, 1))
+    cam = tf.nn.relu(tf.reduce_sum(features[0] * weights, axis=-1)).numpy()
+    return cam / cam.max() if cam.max() > 0 else cam
+
+
+def occlusion_map(model_type, model, image_array, class_index, grid=OCCLUSION_GRID):
+    """
+    ความมั่นใจของคลาสที่ลดลงเมื่อบังแต่ละช่อง (ด้วยสีเฉลี่ยของภาพ) คืนค่า heatmap 0..1 ขนาด grid x grid
+    """
+    height, width = image_array.shape[:2]
+    ys = np.linspace(0, height, grid + 1).astype(int)
+    xs = np.linspace(0, width, grid + 1).astype(int)
+    fill = image_array.reshape(-1, 3).mean(axis=0).astype(np.uint8)
+    batch = np.repeat(image_array[np.newaxis], grid * grid + 1, axis=0)
+    for row in range(grid):
+        for column in range(grid):
+            batch[1 + row * grid + column, ys[row]:ys[row + 1], xs[column]:xs[column + 1]] = fill
+    scores = np.asarray(classify_batch(model_type, model, batch))[:, class_index]
+    drop = np.clip(scores[0] - scores[1:], 0, None).reshape(grid, grid)
+    return drop / drop.max() if drop.max() > 0 else drop
+
+
+def colorize(values):
+    """
+    แปลงค่า 0..1 เป็นสี RGB ตาม HEATMAP_COLORS
+    """
+    anchors = np.linspace(0, 1, len(HEATMAP_COLORS))
+    return np.stack([np.interp(values, anchors, HEATMAP_COLORS[:, channel]) for channel in range(3)], axis=-1)
+
+
+def overlay(image_array, heatmap, alpha=0.5):
+    """
+    วาง heatmap (ขยายเป็นขนาดภาพ) ทับภาพ บริเวณที่ค่าต่ำยังเห็นภาพเดิมชัด
+    """
+    size = (image_array.shape[1], image_array.shape[0])
+    values = np.asarray(
+        Image.fromarray((heatmap * 255).astype(np.uint8)).resize(size, Image.Resampling.BILINEAR), dtype=np.float32
+    ) / 255
+    weight = alpha * values[..., np.newaxis]
+    blended = (1 - weight) * image_array.astype(np.float32) + weight * colorize(values)
+    return Image.fromarray(blended.clip(0, 255).astype(np.uint8))
+
+
+def explain(model_type, model, image_array, class_index):
+    """
+    heatmap ของคลาส class_index สำหรับภาพที่ preprocess แล้ว คืนค่า Explanation(method, heatmap, image)
+    """
+    if model_type in GRADCAM_BACKENDS:
+        batch = image_array[np.newaxis]
+        if GRADCAM_BACKENDS[model_type]:
+            batch = normalize_batch(batch)
+        heatmap, method = grad_cam(model, batch, class_index), "Grad-CAM"
+    else:
+        heatmap, method = occlusion_map(model_type, model, image_array, class_index), "Occlusion"
+    return Explanation(method, heatmap, overlay(image_array, heatmap))
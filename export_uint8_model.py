@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+สร้างโมเดลที่รับภาพ uint8 โดยตรง (ย้ายการ normalize /127.5 - 1 เข้าไปเป็น layer แรกของโมเดล)
+
+ภาพที่ส่งให้โมเดลเป็น uint8 ตลอดทาง จึงมีขนาดเพียง 1/4 ของ float32
+ทั้งใน batch ที่ส่งให้โมเดลและเมื่อส่งข้ามคิวหรือ process
+
+- model/keras_model_uint8.h5      : backend "tensorflow_uint8"
+- model/model_uint8.tflite        : backend "tflite_uint8" (quantization แบบเดียวกับ quantize_model.py)
+
+    python export_uint8_model.py
+    python export_uint8_model.py --model model/keras_model.h5 --no-tflite
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+from backends import INPUT_SIZE, MODEL_DIR, normalize_batch
+from dataset_cache import DATA_DIR, load_dataset
+from quantize_model import configure_quantization
+
+
+def fold_normalization(model, size=INPUT_SIZE):
+    """
+    ต่อ Rescaling ไว้หน้าโมเดล: input เป็น uint8 ค่า 0..255 และแปลงเป็น [-1, 1] ภายในกราฟ
+    """
+    import tensorflow as tf
+
+    inputs = tf.keras.Input((size[1], size[0], 3), dtype="uint8", name="image_uint8")
+    x = tf.keras.layers.Rescaling(1 / 127.5, offset=-1, name="normalize")(inputs)
+    return tf.keras.Model(inputs, model(x), name="uint8_input")
+
+
+def max_difference(model, folded, data_dir, limit=64):
+    """
+    ค่าความต่างสูงสุดของ probability ระหว่างโมเดลเดิม (normalize ด้วย NumPy) กับโมเดลที่รวม normalize ไว้แล้ว
+    """
+    dataset = load_dataset(data_dir)
+    images = np.asarray(dataset.images[:limit])
+    expected = model.predict(normalize_batch(images), verbose=0)
+    return float(np.abs(folded.predict(images, verbose=0) - expected).max())
+
+
+def write_atomic(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=os.path.join(MODEL_DIR, "keras_model.h5"))
+    parser.add_argument("--output", default=os.path.join(MODEL_DIR, "keras_model_uint8.h5"))
+    parser.add_argument("--tflite-output", default=os.path.join(MODEL_DIR, "model_uint8.tflite"))
+    parser.add_argument("--no-tflite", action="store_true", help="ไม่ต้องสร้างไฟล์ .tflite")
+    parser.add_argument("--dynamic-range", action="store_true", help="น้ำหนักของ .tflite เป็น int8 แทน float16")
+    parser.add_argument("--data", default=DATA_DIR, help="ภาพสำหรับตรวจว่าผลลัพธ์ตรงกับโมเดลเดิม")
+    args = parser.parse_args()
+
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(args.model, compile=False)
+    folded = fold_normalization(model, tuple(model.input_shape[2:0:-1]))
+    if os.path.isdir(args.data):
+        print(f"🔍 ความต่างสูงสุดของ probability เทียบกับโมเดลเดิม: {max_difference(model, folded, args.data):.2e}")
+
+    # เขียนไฟล์ชั่วคราวก่อนแล้วค่อยแทนที่ เพื่อไม่ให้ Model Registry โหลดไฟล์ที่เขียนไม่เสร็จ
+    tmp_path = args.output + ".tmp.h5"
+    folded.save(tmp_path)
+    os.replace(tmp_path, args.output)
+    print(f"✅ บันทึกโมเดล {args.output}")
+
+    if not args.no_tflite:
+        converter = tf.lite.TFLiteConverter.from_keras_model(folded)
+        configure_quantization(converter, args.dynamic_range)
+        tflite_model = converter.convert()
+        write_atomic(args.tflite_output, tflite_model)
+        print(f"✅ บันทึกโมเดล {args.tflite_output} ({len(tflite_model) / 1024:.0f} KB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+ส่งออกประวัติการตรวจสอบจาก history store เป็น .xlsx หรือ .csv แบบ streaming
+
+อ่านทีละ RecordBatch จาก HistoryStore.iter_batches แล้วเขียนทีละแถวด้วย workbook แบบ write-only ของ openpyxl
+(หรือ csv.writer) ไม่สร้าง DataFrame และไม่ถือ object ของทุก cell ไว้ หน่วยความจำจึงคงที่ไม่ว่าประวัติจะยาวแค่ไหน
+
+    python history_export.py export.xlsx
+    python history_export.py export.csv --start 2024-08-01 --end 2024-08-31 --branch 1114
+"""
+import argparse
+import csv
+import itertools
+import os
+import sys
+from datetime import date
+
+from history_store import HISTORY_DIR, HistoryStore
+
+# หัวคอลัมน์ในไฟล์ที่ส่งออก (ชื่อเดียวกับ data.xlsx) → คอลัมน์ใน history store
+EXPORT_COLUMNS = [
+    ('Employee name', 'employee_name'),
+    ('Branch code', 'branch_code'),
+    ('Sign type', 'sign_type'),
+    ('How many images', 'image_count'),
+    ('Image Filename', 'image_filename'),
+    ('Phase', 'phase'),
+    ('Confidence', 'confidence'),
+    ('Upload Time', 'upload_time'),
+    ('Model Type', 'model_type'),
+    ('Model Version', 'model_version'),
+]
+EXPORT_FORMATS = ('xlsx', 'csv')
+
+
+def iter_export_rows(store, start=None, end=None, branch_code=None, batch_size=10_000):
+    """
+    แถวของประวัติตามตัวกรองเป็น tuple ตามลำดับ EXPORT_COLUMNS (อ่านทีละ batch)
+    """
+    columns = [column for _, column in EXPORT_COLUMNS]
+    for batch in store.iter_batches(start, end, branch_code, columns=columns, batch_size=batch_size):
+        values = [batch.column(column).to_pylist() for column in columns]
+        yield from zip(*values)
+
+
+def write_xlsx(rows, path):
+    """
+    เขียนแถวลงไฟล์ .xlsx ด้วย workbook แบบ write-only (แถวถูกเขียนออกทันที ไม่เก็บไว้ใน workbook)
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("History")
+    sheet.append([header for header, _ in EXPORT_COLUMNS])
+    count = 0
+    for row in rows:
+        sheet.append(row)
+        count += 1
+    workbook.save(path)
+    return count
+
+
+def write_csv(rows, path):
+    """
+    เขียนแถวลงไฟล์ .csv (UTF-8 พร้อม BOM เพื่อให้ Excel อ่านภาษาไทยได้)
+    """
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow([header for header, _ in EXPORT_COLUMNS])
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def export_history(store, path, export_format=None, start=None, end=None, branch_code=None, max_rows=None):
+    """
+    ส่งออกประวัติตามตัวกรองลงไฟล์ path (เขียนไฟล์ชั่วคราวก่อนแล้วค่อยแทนที่) คืนค่าจำนวนแถว
+    export_format: "xlsx" หรือ "csv" (ค่าเริ่มต้นตามนามสกุลของ path)
+    max_rows: จำนวนแถวสูงสุดที่เขียน (None = ทั้งหมด)
+    """
+    export_format = export_format or os.path.splitext(path)[1].lstrip('.').lower()
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"ไม่รองรับรูปแบบ {export_format} (ใช้ได้: {', '.join(EXPORT_FORMATS)})")
+    rows = iter_export_rows(store, start, end, branch_code)
+    if max_rows is not None:
+        rows = itertools.islice(rows, max_rows)
+    tmp_path = f"{path}.tmp.{export_format}"
+    count = (write_xlsx if export_format == 'xlsx' else write_csv)(rows, tmp_path)
+    os.replace(tmp_path, path)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output", help="ไฟล์ปลายทาง .xlsx หรือ .csv")
+    parser.add_argument("--root", default=HISTORY_DIR)
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default=None, help="ค่าเริ่มต้นตามนามสกุลของไฟล์")
+    parser.add_argument("--start", type=date.fromisoformat, default=None, help="YYYY-MM-DD")
+    parser.add_argument("--end", type=date.fromisoformat, default=None, help="YYYY-MM-DD")
+    parser.add_argument("--branch", default=None, help="รหัสสาขา")
+    args = parser.parse_args()
+
+    count = export_history(HistoryStore(args.root), args.output, args.format, args.start, args.end, args.branch)
+    print(f"✅ ส่งออก {count} แถวลง {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+History Store แบบ columnar (Parquet) สำหรับ dashboard ของผู้จัดการ
+
+- แถวผลการตรวจสอบถูกเก็บเป็นไฟล์ Parquet แบ่ง partition ตามเดือน: history/rows/month=YYYY-MM/*.parquet
+- aggregate (จำนวนภาพและผลรวม confidence ต่อ วัน × สาขา × phase) ถูกอัปเดตแบบ incremental
+  ทุกครั้งที่ append และเก็บแยกรายเดือนที่ history/aggregates/month=YYYY-MM.parquet
+- แถวที่ไม่มีเวลาอัปโหลดเก็บ upload_time เป็น null ใน partition month=unknown และไม่ถูกนับใน aggregate รายเดือน
+- write version เพิ่มขึ้นทุกครั้งที่เขียน ใช้เป็น cache key ของ query ฝั่ง dashboard
+- การเขียน (append, compact) ทั้งหมดทำภายใต้ admission.file_lock ของ history/_write ซึ่งกันทั้ง thread
+  และ process อื่นบนเครื่องเดียวกัน การอ่าน-แก้-เขียน aggregate และไฟล์ _version จึงไม่ทับกันแม้แอปรันหลาย process
+  (ไม่ครอบคลุม history/ บน network filesystem ที่ไม่รองรับ flock)
+
+    python history_store.py import data.xlsx    # นำเข้าประวัติเดิมจากไฟล์ Excel
+    python history_store.py compact             # รวมไฟล์ย่อยของแต่ละเดือนเป็นไฟล์เดียว
+"""
+import argparse
+import glob
+import os
+import sys
+import uuid
+from datetime import date, datetime
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from admission import file_lock
+
+HISTORY_DIR = "history"
+# partition ของแถวที่ไม่มีเวลาอัปโหลด (ไม่มี aggregate และไม่อยู่ในเดือนใด)
+UNKNOWN_MONTH = "unknown"
+
+ROW_SCHEMA = pa.schema([
+    ("employee_name", pa.string()),
+    ("branch_code", pa.string()),
+    ("sign_type", pa.string()),
+    ("image_count", pa.int32()),
+    ("image_filename", pa.string()),
+    ("phase", pa.string()),
+    ("confidence", pa.float64()),
+    ("upload_time", pa.timestamp("s")),
+    ("model_type", pa.string()),
+    ("model_version", pa.string()),
+])
+
+AGGREGATE_SCHEMA = pa.schema([
+    ("date", pa.date32()),
+    ("branch_code", pa.string()),
+    ("phase", pa.string()),
+    ("count", pa.int64()),
+    ("confidence_count", pa.int64()),
+    ("confidence_sum", pa.float64()),
+])
+
+MONTH_PARTITIONING = ds.partitioning(pa.schema([("month", pa.string())]), flavor="hive")
+
+# ชื่อคอลัมน์ใน data.xlsx (รวมถึงรูปแบบเก่าที่ใช้ "Image") → ชื่อคอลัมน์ใน history store
+EXCEL_COLUMNS = {
+    'Employee name': 'employee_name',
+    'Branch code': 'branch_code',
+    'Sign type': 'sign_type',
+    'How many images': 'image_count',
+    'Image Filename': 'image_filename',
+    'Image': 'image_filename',
+    'Phase': 'phase',
+    'Confidence': 'confidence',
+    'Upload Time': 'upload_time',
+    'Model Type': 'model_type',
+    'Model Version': 'model_version',
+}
+
+def normalize_branch_code(value):
+    """
+    แปลงรหัสสาขาเป็น string (ไฟล์ Excel เก่าเก็บเป็นตัวเลขทศนิยม เช่น 1112.0)
+    """
+    if value is None or value != value:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_datetime(value):
+    # ค่าว่างจาก data.xlsx มาเป็น None, "", NaN หรือ NaT (NaN/NaT ไม่เท่ากับตัวเอง)
+    if value is None or value == "" or value != value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    if hasattr(value, "to_pydatetime"):
+        return value.to_pydatetime()
+    return datetime.strptime(str(value), '%Y-%m-%d %H:%M:%S')
+
+
+def normalize_row(row):
+    """
+    แปลงแถวในรูปแบบของ data.xlsx หรือของ history store ให้ตรงกับ ROW_SCHEMA
+    """
+    normalized = {EXCEL_COLUMNS.get(key, key): value for key, value in row.items()}
+    image_count = normalized.get('image_count')
+    return {
+        'employee_name': normalized.get('employee_name'),
+        'branch_code': normalize_branch_code(normalized.get('branch_code')),
+        'sign_type': normalized.get('sign_type'),
+        'image_count': int(image_count) if image_count is not None else None,
+        'image_filename': normalized.get('image_filename'),
+        'phase': normalized.get('phase'),
+        'confidence': _to_float(normalized.get('confidence')),
+        # ไม่เดาเวลาแทนแถวที่ไม่มีเวลาอัปโหลด (null → partition month=unknown)
+        'upload_time': _to_datetime(normalized.get('upload_time')),
+        'model_type': normalized.get('model_type'),
+        'model_version': normalized.get('model_version'),
+    }
+
+
+def _write_atomic(table, path):
+    # เขียนเป็นไฟล์ซ่อนก่อน (dataset จะข้ามไฟล์ที่ขึ้นต้นด้วย ".") แล้วค่อยแทนที่
+    tmp_path = os.path.join(os.path.dirname(path), f".{uuid.uuid4().hex}.tmp")
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _month_filter(start, end):
+    # กรองที่ระดับ partition ก่อน เพื่อไม่ต้องเปิดไฟล์ของเดือนที่ไม่เกี่ยวข้อง
+    expression = None
+    if start is not None:
+        expression = ds.field("month") >= start.strftime('%Y-%m')
+    if end is not None:
+        end_expression = ds.field("month") <= end.strftime('%Y-%m')
+        expression = end_expression if expression is None else expression & end_expression
+    return expression
+
+
+def _and(left, right):
+    if left is None:
+        return right
+    if right is None:
+        return left
+    return left & right
+
+
+class HistoryStore:
+    """
+    อ่าน/เขียนประวัติการตรวจสอบในโฟลเดอร์ root (ค่าเริ่มต้น history/)
+    """
+
+    def __init__(self, root=HISTORY_DIR):
+        self.root = root
+        self.rows_dir = os.path.join(root, "rows")
+        self.aggregates_dir = os.path.join(root, "aggregates")
+        self.version_path = os.path.join(root, "_version")
+        # lock ของการเขียนทั้งหมด (ไฟล์ history/_write.lock)
+        self.write_lock_path = os.path.join(root, "_write")
+
+    # --- เขียน ---
+
+    def append(self, rows):
+        """
+        เพิ่มแถวใหม่ อัปเดต aggregate ของเดือนที่เกี่ยวข้อง และคืนค่า write version ใหม่
+        """
+        table = pa.Table.from_pylist([normalize_row(row) for row in rows], schema=ROW_SCHEMA)
+        if table.num_rows == 0:
+            return self.write_version()
+
+        months = pc.fill_null(pc.strftime(table["upload_time"], format="%Y-%m"), UNKNOWN_MONTH)
+        with file_lock(self.write_lock_path):
+            for month in pc.unique(months).to_pylist():
+                month_table = table.filter(pc.equal(months, month))
+                partition_dir = os.path.join(self.rows_dir, f"month={month}")
+                os.makedirs(partition_dir, exist_ok=True)
+                part_name = f"part-{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}.parquet"
+                _write_atomic(month_table, os.path.join(partition_dir, part_name))
+                if month != UNKNOWN_MONTH:
+                    self._update_aggregates(month, month_table)
+            return self._bump_version()
+
+    def _update_aggregates(self, month, month_table):
+        grouped = pa.table({
+            "date": pc.cast(month_table["upload_time"], pa.date32()),
+            "branch_code": month_table["branch_code"],
+            "phase": month_table["phase"],
+            "row": pa.array([1] * month_table.num_rows, pa.int64()),
+            "confidence": month_table["confidence"],
+        }).group_by(["date", "branch_code", "phase"]).aggregate([
+            ("row", "sum"), ("confidence", "count"), ("confidence", "sum"),
+        ])
+        new_aggregates = pa.table({
+            "date": grouped["date"],
+            "branch_code": grouped["branch_code"],
+            "phase": grouped["phase"],
+            "count": grouped["row_sum"],
+            "confidence_count": grouped["confidence_count"],
+            "confidence_sum": pc.fill_null(grouped["confidence_sum"], 0.0),
+        }, schema=AGGREGATE_SCHEMA)
+
+        os.makedirs(self.aggregates_dir, exist_ok=True)
+        path = os.path.join(self.aggregates_dir, f"month={month}.parquet")
+        if os.path.exists(path):
+            # รวมกับ aggregate เดิมของเดือนนี้ (ขนาดจำกัดแค่หนึ่งเดือน ไม่ต้องอ่านประวัติทั้งหมด)
+            merged = pa.concat_tables([pq.read_table(path, schema=AGGREGATE_SCHEMA), new_aggregates])
+            merged = merged.group_by(["date", "branch_code", "phase"]).aggregate([
+                ("count", "sum"), ("confidence_count", "sum"), ("confidence_sum", "sum"),
+            ])
+            new_aggregates = pa.table({
+                "date": merged["date"],
+                "branch_code": merged["branch_code"],
+                "phase": merged["phase"],
+                "count": merged["count_sum"],
+                "confidence_count": merged["confidence_count_sum"],
+                "confidence_sum": merged["confidence_sum_sum"],
+            }, schema=AGGREGATE_SCHEMA)
+        _write_atomic(new_aggregates, path)
+
+    def _bump_version(self):
+        version = self.write_version() + 1
+        tmp_path = self.version_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(str(version))
+        os.replace(tmp_path, self.version_path)
+        return version
+
+    def compact(self, month=None):
+        """
+        รวมไฟล์ย่อยของแต่ละเดือน (หรือเฉพาะเดือนที่ระบุ) ให้เหลือไฟล์เดียว
+        """
+        with file_lock(self.write_lock_path):
+            for partition_dir in sorted(glob.glob(os.path.join(self.rows_dir, "month=*"))):
+                if month is not None and not partition_dir.endswith(f"month={month}"):
+                    continue
+                parts = sorted(glob.glob(os.path.join(partition_dir, "part-*.parquet")))
+                if len(parts) < 2:
+                    continue
+                table = pa.concat_tables([pq.read_table(path, schema=ROW_SCHEMA) for path in parts])
+                _write_atomic(table, os.path.join(partition_dir, f"part-compacted-{uuid.uuid4().hex[:8]}.parquet"))
+                for path in parts:
+                    os.remove(path)
+            return self._bump_version()
+
+    # --- อ่าน ---
+
+    def write_version(self):
+        """
+        เลข version ที่เพิ่มขึ้นทุกครั้งที่มีการเขียน (0 = ยังไม่มีข้อมูล)
+        """
+        try:
+            with open(self.version_path, 'r', encoding='utf-8') as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def months(self):
+        """
+        รายชื่อเดือนที่มีข้อมูล (YYYY-MM)
+        """
+        paths = glob.glob(os.path.join(self.aggregates_dir, "month=*.parquet"))
+        return sorted(os.path.basename(path)[len("month="):-len(".parquet")] for path in paths)
+
+    def _rows_dataset(self):
+        return ds.dataset(self.rows_dir, format="parquet", schema=ROW_SCHEMA.append(pa.field("month", pa.string())),
+                          partitioning=MONTH_PARTITIONING)
+
+    def _rows_filter(self, start=None, end=None, branch_code=None):
+        expression = _month_filter(start, end)
+        if start is not None:
+            expression = _and(expression, ds.field("upload_time") >= pa.scalar(datetime.combine(start, datetime.min.time()), pa.timestamp("s")))
+        if end is not None:
+            expression = _and(expression, ds.field("upload_time") <= pa.scalar(datetime.combine(end, datetime.max.time()).replace(microsecond=0), pa.timestamp("s")))
+        if branch_code is not None:
+            expression = _and(expression, ds.field("branch_code") == normalize_branch_code(branch_code))
+        return expression
+
+    def read_rows(self, start=None, end=None, branch_code=None, columns=None):
+        """
+        อ่านแถวตามช่วงวันที่และสาขา (คืนค่าเป็น pyarrow.Table)
+        """
+        if not os.path.isdir(self.rows_dir):
+            return ROW_SCHEMA.empty_table()
+        columns = columns or ROW_SCHEMA.names
+        return self._rows_dataset().to_table(columns=columns, filter=self._rows_filter(start, end, branch_code))
+
+    def iter_batches(self, start=None, end=None, branch_code=None, columns=None, batch_size=10_000):
+        """
+        อ่านแถวแบบ streaming ทีละ RecordBatch โดยไม่โหลดประวัติทั้งหมดเข้าหน่วยความจำ
+        """
+        if not os.path.isdir(self.rows_dir):
+            return
+        columns = columns or ROW_SCHEMA.names
+        scanner = self._rows_dataset().scanner(
+            columns=columns, filter=self._rows_filter(start, end, branch_code), batch_size=batch_size
+        )
+        for batch in scanner.to_batches():
+            if batch.num_rows:
+                yield batch
+
+    def aggregates(self, start=None, end=None, branch_code=None):
+        """
+        อ่าน aggregate รายวัน × สาขา × phase ตามช่วงวันที่และสาขา
+        """
+        paths = [
+            os.path.join(self.aggregates_dir, f"month={month}.parquet") for month in self.months()
+            if (start is None or month >= start.strftime('%Y-%m')) and (end is None or month <= end.strftime('%Y-%m'))
+        ]
+        if not paths:
+            return AGGREGATE_SCHEMA.empty_table()
+        expression = None
+        if start is not None:
+            expression = _and(expression, ds.field("date") >= pa.scalar(start, pa.date32()))
+        if end is not None:
+            expression = _and(expression, ds.field("date") <= pa.scalar(end, pa.date32()))
+        if branch_code is not None:
+            expression = _and(expression, ds.field("branch_code") == normalize_branch_code(branch_code))
+        return ds.dataset(paths, format="parquet", schema=AGGREGATE_SCHEMA).to_table(filter=expression)
+
+    def import_excel(self, excel_path):
+        """
+        นำเข้าประวัติเดิมจาก data.xlsx (อ่านแบบ streaming ด้วย openpyxl read-only)
+        """
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(excel_path, read_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return 0
+            batch, imported = [], 0
+            for values in rows:
+                batch.append(dict(zip(header, values)))
+                if len(batch) >= 10_000:
+                    self.append(batch)
+                    imported += len(batch)
+                    batch = []
+            if batch:
+                self.append(batch)
+                imported += len(batch)
+            return imported
+        finally:
+            workbook.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", default=HISTORY_DIR)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    import_parser = subparsers.add_parser("import", help="นำเข้าประวัติจากไฟล์ Excel")
+    import_parser.add_argument("excel_path", nargs="?", default="data.xlsx")
+    compact_parser = subparsers.add_parser("compact", help="รวมไฟล์ย่อยของแต่ละเดือน")
+    compact_parser.add_argument("--month", help="เฉพาะเดือน YYYY-MM")
+    args = parser.parse_args()
+
+    store = HistoryStore(args.root)
+    if args.command == "import":
+        count = store.import_excel(args.excel_path)
+        print(f"✅ นำเข้า {count} แถวจาก {args.excel_path} (version {store.write_version()})")
+    elif args.command == "compact":
+        version = store.compact(args.month)
+        print(f"✅ รวมไฟล์เรียบร้อย (version {version})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
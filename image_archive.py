@@ -0,0 +1,458 @@
+#!/usr/bin/env python3
+"""
+คลังรูปภาพที่บันทึกจากแอป แบ่งโฟลเดอร์ตามรหัสสาขาและเดือน พร้อม manifest (SQLite) สำหรับค้นหา
+
+- รูปถูกเก็บที่ images/<รหัสสาขา>/<YYYY-MM>/<ชื่อไฟล์> แต่ละโฟลเดอร์จึงมีไฟล์ไม่มาก
+- images/manifest.sqlite เก็บแถวผลการตรวจสอบพร้อม path ของรูป มี index ที่ (branch_code, upload_time)
+  การค้นหา "รูปทั้งหมดของสาขา 1114" จึงไม่ต้อง scan โฟลเดอร์
+
+    python image_archive.py migrate --dry-run     # ดูว่าไฟล์ในโฟลเดอร์ images/ แบบเดิมจะถูกย้ายไปที่ไหน
+    python image_archive.py migrate               # ย้ายไฟล์และสร้าง manifest (ใช้ data.xlsx เติมข้อมูล)
+    python image_archive.py find 1114             # รายการรูปของสาขา 1114
+"""
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+
+ARCHIVE_DIR = "images"
+MANIFEST_NAME = "manifest.sqlite"
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+UNKNOWN_BRANCH = "_unknown"
+
+# คอลัมน์ของ manifest (ชื่อเดียวกับ history store) และชื่อคอลัมน์ที่ตรงกันใน data.xlsx
+MANIFEST_COLUMNS = {
+    'image_filename': ('Image Filename', 'Image'),
+    'branch_code': ('Branch code',),
+    'upload_time': ('Upload Time',),
+    'phase': ('Phase',),
+    'confidence': ('Confidence',),
+    'employee_name': ('Employee name',),
+    'sign_type': ('Sign type',),
+    'model_type': ('Model Type',),
+    'model_version': ('Model Version',),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS photos (
+    image_filename TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    branch_code TEXT,
+    upload_time TEXT,
+    phase TEXT,
+    confidence REAL,
+    employee_name TEXT,
+    sign_type TEXT,
+    model_type TEXT,
+    model_version TEXT
+);
+CREATE INDEX IF NOT EXISTS photos_branch_time ON photos (branch_code, upload_time);
+CREATE TABLE IF NOT EXISTS rescores (
+    image_filename TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    phase TEXT,
+    confidence REAL,
+    scored_at TEXT,
+    error TEXT,
+    PRIMARY KEY (image_filename, model_version)
+);
+CREATE TABLE IF NOT EXISTS branch_revisions (
+    branch_code TEXT PRIMARY KEY,
+    revision INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rescore_checkpoints (
+    model_version TEXT PRIMARY KEY,
+    last_filename TEXT,
+    updated_at TEXT
+);
+"""
+
+# ชื่อไฟล์ที่แอปสร้าง: <สาขา>_<phase>_<YYYY-MM-DD HH-MM-SS>_<ลำดับ>.png (ไฟล์รุ่นเก่าไม่มีเวลา)
+FILENAME_PATTERN = re.compile(
+    r"^(?P<branch>[^_]+)_(?P<phase>[^_]+)(?:_(?P<time>\d{4}-\d{2}-\d{2} \d{2}-\d{2}-\d{2}))?_\d+\.\w+$"
+)
+
+# RLock: add() ถือ lock อยู่แล้วเมื่อ _connect สร้าง schema ครั้งแรก
+_WRITE_LOCK = threading.RLock()
+# manifest ที่สร้าง schema และตั้ง WAL แล้วใน process นี้ (ทำครั้งเดียวต่อ path connection ต่อจากนั้นเปิดเปล่าๆ)
+_INITIALIZED_PATHS = set()
+
+
+def normalize_branch_code(value):
+    """
+    แปลงรหัสสาขาเป็น string (ไฟล์ Excel เก่าเก็บเป็นตัวเลขทศนิยม เช่น 1112.0)
+    """
+    if value is None or value != value:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip() or None
+
+
+def _format_time(value):
+    if value is None or value != value:
+        return None
+    if hasattr(value, "strftime"):
+        return value.strftime(TIME_FORMAT)
+    return str(value)
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def manifest_row(row):
+    """
+    แปลงแถวในรูปแบบของ data.xlsx (หรือชื่อคอลัมน์ของ manifest) เป็นแถวของ manifest
+    """
+    values = {}
+    for column, excel_names in MANIFEST_COLUMNS.items():
+        values[column] = next((row[name] for name in (column,) + excel_names if name in row), None)
+    values['branch_code'] = normalize_branch_code(values['branch_code'])
+    values['upload_time'] = _format_time(values['upload_time'])
+    values['confidence'] = _to_float(values['confidence'])
+    return values
+
+
+def _shard_name(value):
+    # ชื่อโฟลเดอร์ต้องไม่มีตัวคั่น path
+    return re.sub(r"[^\w.-]", "_", value) if value else UNKNOWN_BRANCH
+
+
+class ImageArchive:
+    """
+    อ่าน/เขียนรูปภาพและ manifest ในโฟลเดอร์ root (ค่าเริ่มต้น images/)
+    """
+
+    def __init__(self, root=ARCHIVE_DIR):
+        self.root = root
+        self.manifest_path = os.path.join(root, MANIFEST_NAME)
+
+    def _connect(self):
+        path = os.path.abspath(self.manifest_path)
+        if path not in _INITIALIZED_PATHS:
+            with _WRITE_LOCK:
+                if path not in _INITIALIZED_PATHS:
+                    os.makedirs(self.root, exist_ok=True)
+                    connection = sqlite3.connect(self.manifest_path, timeout=30)
+                    try:
+                        # WAL: ผู้อ่านไม่ต้องรอผู้เขียน (หลาย session ค้นประวัติขณะมีคนบันทึก) ค่านี้ถูกเก็บในไฟล์ฐานข้อมูล
+                        connection.execute("PRAGMA journal_mode=WAL")
+                        connection.executescript(SCHEMA)
+                    finally:
+                        connection.close()
+                    _INITIALIZED_PATHS.add(path)
+        connection = sqlite3.connect(self.manifest_path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def relative_path(self, branch_code, upload_time, image_filename):
+        """
+        path ของรูป (relative กับ root) ตามสาขาและเดือนที่อัปโหลด
+        """
+        month = str(upload_time)[:7] if upload_time else "unknown"
+        return os.path.join(_shard_name(normalize_branch_code(branch_code)), month, image_filename)
+
+    def absolute_path(self, relative_path):
+        return os.path.join(self.root, relative_path)
+
+    # --- เขียน ---
+
+    def save_photos(self, items):
+        """
+        บันทึกรูปและเพิ่มแถวใน manifest items คือ iterable ของ (ภาพ PIL หรือ bytes ของไฟล์รูปต้นฉบับ, แถวรูปแบบ data.xlsx)
+        bytes ถูกเขียนลงไฟล์ตามเดิมโดยไม่ encode ใหม่ คืนค่า list ของ path แบบ relative
+        """
+        rows = []
+        for image, row in items:
+            values = manifest_row(row)
+            values['path'] = self.relative_path(values['branch_code'], values['upload_time'], values['image_filename'])
+            path = self.absolute_path(values['path'])
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # เขียนไฟล์ชั่วคราวก่อนแล้วค่อยแทนที่ เพื่อไม่ให้มีรูปที่เขียนไม่เสร็จใน archive
+            tmp_path = path + ".tmp"
+            if isinstance(image, bytes):
+                with open(tmp_path, 'wb') as f:
+                    f.write(image)
+            else:
+                image.save(tmp_path, format=image.format or os.path.splitext(path)[1][1:].upper() or "PNG")
+            os.replace(tmp_path, path)
+            rows.append(values)
+        self.add(rows)
+        return [values['path'] for values in rows]
+
+    def add(self, rows):
+        """
+        เพิ่มหรือแทนที่แถวใน manifest (แต่ละแถวต้องมี path)
+        """
+        if not rows:
+            return
+        columns = ['path'] + list(MANIFEST_COLUMNS)
+        with _WRITE_LOCK:
+            connection = self._connect()
+            try:
+                with connection:
+                    connection.executemany(
+                        f"INSERT OR REPLACE INTO photos ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                        [tuple(row.get(column) for column in columns) for row in rows],
+                    )
+                    # เลขรุ่นของสาขาเพิ่มใน transaction เดียวกับแถว ทุก process/replica และ CLI จึงเห็นตรงกัน
+                    connection.executemany(
+                        "INSERT INTO branch_revisions (branch_code, revision) VALUES (?, 1) "
+                        "ON CONFLICT(branch_code) DO UPDATE SET revision = revision + 1",
+                        [(branch_code,) for branch_code in {row.get('branch_code') for row in rows}],
+                    )
+            finally:
+                connection.close()
+
+    # --- อ่าน ---
+
+    def photos_for_branch(self, branch_code, start=None, end=None, limit=None):
+        """
+        แถวของรูปทั้งหมดของสาขา (ล่าสุดก่อน) กรองช่วงเวลาได้ ใช้ index (branch_code, upload_time)
+        """
+        query = "SELECT * FROM photos WHERE branch_code = ?"
+        params = [normalize_branch_code(branch_code)]
+        if start is not None:
+            query += " AND upload_time >= ?"
+            params.append(_format_time(start))
+        if end is not None:
+            query += " AND upload_time <= ?"
+            params.append(_format_time(end))
+        query += " ORDER BY upload_time DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(int(limit))
+        connection = self._connect()
+        try:
+            return [dict(row) for row in connection.execute(query, params)]
+        finally:
+            connection.close()
+
+    # --- ผลวิเคราะห์ซ้ำด้วยโมเดลเวอร์ชันใหม่ (rescore.py) ---
+
+    def pending_rescore(self, model_version, after=None, limit=None, count=False):
+        """
+        แถวที่บันทึกด้วยโมเดลเวอร์ชันอื่นและยังไม่มีผลของ model_version เรียงตามชื่อไฟล์ (เริ่มหลัง after)
+        count=True คืนค่าจำนวนแถวแทน
+        """
+        query = f"""
+            SELECT {'COUNT(*)' if count else '*'} FROM photos AS p
+            WHERE (p.model_version IS NULL OR p.model_version != ?)
+              AND NOT EXISTS (SELECT 1 FROM rescores AS r
+                              WHERE r.image_filename = p.image_filename AND r.model_version = ?)
+        """
+        params = [model_version, model_version]
+        if count:
+            connection = self._connect()
+            try:
+                return connection.execute(query, params).fetchone()[0]
+            finally:
+                connection.close()
+        if after is not None:
+            query += " AND p.image_filename > ?"
+            params.append(after)
+        query += " ORDER BY p.image_filename"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(int(limit))
+        connection = self._connect()
+        try:
+            return [dict(row) for row in connection.execute(query, params)]
+        finally:
+            connection.close()
+
+    def add_rescores(self, model_version, rows):
+        """
+        บันทึกผลวิเคราะห์ซ้ำ (dict ที่มี image_filename, phase, confidence, error) และ checkpoint
+        เป็นชื่อไฟล์สุดท้ายของ batch ใน transaction เดียวกัน
+        """
+        if not rows:
+            return
+        scored_at = datetime.now().strftime(TIME_FORMAT)
+        with _WRITE_LOCK:
+            connection = self._connect()
+            try:
+                with connection:
+                    connection.executemany(
+                        "INSERT OR REPLACE INTO rescores (image_filename, model_version, phase, confidence, scored_at, error)"
+                        " VALUES (?, ?, ?, ?, ?, ?)",
+                        [(row['image_filename'], model_version, row.get('phase'), row.get('confidence'), scored_at,
+                          row.get('error')) for row in rows],
+                    )
+                    connection.execute(
+                        "INSERT OR REPLACE INTO rescore_checkpoints (model_version, last_filename, updated_at) VALUES (?, ?, ?)",
+                        (model_version, max(row['image_filename'] for row in rows), scored_at),
+                    )
+            finally:
+                connection.close()
+
+    def rescore_checkpoint(self, model_version):
+        """
+        ชื่อไฟล์สุดท้ายที่วิเคราะห์ซ้ำด้วย model_version แล้ว (None ถ้ายังไม่เคยเริ่ม)
+        """
+        connection = self._connect()
+        try:
+            row = connection.execute(
+                "SELECT last_filename FROM rescore_checkpoints WHERE model_version = ?", (model_version,)
+            ).fetchone()
+            return row[0] if row else None
+        finally:
+            connection.close()
+
+    def rescore_comparison(self, model_version):
+        """
+        ผลเดิมเทียบกับผลของ model_version ทีละรูป
+        """
+        connection = self._connect()
+        try:
+            return [dict(row) for row in connection.execute(
+                """
+                SELECT p.image_filename, p.branch_code, p.upload_time, p.model_version AS old_model_version,
+                       p.phase AS old_phase, p.confidence AS old_confidence,
+                       r.model_version AS new_model_version, r.phase AS new_phase, r.confidence AS new_confidence, r.error
+                FROM rescores AS r JOIN photos AS p ON p.image_filename = r.image_filename
+                WHERE r.model_version = ?
+                ORDER BY p.image_filename
+                """, (model_version,))]
+        finally:
+            connection.close()
+
+    def find(self, image_filename):
+        """
+        แถวของรูปจากชื่อไฟล์ (None ถ้าไม่พบ)
+        """
+        connection = self._connect()
+        try:
+            row = connection.execute("SELECT * FROM photos WHERE image_filename = ?", (image_filename,)).fetchone()
+            return dict(row) if row else None
+        finally:
+            connection.close()
+
+    def branch_revision(self, branch_code):
+        """
+        เลขรุ่นของข้อมูลสาขา (เพิ่มทุกครั้งที่บันทึกรูปของสาขานี้ ใช้เป็น key ของ cache ประวัติสาขา)
+        """
+        connection = self._connect()
+        try:
+            row = connection.execute(
+                "SELECT revision FROM branch_revisions WHERE branch_code = ?", (normalize_branch_code(branch_code),)
+            ).fetchone()
+            return row[0] if row else 0
+        finally:
+            connection.close()
+
+    def count(self):
+        connection = self._connect()
+        try:
+            return connection.execute("SELECT COUNT(*) FROM photos").fetchone()[0]
+        finally:
+            connection.close()
+
+
+# --- ย้ายโฟลเดอร์แบบเดิม ---
+
+def read_excel_rows(excel_path):
+    """
+    แถวใน data.xlsx แยกตามชื่อไฟล์รูป (ใช้เติมข้อมูลตอนย้ายไฟล์เดิม)
+    """
+    if not excel_path or not os.path.exists(excel_path):
+        return {}
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(excel_path, read_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None) or ()
+        by_filename = {}
+        for values in rows:
+            row = manifest_row(dict(zip(header, values)))
+            if row['image_filename']:
+                by_filename[row['image_filename']] = row
+        return by_filename
+    finally:
+        workbook.close()
+
+
+def plan_migration(root, excel_rows):
+    """
+    รายการ (ชื่อไฟล์, แถวของ manifest) สำหรับไฟล์รูปที่อยู่ชั้นบนสุดของ root
+    """
+    plan = []
+    for file_name in sorted(os.listdir(root)):
+        path = os.path.join(root, file_name)
+        if not os.path.isfile(path) or file_name == MANIFEST_NAME or file_name.startswith(MANIFEST_NAME):
+            continue
+        row = dict(excel_rows.get(file_name) or manifest_row({'image_filename': file_name}))
+        match = FILENAME_PATTERN.match(file_name)
+        if match:
+            row['branch_code'] = row['branch_code'] or match.group('branch')
+            row['phase'] = row['phase'] or match.group('phase')
+            if not row['upload_time'] and match.group('time'):
+                row['upload_time'] = datetime.strptime(match.group('time'), '%Y-%m-%d %H-%M-%S').strftime(TIME_FORMAT)
+        if not row['upload_time']:
+            # ไม่มีเวลาในชื่อไฟล์และใน Excel ใช้เวลาแก้ไขไฟล์แทน
+            row['upload_time'] = datetime.fromtimestamp(os.path.getmtime(path)).strftime(TIME_FORMAT)
+        plan.append((file_name, row))
+    return plan
+
+
+def migrate(archive, excel_path=None, dry_run=False):
+    """
+    ย้ายไฟล์รูปจากโฟลเดอร์แบบเดิม (ไฟล์ทั้งหมดอยู่ชั้นเดียว) ไปยังโครงสร้างแบบแบ่งโฟลเดอร์ และเพิ่มลง manifest
+    """
+    plan = plan_migration(archive.root, read_excel_rows(excel_path))
+    rows = []
+    for file_name, row in plan:
+        row['path'] = archive.relative_path(row['branch_code'], row['upload_time'], file_name)
+        if dry_run:
+            print(f"   {file_name} → {row['path']}")
+            continue
+        target = archive.absolute_path(row['path'])
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(os.path.join(archive.root, file_name), target)
+        rows.append(row)
+        # บันทึก manifest เป็นช่วงๆ เพื่อให้รันต่อได้ถ้าถูกขัดจังหวะ (ไฟล์ที่ย้ายแล้วจะไม่อยู่ชั้นบนสุดอีก)
+        if len(rows) >= 1000:
+            archive.add(rows)
+            rows = []
+    archive.add(rows)
+    return len(plan)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", default=ARCHIVE_DIR)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = subparsers.add_parser("migrate", help="ย้ายไฟล์ใน images/ แบบเดิมเข้าโครงสร้างใหม่")
+    migrate_parser.add_argument("--excel", default="data.xlsx", help="ไฟล์ Excel สำหรับเติมข้อมูลของแต่ละรูป")
+    migrate_parser.add_argument("--dry-run", action="store_true")
+    find_parser = subparsers.add_parser("find", help="รายการรูปของสาขา")
+    find_parser.add_argument("branch_code")
+    find_parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args()
+
+    archive = ImageArchive(args.root)
+    if args.command == "migrate":
+        count = migrate(archive, args.excel, args.dry_run)
+        if args.dry_run:
+            print(f"✅ จะย้าย {count} ไฟล์")
+        else:
+            print(f"✅ ย้าย {count} ไฟล์ · manifest มี {archive.count()} รูป")
+        return 0
+
+    rows = archive.photos_for_branch(args.branch_code, limit=args.limit)
+    for row in rows:
+        print(f"{row['upload_time']}  {row['phase'] or '-':<4} {archive.absolute_path(row['path'])}")
+    print(f"📷 {len(rows)} รูปของสาขา {args.branch_code}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
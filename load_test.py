@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+ทดสอบโหลดของแอปด้วย session พร้อมกันหลาย session บนเครื่องเดียว
+
+แต่ละ session จำลองด้วย streamlit.testing.v1.AppTest (headless ไม่ต้องเปิดเบราว์เซอร์):
+กรอกข้อมูล → อัปโหลดรูปจริงจาก Base/data → รอผลการวิเคราะห์ → กดบันทึก
+ทุก session รันใน process เดียวกันจึงใช้ st.cache_resource (โมเดล) ร่วมกันเหมือนผู้ใช้จริงบน replica เดียว
+การบันทึกทั้งหมดเขียนลงโฟลเดอร์ชั่วคราว ไม่แตะ data.xlsx / images/ ของจริง
+
+    python load_test.py --sessions 1,2,4,8 --images 5
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from dataset_cache import DATA_DIR, IMAGE_EXTENSIONS
+from memory_report import current_rss_bytes
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+SAVE_BUTTON_LABEL = "💾 บันทึกและส่งข้อมูล"
+SAVE_SUCCESS_TEXT = "บันทึกข้อมูลเรียบร้อยแล้ว"
+
+
+class RssSampler:
+    """
+    สุ่มวัด RSS เป็นระยะใน background เพื่อหาค่าสูงสุดระหว่างการทดสอบแต่ละระดับ
+    """
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self.peak = max(self.peak, current_rss_bytes())
+            self._stop_event.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = current_rss_bytes()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop_event.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss_bytes())
+
+
+def load_photos(data_dir, limit=None):
+    """
+    อ่านรูปจริงเป็น (ชื่อไฟล์, bytes, mime type) สำหรับส่งให้ file_uploader
+    """
+    paths = sorted(p for p in glob.glob(os.path.join(data_dir, "*", "*")) if p.lower().endswith(IMAGE_EXTENSIONS))
+    photos = []
+    for path in paths[:limit]:
+        with open(path, 'rb') as f:
+            mime_type = "image/png" if path.lower().endswith(".png") else "image/jpeg"
+            photos.append((os.path.basename(path), f.read(), mime_type))
+    return photos
+
+
+def _by_label(elements, label):
+    return next(element for element in elements if element.label == label)
+
+
+def run_session(app_path, photos, session_id, timeout):
+    """
+    จำลองผู้ใช้หนึ่งคน คืนค่าเวลา time-to-result, เวลาบันทึก และข้อผิดพลาด (ถ้ามี)
+    """
+    from streamlit.testing.v1 import AppTest
+
+    result = {"session": session_id, "time_to_result": None, "save_latency": None, "error": None}
+    try:
+        at = AppTest.from_file(app_path, default_timeout=timeout)
+        at.run()
+        _by_label(at.text_input, "ชื่อพนักงาน:").set_value(f"load-test-{session_id}")
+        _by_label(at.text_input, "รหัสสาขา:").set_value(str(90000 + session_id))
+        _by_label(at.text_input, "ประเภทป้าย:").set_value("ป้ายไฟ")
+        at.file_uploader[0].set_value(photos)
+
+        start = time.perf_counter()
+        at.run()
+        result["time_to_result"] = time.perf_counter() - start
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+
+        start = time.perf_counter()
+        _by_label(at.button, SAVE_BUTTON_LABEL).click()
+        at.run()
+        result["save_latency"] = time.perf_counter() - start
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+        if not any(SAVE_SUCCESS_TEXT in element.value for element in at.success):
+            errors = [element.value for element in at.error] or ["ไม่พบข้อความบันทึกสำเร็จ"]
+            raise RuntimeError(errors[0])
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def percentiles(values):
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99)}
+
+
+def run_level(app_path, photo_pool, sessions, images_per_session, timeout, seed):
+    """
+    รัน session พร้อมกัน sessions ตัว และสรุป latency, peak RSS และจำนวนที่ล้มเหลว
+    """
+    rng = random.Random(seed)
+    batches = [rng.sample(photo_pool, min(images_per_session, len(photo_pool))) for _ in range(sessions)]
+    with RssSampler() as sampler, ThreadPoolExecutor(max_workers=sessions) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(lambda args: run_session(app_path, args[1], args[0], timeout), enumerate(batches)))
+        wall_time = time.perf_counter() - start
+
+    return {
+        "sessions": sessions,
+        "images_per_session": images_per_session,
+        "wall_time": wall_time,
+        "time_to_result": percentiles([r["time_to_result"] for r in results if r["time_to_result"] is not None]),
+        "save_latency": percentiles([r["save_latency"] for r in results if r["save_latency"] is not None]),
+        "peak_rss_mb": sampler.peak / (1024 * 1024),
+        "failures": sum(1 for r in results if r["error"]),
+        "errors": sorted({r["error"] for r in results if r["error"]}),
+    }
+
+
+def format_seconds(value):
+    return "-" if value is None else f"{value:.2f}s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", default="maincai.py")
+    parser.add_argument("--sessions", default="1,2,4,8", help="จำนวน session พร้อมกันแต่ละระดับ คั่นด้วยจุลภาค")
+    parser.add_argument("--images", type=int, default=5, help="จำนวนรูปต่อ session")
+    parser.add_argument("--data", default=DATA_DIR)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="บันทึกผลเป็นไฟล์ JSON")
+    args = parser.parse_args()
+
+    try:
+        from streamlit.testing.v1.element_tree import FileUploader
+        FileUploader.set_value
+    except (ImportError, AttributeError):
+        print("❌ ต้องใช้ Streamlit เวอร์ชันที่ AppTest รองรับ file_uploader.set_value")
+        return 2
+
+    # ปิด "magic" ของ Streamlit: การ ast.parse สคริปต์พร้อมกันหลาย thread ใน Python 3.11 อาจล้มเหลว
+    # (แอปไม่ได้ใช้ magic อยู่แล้ว จึงไม่กระทบผลการทดสอบ)
+    from streamlit import config
+    config.set_option("runner.magicEnabled", False)
+    # AppTest ส่งค่าให้ custom component (photo_uploader) ไม่ได้ จึงอัปโหลดผ่าน st.file_uploader แทน
+    os.environ["PM_AI_CLIENT_RESIZE"] = "false"
+
+    app_path = os.path.join(APP_DIR, args.app)
+    photo_pool = load_photos(os.path.join(APP_DIR, args.data))
+    if not photo_pool:
+        print(f"❌ ไม่พบรูปภาพใน {args.data}")
+        return 2
+    levels = [int(level) for level in args.sessions.split(",")]
+
+    # ทำงานในโฟลเดอร์ชั่วคราว เพื่อให้ data.xlsx, images/ และ history/ ของการทดสอบไม่ปนกับของจริง
+    workspace = tempfile.mkdtemp(prefix="pm-ai-load-test-")
+    for name in ("model", "static", "settings.json"):
+        if os.path.exists(os.path.join(APP_DIR, name)):
+            os.symlink(os.path.join(APP_DIR, name), os.path.join(workspace, name))
+    os.chdir(workspace)
+
+    try:
+        # warm-up หนึ่ง session เพื่อให้โมเดลถูกโหลดเข้า cache ก่อนเริ่มจับเวลา
+        warmup = run_session(app_path, photo_pool[:1], -1, args.timeout)
+        if warmup["error"]:
+            print(f"❌ warm-up ล้มเหลว: {warmup['error']}")
+            return 1
+
+        print(f"{'sessions':>8} {'ttr p50':>8} {'ttr p95':>8} {'ttr p99':>8} {'save p50':>9} {'save p95':>9} "
+              f"{'save p99':>9} {'peak RSS':>9} {'failures':>9}")
+        reports = []
+        for level in levels:
+            report = run_level(app_path, photo_pool, level, args.images, args.timeout, args.seed + level)
+            reports.append(report)
+            ttr, save = report["time_to_result"], report["save_latency"]
+            print(f"{level:>8} {format_seconds(ttr['p50']):>8} {format_seconds(ttr['p95']):>8} {format_seconds(ttr['p99']):>8} "
+                  f"{format_seconds(save['p50']):>9} {format_seconds(save['p95']):>9} {format_seconds(save['p99']):>9} "
+                  f"{report['peak_rss_mb']:>7.0f}MB {report['failures']:>9}")
+            for error in report["errors"]:
+                print(f"         ⚠️ {error}")
+    finally:
+        os.chdir(APP_DIR)
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, indent=2, ensure_ascii=False)
+    return 1 if any(report["failures"] for report in reports) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
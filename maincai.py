@@ -1,260 +1,240 @@
 import streamlit as st
 from PIL import Image, ImageOps
 import numpy as np
-import pandas as pd
 import os
+import zipfile
+from contextlib import contextmanager
 from datetime import datetime
-import time
-import pickle
-import joblib
+from functools import partial
+
+from admission import AdmissionRejected, file_lock, get_controller
+from backends import (
+    RULE_CLASS_NAMES, backend_input_size, backend_model_files, below_agreement_gate, classify_batch, load_backend,
+    loaded_model_files, preprocess_image
+)
+from drift_monitor import record_prediction
+from explain import explain, image_hash
+from image_archive import ImageArchive, normalize_branch_code
+from memory_report import (
+    enable_tracemalloc, memory_stage, record_session_usage, set_model_source, start_memory_logger
+)
+from model_registry import ModelRegistry, ModelSnapshot
+from photo_uploader import photo_uploader
+from quality_gate import assess_quality, quality_thresholds
+from rerun_profiler import profile_rerun, rerun_section
+from runtime_profile import apply_runtime_profile, detect_cpu_quota
+from settings import get_setting
+from static_assets import logo_src, page_css
+from video_inspection import VIDEO_TYPES, VideoUnavailable, classify_video, save_upload_to_temp
+from zip_upload import classify_zip, list_image_members, open_zip, read_member
 
 # --- 1. ฟังก์ชันหลักในการทำงาน (Lightweight Version) ---
 
-@st.cache_resource
-def load_lightweight_model():
+def load_model_bundle(backend):
     """
-    โหลดโมเดลแบบ Lightweight หรือใช้ fallback method
+    โหลดโมเดลตาม backend ที่ระบุ
+    (ไม่เรียกคำสั่ง st.* เพราะอาจถูกเรียกจาก background thread ของ Model Registry)
     """
+    # ตั้งจำนวน thread / oneDNN / CPU affinity ก่อน TensorFlow เริ่มทำงาน (ทำครั้งเดียวต่อ process)
+    apply_runtime_profile()
     try:
-        # ลองโหลด TensorFlow Lite หรือ model อื่นๆ
-        try:
-            import tensorflow as tf
-            if tf.__version__ >= "2.15.0":
-                # ใช้ TensorFlow 2.15+ ที่ support Python 3.13
-                model = tf.keras.models.load_model("model/keras_model.h5")
-                st.success("✅ โหลดโมเดล TensorFlow สำเร็จ!")
-                return model, ["P1", "P2", "P3", "P4"], "tensorflow"
-        except ImportError:
-            pass
-        
-        # Fallback: ใช้ model ที่แปลงเป็น pickle หรือ joblib
-        try:
-            if os.path.exists("model/model_lightweight.pkl"):
-                with open("model/model_lightweight.pkl", 'rb') as f:
-                    model = pickle.load(f)
-                st.success("✅ โหลดโมเดล Lightweight สำเร็จ!")
-                return model, ["P1", "P2", "P3", "P4"], "pickle"
-        except:
-            pass
-            
-        # Fallback: ใช้ joblib
-        try:
-            if os.path.exists("model/model_lightweight.joblib"):
-                model = joblib.load("model/model_lightweight.joblib")
-                st.success("✅ โหลดโมเดล Joblib สำเร็จ!")
-                return model, ["P1", "P2", "P3", "P4"], "joblib"
-        except:
-            pass
-        
+        return load_backend(backend)
+    except Exception:
         # Final fallback: ใช้ simple ML model
-        st.warning("⚠️ ไม่สามารถโหลดโมเดล AI ได้ ใช้ Simple ML Algorithm แทน")
-        return None, ["P1", "P2", "P3", "P4"], "simple"
-        
-    except Exception as e:
-        st.error(f"🔴 เกิดข้อผิดพลาดในการโหลดโมเดล: {e}")
-        return None, ["P1", "P2", "P3", "P4"], "simple"
+        return load_backend("simple")
 
-def classify_image_lightweight(image, model, class_names, model_type):
+def warmup_model(model, class_names, model_type):
     """
-    ฟังก์ชันสำหรับวิเคราะห์ภาพแบบ Lightweight
+    รันการทำนายหนึ่งครั้งกับภาพว่าง เพื่อให้โมเดลพร้อมใช้งานก่อนสลับเวอร์ชัน
     """
-    # ปรับขนาดภาพให้เป็น (224, 224)
-    image = ImageOps.fit(image, (224, 224), Image.Resampling.LANCZOS)
-    image_array = np.asarray(image)
-    
-    # ทำให้ค่าสีเป็นปกติ (Normalize)
-    normalized_image_array = (image_array.astype(np.float32) / 127.5) - 1
-    
-    if model_type == "tensorflow" and model is not None:
-        # ใช้ TensorFlow model
-        data = np.ndarray(shape=(1, 224, 224, 3), dtype=np.float32)
-        data[0] = normalized_image_array
-        prediction = model.predict(data, verbose=0)
-        index = np.argmax(prediction)
-        confidence_score = prediction[0][index]
-        
-    elif model_type in ["pickle", "joblib"] and model is not None:
-        # ใช้ Lightweight model
-        # Flatten image for simple models
-        flattened = normalized_image_array.flatten().reshape(1, -1)
-        prediction = model.predict_proba(flattened)[0]
-        index = np.argmax(prediction)
-        confidence_score = prediction[index]
-        
-    else:
-        # Simple ML algorithm (fallback)
-        # ใช้ feature engineering แบบง่าย
-        features = extract_simple_features(normalized_image_array)
-        index, confidence_score = simple_classifier(features)
-    
-    class_name = class_names[index]
-    return class_name, confidence_score
+    classify_image_lightweight(Image.new('RGB', (224, 224)), model, class_names, model_type)
 
-def extract_simple_features(image_array):
+@st.cache_resource
+def get_model_registry(backend):
     """
-    สกัด features แบบง่ายจากภาพ
+    สร้าง Model Registry หนึ่งตัวต่อ backend ต่อ process และเริ่มเฝ้าดูโฟลเดอร์ model/
+    (เฝ้าดูไฟล์ของทุก backend ใน spec แต่เวอร์ชันคำนวณจากไฟล์ของ backend ที่โหลดได้เท่านั้น)
     """
-    # คำนวณ features ต่างๆ
-    features = {
-        'mean_brightness': np.mean(image_array),
-        'std_brightness': np.std(image_array),
-        'mean_red': np.mean(image_array[:, :, 0]),
-        'mean_green': np.mean(image_array[:, :, 1]),
-        'mean_blue': np.mean(image_array[:, :, 2]),
-        'contrast': np.max(image_array) - np.min(image_array),
-        'entropy': calculate_entropy(image_array)
-    }
-    return features
+    model_files = backend_model_files(backend)
+    registry = ModelRegistry(partial(load_model_bundle, backend), warmup=warmup_model, file_names=model_files,
+                             version_files=loaded_model_files)
+    registry.load_initial()
+    registry.start_watching()
+    return registry
 
-def calculate_entropy(image_array):
+@st.cache_resource
+def start_memory_monitor(backend):
+    """
+    เริ่ม tracemalloc และ log สรุปหน่วยความจำเป็นระยะ (หนึ่งครั้งต่อ process ตามที่ตั้งค่าไว้)
     """
-    คำนวณ entropy ของภาพ
+    set_model_source(lambda: get_model_registry(backend).current().model)
+    if get_setting("memory_tracemalloc"):
+        enable_tracemalloc()
+    interval = float(get_setting("memory_log_interval") or 0)
+    if interval > 0:
+        start_memory_logger(interval)
+    return True
+
+def current_session_id():
     """
-    hist, _ = np.histogram(image_array.flatten(), bins=256, range=[-1, 1])
-    hist = hist[hist > 0]
-    prob = hist / hist.sum()
-    entropy = -np.sum(prob * np.log2(prob))
-    return entropy
+    id ของ session ปัจจุบัน (None ถ้าไม่ได้รันผ่าน Streamlit)
+    """
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else None
+
 
-def simple_classifier(features):
+@contextmanager
+def stage(name):
     """
-    Simple classifier ใช้ features แบบง่าย
+    ครอบขั้นตอนของ pipeline: วัดหน่วยความจำ (memory_report) และเวลา (rerun_profiler) พร้อมกัน
     """
-    # ใช้ rules-based classification
-    brightness = features['mean_brightness']
-    contrast = features['contrast']
-    entropy = features['entropy']
-    
-    # Classification rules
-    if brightness < -0.5 and contrast < 0.5:
-        index = 0  # P1 - ภาพมืดและ contrast ต่ำ
-    elif brightness < 0 and entropy < 4:
-        index = 1  # P2 - ภาพมืดปานกลาง
-    elif brightness > 0 and contrast > 1.0:
-        index = 2  # P3 - ภาพสว่างและ contrast สูง
-    else:
-        index = 3  # P4 - ภาพสว่างมาก
-    
-    # Confidence based on feature strength
-    confidence = min(0.95, 0.7 + abs(brightness) * 0.2 + contrast * 0.1)
-    
-    return index, confidence
+    with memory_stage(name), rerun_section(name):
+        yield
+
+def note_rerun_trigger(widget):
+    """
+    callback ของ widget: จดไว้ว่า widget ไหนทำให้สคริปต์รันซ้ำ (callback ถูกเรียกก่อนรอบถัดไปเริ่ม)
+    """
+    st.session_state['_rerun_trigger'] = widget
+
+def pop_rerun_trigger():
+    """
+    widget ที่กระตุ้นรอบนี้ ("initial" = รอบแรกของ session, "other" = รีเฟรชหรือ widget ที่ไม่ได้ติดตาม)
+    """
+    trigger = st.session_state.pop('_rerun_trigger', None)
+    if trigger is None:
+        trigger = "other" if st.session_state.get('_has_run') else "initial"
+    st.session_state['_has_run'] = True
+    return trigger
+
+def load_lightweight_model(backend):
+    """
+    คืนโมเดลเวอร์ชันที่กำลังให้บริการ (model, class_names, model_type, version)
+    """
+    try:
+        return get_model_registry(backend).current()
+    except Exception as e:
+        st.error(f"🔴 เกิดข้อผิดพลาดในการโหลดโมเดล: {e}")
+        return ModelSnapshot(None, list(RULE_CLASS_NAMES), "simple", None)
+
+def classify_image_lightweight(image, model, class_names, model_type):
+    """
+    ฟังก์ชันสำหรับวิเคราะห์ภาพแบบ Lightweight
+    """
+    # ปรับขนาดภาพตาม input ของ backend (224x224 หรือเล็กกว่าสำหรับ student) แล้วส่งให้ classifier
+    return classify_array(preprocess_image(image, backend_input_size(model_type)), model, class_names, model_type)
+
+def classify_array(image_array, model, class_names, model_type):
+    """
+    วิเคราะห์ภาพที่ preprocess แล้ว (uint8 ขนาด input ของ backend)
+    """
+    prediction = classify_batch(model_type, model, image_array[np.newaxis])[0]
+    index = np.argmax(prediction)
+    confidence_score = prediction[index]
+
+    class_name = class_names[index]
+    return class_name, confidence_score
 
 def save_to_excel(data_list, excel_path):
     """
     บันทึกข้อมูลลงในไฟล์ Excel
+    อ่าน-แก้-เขียนทั้งไฟล์ภายใต้ lock ของไฟล์ และเขียนไฟล์ชั่วคราวก่อนแทนที่ ผู้ใช้ที่บันทึกพร้อมกัน
+    จึงไม่ทับแถวของกันและกัน และไม่มีใครอ่านเจอไฟล์ที่เขียนไม่เสร็จ ("File is not a zip file")
     """
+    # import pandas เฉพาะตอนบันทึก เพื่อไม่ให้การเปิดหน้าแอปครั้งแรกช้า
+    import pandas as pd
+
     df = pd.DataFrame(data_list)
     try:
-        if os.path.exists(excel_path):
-            existing_df = pd.read_excel(excel_path)
-            updated_df = pd.concat([existing_df, df], ignore_index=True)
-        else:
-            updated_df = df
+        with file_lock(excel_path):
+            if os.path.exists(excel_path):
+                existing_df = pd.read_excel(excel_path)
+                updated_df = pd.concat([existing_df, df], ignore_index=True)
+            else:
+                updated_df = df
+
+            tmp_path = f"{excel_path}.tmp.xlsx"
+            updated_df.to_excel(tmp_path, index=False, engine='openpyxl')
+            os.replace(tmp_path, excel_path)
+        return True, None
+    except Exception as e:
+        return False, str(e)
 
-        updated_df.to_excel(excel_path, index=False, engine='openpyxl')
+def save_to_history(data_list):
+    """
+    บันทึกข้อมูลลงใน history store (Parquet) ที่หน้า Dashboard ใช้
+    """
+    # import pyarrow เฉพาะตอนบันทึก เหมือนกับ pandas
+    from history_store import HistoryStore
+
+    try:
+        HistoryStore().append(data_list)
         return True, None
     except Exception as e:
         return False, str(e)
 
-# --- 2. ฟังก์ชันเกี่ยวกับการแสดงผล (UI) ---
+BUSY_MESSAGE = "⏳ ขณะนี้มีผู้ใช้งานพร้อมกันจำนวนมาก กรุณาลองใหม่อีกครั้งในอีกสักครู่"
 
-def apply_custom_css():
+def inference_controller():
     """
-    ใช้ CSS เพื่อปรับแต่งหน้าตาแอปพลิเคชัน
+    slot สำหรับเรียกโมเดลที่ใช้ร่วมกันทุก session ("auto" = ครึ่งหนึ่งของ CPU เพราะการเรียกแต่ละครั้งใช้หลาย thread อยู่แล้ว)
     """
-    st.markdown("""
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Mitr:wght@300;400;500;600&display=swap');
+    slots = get_setting("inference_slots")
+    if slots == "auto":
+        slots = max(1, detect_cpu_quota() // 2)
+    return get_controller("inference", slots, get_setting("admission_max_queue"), get_setting("admission_max_wait"))
 
-    html, body, [class*="st-"], input, textarea, button, select {
-        font-family: 'Mitr', sans-serif;
-    }
+def save_controller():
+    """
+    slot สำหรับบันทึกรูปและแถวข้อมูล (data.xlsx, manifest, history store)
+    """
+    return get_controller("save", get_setting("save_slots"), get_setting("admission_max_queue"),
+                          get_setting("admission_max_wait"))
+
+def queued_slot(controller, placeholder):
+    """
+    factory ของ slot ที่แสดงลำดับคิวของผู้ใช้ใน placeholder ระหว่างรอ
+    """
+    @contextmanager
+    def slot():
+        on_wait = lambda position: placeholder.info(f"⏳ มีผู้ใช้งานพร้อมกันหลายคน กำลังรอคิว: ลำดับที่ {position}")
+        with controller.slot(on_wait=on_wait) as waited:
+            if waited:
+                placeholder.empty()
+            yield
+    return slot
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def load_explanation(image_key, model_version, class_name, _image_array, _snapshot):
+    """
+    heatmap ของภาพหนึ่งภาพ แคชตาม hash ของภาพและเวอร์ชันโมเดล (ดูซ้ำหรือดูจาก session อื่นไม่ต้องคำนวณใหม่)
+    ใช้ slot เดียวกับการทำนาย เพราะ Grad-CAM / occlusion ใช้ CPU พอๆ กับการทำนายหลายครั้ง
+    """
+    with inference_controller().slot():
+        return explain(_snapshot.model_type, _snapshot.model, _image_array, _snapshot.class_names.index(class_name))
 
-    :root {
-        --seven-green: #008343;
-        --seven-red: #EE1C25;
-        --seven-orange: #F36F21;
-        --background-color: #F0F2F6;
-        --text-color: #333333;
-        --card-bg: #FFFFFF;
-    }
+# --- 2. ฟังก์ชันเกี่ยวกับการแสดงผล (UI) ---
 
-    .stApp {
-        background-color: var(--background-color);
-    }
-    
-    h1, h2 {
-        color: var(--seven-green);
-    }
-
-    .input-container {
-        background-color: var(--card-bg);
-        border-radius: 12px;
-        padding: 1.5rem 2rem;
-        margin-bottom: 2rem;
-        box-shadow: 0 4px 10px rgba(0,0,0,0.05);
-        border: 1px solid #E0E0E0;
-    }
-
-    .stButton > button {
-        background-color: var(--seven-green);
-        color: white;
-        font-weight: 600;
-        border-radius: 8px;
-        border: none;
-        padding: 0.75rem 1rem;
-        transition: background-color 0.3s, transform 0.2s;
-        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-        width: 100%;
-    }
-    .stButton > button:hover {
-        background-color: #006a36;
-        transform: scale(1.02);
-    }
-
-    .result-card {
-        background-color: var(--card-bg);
-        border-radius: 12px;
-        padding: 1rem;
-        text-align: center;
-        margin-bottom: 1rem;
-        box-shadow: 0 2px 5px rgba(0,0,0,0.05);
-    }
-    .result-card img {
-        border-radius: 8px;
-        margin-bottom: 0.75rem;
-        max-height: 200px;
-    }
-    
-    .stProgress > div > div > div > div {
-        background-color: var(--seven-orange);
-    }
-    
-    [data-testid="stAlert"] { border-radius: 8px; }
-    [data-testid="stSuccess"] { border-left: 5px solid var(--seven-green); }
-    [data-testid="stError"] { border-left: 5px solid var(--seven-red); }
-
-    .model-info {
-        background-color: #e3f2fd;
-        border: 1px solid #2196f3;
-        border-radius: 8px;
-        padding: 1rem;
-        margin-bottom: 1rem;
-        color: #1976d2;
-    }
-
-    </style>
-    """, unsafe_allow_html=True)
+def apply_custom_css():
+    """
+    ใช้ CSS เพื่อปรับแต่งหน้าตาแอปพลิเคชัน (static/style.css และฟอนต์ในเครื่อง สร้างครั้งเดียวต่อ process)
+    """
+    st.markdown(page_css(), unsafe_allow_html=True)
 
 def display_header():
     """
     แสดงโลโก้และหัวข้อของแอปพลิเคชัน
     """
-    st.markdown(
-        '<div style="text-align: center"><img src="https://upload.wikimedia.org/wikipedia/commons/thumb/4/40/7-eleven_logo.svg/791px-7-eleven_logo.svg.png" alt="7-Eleven Logo" width="150"></div>',
-        unsafe_allow_html=True
-    )
+    logo = logo_src()
+    if logo:
+        st.markdown(
+            f'<div style="text-align: center"><img src="{logo}" alt="7-Eleven Logo" width="150"></div>',
+            unsafe_allow_html=True
+        )
+    else:
+        st.markdown('<div class="brand-wordmark">7-ELEVEN</div>', unsafe_allow_html=True)
     st.markdown(
         '<h1 style="text-align: center; color: var(--seven-green);">AI for Preventive Maintenance</h1>',
         unsafe_allow_html=True
@@ -262,65 +242,389 @@ def display_header():
     st.markdown('<p style="text-align: center;">ระบบตรวจสอบป้ายสัญลักษณ์ 7-ELEVEN ด้วยภาพถ่าย</p>', unsafe_allow_html=True)
     st.markdown("---")
 
-def display_model_info(model_type):
+def display_model_info(model_type, model_version=None, model=None):
     """
     แสดงข้อมูลเกี่ยวกับโมเดลที่ใช้
     """
-    if model_type == "tensorflow":
+    version_text = f" · <strong>Version:</strong> <code>{model_version}</code>" if model_version else ""
+    if model_type == "cascade":
+        # แสดงสัดส่วนภาพที่แต่ละ tier ตัดสิน เพื่อใช้ปรับ threshold
+        share_text = " → ".join(
+            f"{tier} {share:.0%}" for tier, share in model.resolved_share().items()
+        )
         st.markdown(
-            '<div class="model-info">🤖 <strong>AI Model:</strong> TensorFlow Deep Learning Model (Real AI)</div>',
+            f'<div class="model-info">🪜 <strong>AI Model:</strong> Confidence Cascade ({share_text}){version_text}</div>',
             unsafe_allow_html=True
         )
-    elif model_type in ["pickle", "joblib"]:
+    elif model_type in ["tensorflow", "tensorflow_uint8"]:
         st.markdown(
-            '<div class="model-info">⚡ <strong>AI Model:</strong> Lightweight ML Model (Optimized)</div>',
+            f'<div class="model-info">🤖 <strong>AI Model:</strong> TensorFlow Deep Learning Model (Real AI){version_text}</div>',
+            unsafe_allow_html=True
+        )
+    elif model_type in ["tflite", "tflite_uint8", "pickle", "joblib"] or model_type.startswith("student"):
+        st.markdown(
+            f'<div class="model-info">⚡ <strong>AI Model:</strong> Lightweight ML Model (Optimized){version_text}</div>',
             unsafe_allow_html=True
         )
     else:
         st.markdown(
-            '<div class="model-info">⚠️ <strong>AI Model:</strong> Simple ML Algorithm (Fallback)</div>',
+            f'<div class="model-info">⚠️ <strong>AI Model:</strong> Simple ML Algorithm (Fallback){version_text}</div>',
             unsafe_allow_html=True
         )
+    agreement = below_agreement_gate(model_type)
+    if agreement is not None:
+        st.warning(f"🧪 {model_type} เป็นโมเดลทดลอง: ผลตรงกับโมเดลหลักเพียง {agreement:.1%} "
+                   f"(เกณฑ์ {get_setting('min_backend_agreement'):.0%}) ไม่ควรใช้ตัดสิน Phase จริง")
 
-def display_results(results_list, model_type):
+@st.cache_data(max_entries=256, show_spinner=False)
+def load_branch_history(branch_code, revision, limit):
     """
-    แสดงผลลัพธ์การวิเคราะห์
+    ประวัติการตรวจสอบของสาขาจาก manifest ของ images/ (ใช้ index branch_code, upload_time ไม่อ่าน data.xlsx)
+    cache แยกตามสาขา และ revision (เก็บใน manifest) จะเปลี่ยนเมื่อมีการบันทึกรูปของสาขานั้นจากทุก process
+    cache เดิมจึงไม่ถูกใช้อีก
     """
-    st.subheader("🎯 ผลการวิเคราะห์")
-    
-    # แสดงข้อมูลโมเดล
-    display_model_info(model_type)
-    
-    num_cols = min(len(results_list), 3)
+    archive = ImageArchive()
+    rows = archive.photos_for_branch(branch_code, limit=limit)
+    for row in rows:
+        row['thumbnail'] = None
+        try:
+            with Image.open(archive.absolute_path(row['path'])) as image:
+                image.thumbnail((160, 160))
+                row['thumbnail'] = image.convert('RGB')
+        except OSError:
+            pass
+    return rows
+
+def display_branch_history(code):
+    """
+    แสดงการตรวจสอบครั้งก่อนๆ ของสาขาที่กรอก (วันที่, phase, ความมั่นใจ และรูปย่อ)
+    """
+    branch_code = normalize_branch_code(code)
+    if not branch_code:
+        return
+    revision = ImageArchive().branch_revision(branch_code)
+    rows = load_branch_history(branch_code, revision, get_setting("branch_history_limit"))
+    with st.expander(f"📜 ประวัติการตรวจสอบของสาขา {branch_code}", expanded=bool(rows)):
+        if not rows:
+            st.caption("ยังไม่มีประวัติการตรวจสอบของสาขานี้")
+            return
+        st.dataframe(
+            [
+                {
+                    'วันที่': row['upload_time'],
+                    'Phase': row['phase'],
+                    'ความมั่นใจ': f"{row['confidence']:.2%}" if row['confidence'] is not None else "",
+                    'ประเภทป้าย': row['sign_type'],
+                    'พนักงาน': row['employee_name'],
+                }
+                for row in rows
+            ],
+            use_container_width=True,
+            hide_index=True
+        )
+        thumbnails = [row for row in rows if row['thumbnail'] is not None]
+        if thumbnails:
+            st.image(
+                [row['thumbnail'] for row in thumbnails],
+                caption=[f"{row['phase']} · {(row['upload_time'] or '')[:10]}" for row in thumbnails],
+                width=120
+            )
+
+def create_result_placeholders(count):
+    """
+    สร้างช่องว่างของการ์ดผลลัพธ์ตามลำดับภาพ (3 คอลัมน์) เพื่อเติมทีละใบเมื่อวิเคราะห์เสร็จ
+    """
+    num_cols = min(count, 3)
     cols = st.columns(num_cols)
+    return [cols[i % num_cols].empty() for i in range(count)]
+
+def display_result_card(placeholder, result, index, snapshot, caption=None):
+    """
+    แสดงการ์ดผลลัพธ์ของภาพหนึ่งภาพในช่องที่เตรียมไว้ (snapshot = โมเดลของรอบนี้ ใช้สร้าง heatmap)
+    """
+    with placeholder.container():
+        st.markdown('<div class="result-card">', unsafe_allow_html=True)
+        st.image(result['image_object'], caption=caption or f"ภาพที่ {index+1}", use_column_width=True)
+        
+        st.metric(
+            label="ประเภทป้าย",
+            value=result['class_name'],
+            delta=f"{result['confidence']:.2%}",
+            delta_color="normal"
+        )
+        if 'frame_class_name' in result:
+            st.caption(f"เฟรมสนับสนุนผลสรุป · ผลของเฟรมนี้: {result['frame_class_name']} "
+                       f"({result['frame_confidence']:.2%})")
+        if result.get('quality_issues'):
+            st.warning(f"⚠️ ไม่ผ่านการตรวจคุณภาพ: {', '.join(result['quality_issues'])}")
+        display_explanation(result, index, snapshot)
+        st.markdown('</div>', unsafe_allow_html=True)
+
+def display_explanation(result, index, snapshot):
+    """
+    สวิตช์ดู heatmap ของการ์ด คำนวณเมื่อผู้ใช้เปิดดูเท่านั้น
+    """
+    if not st.toggle("🔍 ดูบริเวณที่โมเดลใช้ตัดสิน", key=f"explain_{index}_{result.get('source_name', '')}",
+                     on_change=note_rerun_trigger, args=("explain",)):
+        return
+    if snapshot.version != result['model_version']:
+        st.info("โมเดลถูกอัปเดตหลังวิเคราะห์ภาพนี้ อัปโหลดใหม่เพื่อดูบริเวณที่โมเดลเวอร์ชันปัจจุบันใช้ตัดสิน")
+        return
+    # ภาพจากโหมดรูปภาพเก็บ array ที่ใช้ทำนายไว้แล้ว ส่วน ZIP และวิดีโอเก็บเพียง thumbnail จึง preprocess ใหม่
+    image_array = result.get('input_array')
+    if image_array is None:
+        image_array = preprocess_image(result['image_object'], backend_input_size(snapshot.model_type))
+    try:
+        with st.spinner("กำลังสร้าง heatmap..."):
+            explanation = load_explanation(image_hash(image_array), snapshot.version, result['class_name'],
+                                           image_array, snapshot)
+    except AdmissionRejected:
+        st.warning(BUSY_MESSAGE)
+        return
+    st.image(explanation.image, use_column_width=True,
+             caption=f"{explanation.method}: บริเวณสีแดงมีผลต่อการตัดสินเป็น {result['class_name']} มากที่สุด")
+
+def display_quality_card(placeholder, report, index, caption=None):
+    """
+    แสดงการ์ดของรูปที่ไม่ผ่านการตรวจคุณภาพและไม่ได้ส่งให้โมเดลวิเคราะห์
+    """
+    with placeholder.container():
+        st.markdown('<div class="result-card">', unsafe_allow_html=True)
+        st.image(report.preview, caption=caption or f"ภาพที่ {index+1}", use_column_width=True)
+        st.warning(f"⚠️ ไม่ผ่านการตรวจคุณภาพ: {', '.join(report.issues)} (ไม่ได้วิเคราะห์และจะไม่ถูกบันทึก)")
+        st.markdown('</div>', unsafe_allow_html=True)
+
+def analyze_video(video, model, class_names, model_type, model_version):
+    """
+    วิเคราะห์วิดีโอเดินผ่านหน้าร้าน แสดงผลสรุปและเฟรมที่สนับสนุนผลนั้น แล้วคืนค่ารายการผลลัพธ์ของเฟรมเหล่านั้น
+    ผลถูกเก็บใน session_state ตามไฟล์และเวอร์ชันโมเดล จึงไม่ decode วิดีโอซ้ำเมื่อกดปุ่มบันทึก
+    """
+    snapshot = ModelSnapshot(model, class_names, model_type, model_version)
+    cache_key = (getattr(video, 'file_id', video.name), model_version)
+    cached = st.session_state.get('video_verdict')
+    if cached is None or cached[0] != cache_key:
+        inference = inference_controller()
+        inference.check()
+        queue_notice = st.empty()
+        progress_bar = st.progress(0, text="กำลังอ่านเฟรมจากวิดีโอ...")
+        max_frames = get_setting("video_max_frames")
+        path = save_upload_to_temp(video)
+
+        def report_progress(done):
+            # max_frames 0/null = ไม่จำกัดจำนวนเฟรม จึงไม่รู้จำนวนทั้งหมด แสดงเฉพาะจำนวนที่วิเคราะห์แล้ว
+            fraction = min(done / max_frames, 1.0) if max_frames and max_frames > 0 else 0.0
+            progress_bar.progress(fraction, text=f"วิเคราะห์แล้ว {done} เฟรม...")
+
+        try:
+            with stage("video"):
+                verdict = classify_video(
+                    path, model, class_names, model_type,
+                    sample_fps=get_setting("video_sample_fps"),
+                    mode=get_setting("video_sampling"),
+                    scene_threshold=get_setting("video_scene_threshold"),
+                    dedup_threshold=get_setting("video_dedup_threshold"),
+                    batch_size=get_setting("video_batch_size"),
+                    max_frames=max_frames,
+                    best_frames=get_setting("video_best_frames"),
+                    progress=report_progress,
+                    inference_slot=queued_slot(inference, queue_notice),
+                )
+        finally:
+            os.remove(path)
+            progress_bar.empty()
+        st.session_state['video_verdict'] = (cache_key, verdict)
+    else:
+        verdict = cached[1]
+
+    st.metric(
+        label="ประเภทป้าย (สรุปจากวิดีโอ)",
+        value=verdict.class_name,
+        delta=f"{verdict.confidence:.2%}",
+        delta_color="normal"
+    )
+    st.caption(f"วิเคราะห์ {verdict.frames_classified} เฟรม จาก {verdict.frames_sampled} เฟรมที่สุ่มอ่าน "
+               f"(ตัดเฟรมที่ซ้ำกันออกแล้ว)")
+
+    # ทุกเฟรมถูกบันทึกเป็นเฟรมสนับสนุนของผลสรุป (Phase = ผลของวิดีโอ) ผลของเฟรมเองแสดงบนการ์ดเท่านั้น
+    results = [
+        {
+            'image_object': frame.thumbnail,
+            'image_png': frame.image_png,
+            'class_name': verdict.class_name,
+            'confidence': verdict.confidence,
+            'frame_class_name': frame.class_name,
+            'frame_confidence': frame.confidence,
+            'frame_timestamp': frame.timestamp,
+            'model_version': model_version
+        }
+        for frame in verdict.best_frames
+    ]
+    if results:
+        placeholders = create_result_placeholders(len(results))
+        for i, (frame, result) in enumerate(zip(verdict.best_frames, results)):
+            display_result_card(placeholders[i], result, i, snapshot, caption=f"เฟรมวินาทีที่ {frame.timestamp:.1f}")
+    return results
+
+def display_save_section(analysis_results, name, code, sign_type, model_type, zip_file=None):
+    """
+    ส่วนยืนยันและบันทึกข้อมูล (รูปลง images/, แถวลง data.xlsx และ history store)
+    zip_file: ไฟล์ ZIP ที่อัปโหลด (ผลจากโหมด ZIP บันทึกไฟล์รูปต้นฉบับจาก ZIP ไม่ใช่ thumbnail)
+    """
+    st.markdown("---")
+    st.subheader("3. ยืนยันการส่งข้อมูล")
     
-    for i, result in enumerate(results_list):
-        with cols[i % num_cols]:
-            st.markdown('<div class="result-card">', unsafe_allow_html=True)
-            st.image(result['image_object'], caption=f"ภาพที่ {i+1}", use_column_width=True)
+    if st.button("💾 บันทึกและส่งข้อมูล", on_click=note_rerun_trigger, args=("save_button",)):
+        # รูปจาก ZIP ที่อยู่ในโฟลเดอร์รหัสสาขาใช้รหัสสาขาจากโฟลเดอร์ ไม่ต้องกรอก
+        needs_code = any(not result.get('branch_code') for result in analysis_results)
+        if not all([name, sign_type]) or (needs_code and not code):
+            st.warning("⚠️ กรุณากรอกข้อมูลพนักงาน, รหัสสาขา, และประเภทป้ายให้ครบถ้วน")
+        else:
+            queue_notice = st.empty()
+            try:
+                save_controller().check()
+                with queued_slot(save_controller(), queue_notice)():
+                    save_results(analysis_results, name, code, sign_type, model_type, zip_file)
+            except AdmissionRejected:
+                queue_notice.error(BUSY_MESSAGE)
+
+def save_results(analysis_results, name, code, sign_type, model_type, zip_file=None):
+    """
+    บันทึกรูปลง images/ และแถวข้อมูลลง data.xlsx และ history store (เรียกเมื่อได้ slot ของการบันทึกแล้ว)
+    ผลจาก ZIP (มี zip_file) บันทึก bytes ต้นฉบับของไฟล์ใน ZIP เฟรมวิดีโอบันทึกเฟรมเต็มความละเอียด (image_png)
+    ผลจากโหมดรูปภาพบันทึก image_object เป็น PNG
+    """
+    with st.spinner("กำลังบันทึกข้อมูล... กรุณารอสักครู่"), stage("save"):
+        upload_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        data_to_save = []
+
+        for i, result in enumerate(analysis_results):
+            branch_code = result.get('branch_code') or code
+            image_name = f"{branch_code}_{result['class_name']}_{upload_time.replace(':', '-')}_{i+1}"
+            if 'frame_timestamp' in result:
+                # เฟรมสนับสนุนของวิดีโอ ระบุวินาทีของเฟรมไว้ในชื่อไฟล์
+                image_name += f"_frame{result['frame_timestamp']:.0f}s"
+            # ไฟล์จาก ZIP เก็บตามนามสกุลเดิม (ไม่แปลงเป็น PNG)
+            image_name += os.path.splitext(result['source_name'])[1].lower() if zip_file else ".png"
             
-            st.metric(
-                label="ประเภทป้าย",
-                value=result['class_name'],
-                delta=f"{result['confidence']:.2%}",
-                delta_color="normal"
-            )
-            st.markdown('</div>', unsafe_allow_html=True)
+            data_to_save.append({
+                'Employee name': name,
+                'Branch code': branch_code,
+                'Sign type': sign_type,
+                'How many images': len(analysis_results),
+                'Image Filename': image_name,
+                'Phase': result['class_name'],
+                'Confidence': f"{result['confidence']:.4f}",
+                'Upload Time': upload_time,
+                'Model Type': model_type,
+                'Model Version': result['model_version']
+            })
+        
+        # บันทึกรูปลง images/<สาขา>/<เดือน>/ และเพิ่มลง manifest (อ่านไฟล์จาก ZIP ทีละไฟล์ขณะบันทึก)
+        if zip_file:
+            with open_zip(zip_file) as archive:
+                ImageArchive().save_photos(
+                    (read_member(archive, result['source_name']), row)
+                    for result, row in zip(analysis_results, data_to_save)
+                )
+        else:
+            # เฟรมวิดีโอบันทึกเฟรมเต็มขนาดที่ถูกวิเคราะห์ ไม่ใช่ thumbnail ที่แสดงบนการ์ด
+            ImageArchive().save_photos([
+                (result.get('image_png') or result['image_object'], row)
+                for result, row in zip(analysis_results, data_to_save)
+            ])
+        success, error_msg = save_to_excel(data_to_save, 'data.xlsx')
+        
+        if success:
+            history_success, history_error = save_to_history(data_to_save)
+            if not history_success:
+                st.warning(f"⚠️ บันทึกลง Excel แล้ว แต่บันทึกลง history store ไม่สำเร็จ: {history_error}")
+            st.success("🎉 บันทึกข้อมูลเรียบร้อยแล้ว!")
+            st.balloons()
+        else:
+            st.error(f"❌ เกิดข้อผิดพลาดในการบันทึกไฟล์: {error_msg}")
+
+def analyze_zip(zip_file, model, class_names, model_type, model_version, thresholds=None, quality_override=False):
+    """
+    วิเคราะห์รูปทั้งหมดในไฟล์ ZIP เป็น batch แสดงการ์ดทีละใบ แล้วคืนค่ารายการผลลัพธ์ (เก็บเพียง thumbnail ไว้แสดงผล)
+    ผลถูกเก็บใน session_state ตามไฟล์และเวอร์ชันโมเดล จึงไม่วิเคราะห์ซ้ำเมื่อกดปุ่มบันทึก
+    thresholds: เกณฑ์ตรวจคุณภาพ (None = ไม่ตรวจ), quality_override: วิเคราะห์รูปที่ไม่ผ่านด้วย
+    """
+    snapshot = ModelSnapshot(model, class_names, model_type, model_version)
+    cache_key = (getattr(zip_file, 'file_id', zip_file.name), model_version, thresholds is None, quality_override)
+    cached = st.session_state.get('zip_results')
+    if cached is not None and cached[0] == cache_key:
+        results = cached[1]
+        placeholders = create_result_placeholders(len(results)) if results else []
+        for i, result in enumerate(results):
+            display_result_card(placeholders[i], result, i, snapshot, caption=result['source_name'])
+        return results
+
+    inference = inference_controller()
+    inference.check()
+    with open_zip(zip_file) as archive:
+        members = list_image_members(archive, get_setting("zip_max_member_bytes"))
+        max_images = get_setting("zip_max_images")
+        if max_images and len(members) > max_images:
+            st.warning(f"⚠️ ZIP มีรูป {len(members)} รูป วิเคราะห์เฉพาะ {max_images} รูปแรก")
+            members = members[:max_images]
+        if not members:
+            st.warning("⚠️ ไม่พบไฟล์รูปภาพ (JPEG/PNG) ในไฟล์ ZIP")
+            return []
+
+        queue_notice = st.empty()
+        placeholders = create_result_placeholders(len(members))
+        progress_bar = st.progress(0, text="เริ่มต้นการวิเคราะห์...")
+        results = []
+        with stage("upload_loop"):
+            quality_check = None
+            if thresholds is not None:
+                quality_check = lambda image: assess_quality(image, thresholds)
+            for i, item in enumerate(classify_zip(archive, members, model, class_names, model_type,
+                                                  get_setting("zip_batch_size"), quality_check,
+                                                  classify_rejected=quality_override,
+                                                  inference_slot=queued_slot(inference, queue_notice))):
+                progress_bar.progress((i + 1) / len(members), text=f"วิเคราะห์แล้ว {i+1}/{len(members)} รูป...")
+                if 'quality' in item:
+                    display_quality_card(placeholders[i], item['quality'], i, caption=item['source_name'])
+                    continue
+                if 'error' in item:
+                    placeholders[i].error(f"เกิดข้อผิดพลาดในการวิเคราะห์ภาพ {item['source_name']}: {item['error']}")
+                    continue
+                item['model_version'] = model_version
+                record_prediction(model_version, item['class_name'], item['confidence'])
+                results.append(item)
+                display_result_card(placeholders[i], item, i, snapshot, caption=item['source_name'])
+        progress_bar.empty()
+
+    st.session_state['zip_results'] = (cache_key, results)
+    return results
 
 # --- 3. ส่วนหลักของแอปพลิเคชัน ---
 
-def main():
+def main(backend=None):
+    """
+    รันแอปหนึ่งรอบ โดยบันทึกเวลาของรอบนี้แยกตามส่วน และ widget ที่ทำให้รันซ้ำ (ดูได้ในหน้า Admin)
+    backend: ลำดับ backend ที่จะใช้ (None = ตาม PM_AI_BACKEND หรือ "backend" ใน settings.json)
+    """
+    with profile_rerun(current_session_id(), pop_rerun_trigger(), get_setting("rerun_slow_ms")):
+        render_app(backend or get_setting("backend"))
+
+def render_app(backend):
     st.set_page_config(
         page_title="7-Connect PM AI (Lightweight)",
         page_icon="🔧",
         layout="wide",
         initial_sidebar_state="collapsed"
     )
-    apply_custom_css()
-    display_header()
-
-    # โหลดโมเดล
-    model, class_names, model_type = load_lightweight_model()
+    start_memory_monitor(backend)
+    with stage("header"):
+        apply_custom_css()
+        display_header()
+
+    # โหลดโมเดล (อ่าน snapshot ครั้งเดียวต่อการรัน เพื่อให้ทั้งรอบใช้โมเดลเวอร์ชันเดียวกัน)
+    with stage("model_load"):
+        snapshot = load_lightweight_model(backend)
+        model, class_names, model_type, model_version = snapshot
     if not class_names:
         st.stop()
     
@@ -329,92 +633,172 @@ def main():
     st.subheader("1. กรอกข้อมูล")
     col1, col2 = st.columns(2)
     with col1:
-        name = st.text_input("ชื่อพนักงาน:", placeholder="เช่น สมชาย ใจดี")
-        code = st.text_input("รหัสสาขา:", placeholder="เช่น 12345")
+        name = st.text_input("ชื่อพนักงาน:", placeholder="เช่น สมชาย ใจดี",
+                             on_change=note_rerun_trigger, args=("employee_name",))
+        code = st.text_input("รหัสสาขา:", placeholder="เช่น 12345",
+                             on_change=note_rerun_trigger, args=("branch_code",))
     with col2:
-        sign_type = st.text_input("ประเภทป้าย:", placeholder="เช่น ป้ายไฟ, ป้ายไวนิล")
+        sign_type = st.text_input("ประเภทป้าย:", placeholder="เช่น ป้ายไฟ, ป้ายไวนิล",
+                                  on_change=note_rerun_trigger, args=("sign_type",))
+    display_branch_history(code)
 
     st.subheader("2. อัปโหลดรูปภาพ")
-    files = st.file_uploader(
-        "เลือกไฟล์รูปภาพ (อัปโหลดได้หลายไฟล์)",
-        type=['jpeg', 'jpg', 'png'],
-        accept_multiple_files=True,
-        label_visibility="collapsed"
+    input_mode = st.radio(
+        "รูปแบบการอัปโหลด",
+        ["รูปภาพ", "ไฟล์ ZIP", "วิดีโอเดินผ่านหน้าร้าน"],
+        horizontal=True,
+        label_visibility="collapsed",
+        on_change=note_rerun_trigger,
+        args=("input_mode",)
     )
+    files, zip_file, video = None, None, None
+    if input_mode == "รูปภาพ" and get_setting("client_resize"):
+        # ย่อรูปในเบราว์เซอร์ก่อนส่ง ที่เหลือของ pipeline ใช้ผลลัพธ์เหมือนไฟล์จาก st.file_uploader
+        files = photo_uploader(
+            "ลากรูปมาวางหรือคลิกเพื่อเลือก (อัปโหลดได้หลายไฟล์)",
+            types=['jpeg', 'jpg', 'png'],
+            max_edge=get_setting("client_resize_max_edge"),
+            quality=get_setting("client_resize_quality"),
+            on_change=partial(note_rerun_trigger, "image_upload")
+        )
+    elif input_mode == "รูปภาพ":
+        files = st.file_uploader(
+            "เลือกไฟล์รูปภาพ (อัปโหลดได้หลายไฟล์)",
+            type=['jpeg', 'jpg', 'png'],
+            accept_multiple_files=True,
+            label_visibility="collapsed",
+            on_change=note_rerun_trigger,
+            args=("image_upload",)
+        )
+    elif input_mode == "ไฟล์ ZIP":
+        zip_file = st.file_uploader(
+            "เลือกไฟล์ ZIP (โฟลเดอร์ที่ตั้งชื่อเป็นรหัสสาขาจะใช้เป็นรหัสสาขาของรูปในโฟลเดอร์นั้น)",
+            type=['zip'],
+            label_visibility="collapsed",
+            on_change=note_rerun_trigger,
+            args=("zip_upload",)
+        )
+    else:
+        video = st.file_uploader(
+            "เลือกไฟล์วิดีโอ",
+            type=VIDEO_TYPES,
+            label_visibility="collapsed",
+            on_change=note_rerun_trigger,
+            args=("video_upload",)
+        )
+    # เกณฑ์ตรวจคุณภาพรูป (None = ไม่ตรวจ) และการเลือกให้วิเคราะห์รูปที่ไม่ผ่านด้วย
+    thresholds, quality_override = None, False
+    if get_setting("quality_gate") and input_mode != "วิดีโอเดินผ่านหน้าร้าน":
+        thresholds = quality_thresholds()
+        quality_override = st.checkbox(
+            "วิเคราะห์รูปที่ไม่ผ่านการตรวจคุณภาพ (เบลอ มืด หรือสว่างจ้า) ด้วย", value=False,
+            on_change=note_rerun_trigger, args=("quality_override",)
+        )
     st.markdown('</div>', unsafe_allow_html=True)
 
     # --- ส่วนประมวลผลและแสดงผล ---
     if files:
+        # ปฏิเสธตั้งแต่ก่อนเริ่มถ้าคิวของการเรียกโมเดลเต็ม แทนที่จะถูกปฏิเสธกลางชุด
+        inference = inference_controller()
+        try:
+            inference.check()
+        except AdmissionRejected:
+            st.error(BUSY_MESSAGE)
+            return
+        # เตรียมหัวข้อและช่องของการ์ดทุกใบไว้ก่อน แล้วแสดงแต่ละใบทันทีที่วิเคราะห์เสร็จ
+        # ผู้ใช้จึงเห็นผลแรกหลังจากรอเพียงภาพเดียว ไม่ต้องรอทั้งชุด
+        st.subheader("🎯 ผลการวิเคราะห์")
+        model_info = st.empty()
+        # ขอ slot ทีละรูป ผู้ใช้ที่อัปโหลดหลายรูปจึงสลับคิวกับผู้ใช้อื่นแทนที่จะถือ slot ไว้ทั้งชุด
+        queue_notice = st.empty()
+        inference_slot = queued_slot(inference, queue_notice)
+        placeholders = create_result_placeholders(len(files))
         progress_bar = st.progress(0, text="เริ่มต้นการวิเคราะห์...")
         st.session_state['analysis_results'] = []
+        # รูปที่บันทึกลง drift monitor แล้ว (ภาพชุดเดิมถูกวิเคราะห์ซ้ำทุกครั้งที่หน้ารันใหม่ จึงนับครั้งเดียวต่อไฟล์)
+        drift_recorded = st.session_state.get('drift_recorded', set())
+        drift_keys = set()
         
         for i, file in enumerate(files):
             progress_text = f"กำลังวิเคราะห์ภาพที่ {i+1}/{len(files)}..."
             progress_bar.progress((i + 1) / len(files), text=progress_text)
             
             try:
-                image = Image.open(file).convert('RGB')
-                
-                # ทำนายผล
-                class_name, confidence_score = classify_image_lightweight(image, model, class_names, model_type)
+                with stage("upload_loop"):
+                    # ตรวจคุณภาพจากภาพย่อก่อน รูปที่ไม่ผ่านไม่ต้อง decode เต็มภาพและไม่ส่งให้โมเดล
+                    report = assess_quality(file, thresholds) if thresholds is not None else None
+                    if report is not None and not report.passed and not quality_override:
+                        display_quality_card(placeholders[i], report, i)
+                        continue
+
+                    # หมุนตาม EXIF orientation ให้ตรงกับรูปที่เบราว์เซอร์ย่อมาแล้ว (ซึ่งหมุนไว้ใน pixel)
+                    image = ImageOps.exif_transpose(Image.open(file)).convert('RGB')
+                    
+                    # ทำนายผล (เก็บ array ที่ preprocess แล้วไว้ให้ heatmap ใช้ต่อ)
+                    image_array = preprocess_image(image, backend_input_size(model_type))
+                    with inference_slot():
+                        class_name, confidence_score = classify_array(image_array, model, class_names, model_type)
                 
-                st.session_state['analysis_results'].append({
+                result = {
+                    'source_name': file.name,
                     'image_object': image,
+                    'input_array': image_array,
                     'class_name': class_name,
-                    'confidence': confidence_score
-                })
-
+                    'confidence': confidence_score,
+                    'model_version': model_version,
+                    'quality_issues': report.issues if report is not None else []
+                }
+                st.session_state['analysis_results'].append(result)
+                drift_key = (getattr(file, 'file_id', file.name), model_version)
+                drift_keys.add(drift_key)
+                if drift_key not in drift_recorded:
+                    record_prediction(model_version, class_name, confidence_score)
+                with stage("result_grid"):
+                    display_result_card(placeholders[i], result, i, snapshot)
+
+            except AdmissionRejected:
+                queue_notice.error(BUSY_MESSAGE)
+                break
             except Exception as e:
-                st.error(f"เกิดข้อผิดพลาดในการวิเคราะห์ภาพ {file.name}: {e}")
+                placeholders[i].error(f"เกิดข้อผิดพลาดในการวิเคราะห์ภาพ {file.name}: {e}")
         
         progress_bar.empty()
-        
-        if st.session_state['analysis_results']:
-            display_results(st.session_state['analysis_results'], model_type)
-
-            # --- ส่วนการยืนยันและบันทึกข้อมูล ---
-            st.markdown("---")
-            st.subheader("3. ยืนยันการส่งข้อมูล")
-            
-            if st.button("💾 บันทึกและส่งข้อมูล"):
-                if not all([name, code, sign_type]):
-                    st.warning("⚠️ กรุณากรอกข้อมูลพนักงาน, รหัสสาขา, และประเภทป้ายให้ครบถ้วน")
-                else:
-                    with st.spinner("กำลังบันทึกข้อมูล... กรุณารอสักครู่"):
-                        image_folder_path = 'images'
-                        if not os.path.exists(image_folder_path):
-                            os.makedirs(image_folder_path)
-
-                        upload_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        data_to_save = []
-
-                        for i, result in enumerate(st.session_state['analysis_results']):
-                            image_name = f"{code}_{result['class_name']}_{upload_time.replace(':', '-')}_{i+1}.png"
-                            image_path = os.path.join(image_folder_path, image_name)
-                            result['image_object'].save(image_path)
-                            
-                            data_to_save.append({
-                                'Employee name': name,
-                                'Branch code': code,
-                                'Sign type': sign_type,
-                                'How many images': len(st.session_state['analysis_results']),
-                                'Image Filename': image_name,
-                                'Phase': result['class_name'],
-                                'Confidence': f"{result['confidence']:.4f}",
-                                'Upload Time': upload_time,
-                                'Model Type': model_type
-                            })
-                        
-                        success, error_msg = save_to_excel(data_to_save, 'data.xlsx')
-                        
-                        if success:
-                            st.success("🎉 บันทึกข้อมูลเรียบร้อยแล้ว!")
-                            st.balloons()
-                        else:
-                            st.error(f"❌ เกิดข้อผิดพลาดในการบันทึกไฟล์: {error_msg}")
-
+        st.session_state['drift_recorded'] = drift_keys
+    elif zip_file:
+        st.subheader("🎯 ผลการวิเคราะห์")
+        model_info = st.empty()
+        try:
+            st.session_state['analysis_results'] = analyze_zip(
+                zip_file, model, class_names, model_type, model_version, thresholds, quality_override
+            )
+        except zipfile.BadZipFile:
+            st.session_state['analysis_results'] = []
+            st.error("❌ ไฟล์ที่อัปโหลดไม่ใช่ไฟล์ ZIP ที่ถูกต้อง")
+        except AdmissionRejected:
+            st.session_state['analysis_results'] = []
+            st.error(BUSY_MESSAGE)
+    elif video:
+        st.subheader("🎯 ผลการวิเคราะห์")
+        model_info = st.empty()
+        try:
+            st.session_state['analysis_results'] = analyze_video(video, model, class_names, model_type, model_version)
+        except VideoUnavailable as e:
+            st.session_state['analysis_results'] = []
+            st.error(f"❌ วิเคราะห์วิดีโอไม่ได้: {e}")
+        except AdmissionRejected:
+            st.session_state['analysis_results'] = []
+            st.error(BUSY_MESSAGE)
     else:
         st.info("⬆️ กรุณาอัปโหลดรูปภาพเพื่อเริ่มการวิเคราะห์")
+        return
+
+    record_session_usage(current_session_id(), st.session_state['analysis_results'])
+    
+    if st.session_state['analysis_results']:
+        # แสดงข้อมูลโมเดลหลังวิเคราะห์ครบ (สัดส่วนของ cascade รวมภาพชุดนี้แล้ว)
+        with model_info.container():
+            display_model_info(model_type, model_version, model)
+        display_save_section(st.session_state['analysis_results'], name, code, sign_type, model_type, zip_file)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -1,11 +1,12 @@
 import streamlit as st
-from PIL import Image, ImageOps
+from PIL import Image
 import numpy as np
 import pandas as pd
 import os
 from datetime import datetime
-import time
-import random
+
+from backends import classify_batch, load_backend, preprocess_image
+from static_assets import logo_src, page_css
 
 # --- 1. ฟังก์ชันหลักในการทำงาน (Demo Version) ---
 
@@ -16,7 +17,7 @@ def load_demo_model():
     """
     try:
         # สร้าง class names สำหรับ demo
-        class_names = ["P1", "P2", "P3", "P4"]
+        _, class_names, _ = load_backend("demo")
         st.success("✅ โหลดโมเดล Demo สำเร็จ!")
         return class_names
     except Exception as e:
@@ -27,31 +28,15 @@ def classify_image_demo(image, class_names):
     """
     ฟังก์ชัน Demo สำหรับวิเคราะห์ภาพ (จำลองผลลัพธ์)
     """
-    # ปรับขนาดภาพให้เป็น (224, 224)
-    image = ImageOps.fit(image, (224, 224), Image.Resampling.LANCZOS)
+    # ปรับขนาดภาพให้เป็น (224, 224) และแปลงเป็น numpy array
+    image_array = preprocess_image(image)
 
-    # แปลงภาพเป็น numpy array
-    image_array = np.asarray(image)
+    # จำลองการวิเคราะห์ด้วย demo backend
+    prediction = classify_batch("demo", None, image_array[np.newaxis])[0]
+    index = np.argmax(prediction)
 
-    # จำลองการวิเคราะห์ - ใช้ค่าเฉลี่ยของสีเป็นตัวกำหนดผลลัพธ์
-    avg_color = np.mean(image_array)
-    
-    # แบ่งช่วงสีเพื่อจำลองการจำแนกประเภท
-    if avg_color < 64:
-        index = 0  # P1 - สีเข้ม
-    elif avg_color < 128:
-        index = 1  # P2 - สีปานกลาง
-    elif avg_color < 192:
-        index = 2  # P3 - สีอ่อน
-    else:
-        index = 3  # P4 - สีสว่าง
-    
-    # เพิ่มความสุ่มเล็กน้อย
-    if random.random() < 0.1:  # 10% chance to change
-        index = random.randint(0, 3)
-    
     class_name = class_names[index]
-    confidence_score = random.uniform(0.7, 0.95)  # จำลองความมั่นใจ
+    confidence_score = prediction[index]
 
     return class_name, confidence_score
 
@@ -79,107 +64,22 @@ def save_to_excel(data_list, excel_path):
 
 def apply_custom_css():
     """
-    ใช้ CSS เพื่อปรับแต่งหน้าตาแอปพลิเคชันให้สวยงาม
+    ใช้ CSS เพื่อปรับแต่งหน้าตาแอปพลิเคชัน (static/style.css และฟอนต์ในเครื่อง ไม่โหลดจาก host ภายนอก)
     """
-    st.markdown("""
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Mitr:wght@300;400;500;600&display=swap');
-
-    html, body, [class*="st-"], input, textarea, button, select {
-        font-family: 'Mitr', sans-serif;
-    }
-
-    /* 7-Eleven Color Palette */
-    :root {
-        --seven-green: #008343;
-        --seven-red: #EE1C25;
-        --seven-orange: #F36F21;
-        --background-color: #F0F2F6; /* สีพื้นหลังเทาอ่อน */
-        --text-color: #333333;
-        --card-bg: #FFFFFF;
-    }
-
-    .stApp {
-        background-color: var(--background-color);
-    }
-    
-    h1, h2 {
-        color: var(--seven-green);
-    }
-
-    /* กล่องสำหรับ Input */
-    .input-container {
-        background-color: var(--card-bg);
-        border-radius: 12px;
-        padding: 1.5rem 2rem;
-        margin-bottom: 2rem;
-        box-shadow: 0 4px 10px rgba(0,0,0,0.05);
-        border: 1px solid #E0E0E0;
-    }
-
-    /* ปุ่มหลัก */
-    .stButton > button {
-        background-color: var(--seven-green);
-        color: white;
-        font-weight: 600;
-        border-radius: 8px;
-        border: none;
-        padding: 0.75rem 1rem;
-        transition: background-color 0.3s, transform 0.2s;
-        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-        width: 100%; /* ทำให้ปุ่มเต็มความกว้าง */
-    }
-    .stButton > button:hover {
-        background-color: #006a36;
-        transform: scale(1.02);
-    }
-
-    /* การ์ดแสดงผลลัพธ์ */
-    .result-card {
-        background-color: var(--card-bg);
-        border-radius: 12px;
-        padding: 1rem;
-        text-align: center;
-        margin-bottom: 1rem;
-        box-shadow: 0 2px 5px rgba(0,0,0,0.05);
-    }
-    .result-card img {
-        border-radius: 8px;
-        margin-bottom: 0.75rem;
-        max-height: 200px; /* จำกัดความสูงของภาพ */
-    }
-    
-    /* แถบ Progress */
-    .stProgress > div > div > div > div {
-        background-color: var(--seven-orange);
-    }
-    
-    /* แจ้งเตือน */
-    [data-testid="stAlert"] { border-radius: 8px; }
-    [data-testid="stSuccess"] { border-left: 5px solid var(--seven-green); }
-    [data-testid="stError"] { border-left: 5px solid var(--seven-red); }
-
-    /* Demo warning */
-    .demo-warning {
-        background-color: #fff3cd;
-        border: 1px solid #ffeaa7;
-        border-radius: 8px;
-        padding: 1rem;
-        margin-bottom: 1rem;
-        color: #856404;
-    }
-
-    </style>
-    """, unsafe_allow_html=True)
+    st.markdown(page_css(), unsafe_allow_html=True)
 
 def display_header():
     """
     แสดงโลโก้และหัวข้อของแอปพลิเคชัน
     """
-    st.markdown(
-        '<div style="text-align: center"><img src="https://upload.wikimedia.org/wikipedia/commons/thumb/4/40/7-eleven_logo.svg/791px-7-eleven_logo.svg.png" alt="7-Eleven Logo" width="150"></div>',
-        unsafe_allow_html=True
-    )
+    logo = logo_src()
+    if logo:
+        st.markdown(
+            f'<div style="text-align: center"><img src="{logo}" alt="7-Eleven Logo" width="150"></div>',
+            unsafe_allow_html=True
+        )
+    else:
+        st.markdown('<div class="brand-wordmark">7-ELEVEN</div>', unsafe_allow_html=True)
     st.markdown(
         '<h1 style="text-align: center; color: var(--seven-green);">AI for Preventive Maintenance</h1>',
         unsafe_allow_html=True
@@ -0,0 +1,224 @@
+"""
+รายงานการใช้หน่วยความจำของแอป (RSS, tracemalloc รายขั้นตอน, session และ cache ของโมเดล)
+
+- memory_stage(name) ครอบแต่ละขั้นตอนของ pipeline เพื่อวัด RSS/tracemalloc ที่เปลี่ยนไป
+- record_session_usage() บันทึกขนาดโดยประมาณของ st.session_state['analysis_results'] ของแต่ละ session
+- start_memory_logger() พิมพ์ log สรุปเป็นระยะ เพื่อใช้ตั้ง memory limit และ eviction policy จากข้อมูลจริง
+"""
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger("pm_ai.memory")
+
+_STAGES = {}
+_SESSIONS = {}
+_LOCK = threading.Lock()
+# ฟังก์ชันที่คืนโมเดลที่กำลังให้บริการ (แอปหลักตั้งไว้ เพื่อให้หน้า Admin ไม่ต้องโหลดโมเดลซ้ำ)
+_model_source = None
+
+
+def current_rss_bytes():
+    """
+    RSS ปัจจุบันของ process (Linux อ่านจาก /proc ระบบ Unix อื่นใช้ค่า peak จาก getrusage, Windows ไม่มีทั้งสองอย่างจึงคืน 0)
+    """
+    try:
+        with open("/proc/self/statm", 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        pass
+    try:
+        # resource มีเฉพาะบน Unix จึง import เมื่อใช้เท่านั้น
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def format_bytes(value):
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(value) < 1024 or unit == "GB":
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+
+
+def estimate_bytes(obj, _seen=None, _depth=0):
+    """
+    ประมาณจำนวน byte ที่ object ถืออยู่ (numpy array, ภาพ PIL, bytes, dict/list และ attribute ของ object)
+    """
+    _seen = set() if _seen is None else _seen
+    if id(obj) in _seen or _depth > 6:
+        return 0
+    _seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, Image.Image):
+        return obj.width * obj.height * len(obj.getbands())
+    if isinstance(obj, (bytes, bytearray, str)):
+        return sys.getsizeof(obj)
+    if hasattr(obj, "getbuffer"):
+        return obj.getbuffer().nbytes
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(estimate_bytes(v, _seen, _depth + 1) for v in obj.values())
+    if isinstance(obj, (list, tuple, set)):
+        return sys.getsizeof(obj) + sum(estimate_bytes(v, _seen, _depth + 1) for v in obj)
+    if hasattr(obj, "__dict__"):
+        return sys.getsizeof(obj) + estimate_bytes(vars(obj), _seen, _depth + 1)
+    return sys.getsizeof(obj)
+
+
+def estimate_model_bytes(model):
+    """
+    ประมาณหน่วยความจำที่โมเดลใน st.cache_resource ถืออยู่
+    """
+    if model is None:
+        return 0
+    if hasattr(model, "tiers"):
+        return sum(estimate_model_bytes(tier_model) for _, tier_model, _, _ in model.tiers)
+    if hasattr(model, "get_weights"):
+        return sum(weight.nbytes for weight in model.get_weights())
+    if hasattr(model, "interpreter"):
+        return sum(
+            int(np.prod(detail["shape"])) * np.dtype(detail["dtype"]).itemsize
+            for detail in model.interpreter.get_tensor_details()
+        )
+    return estimate_bytes(model)
+
+
+def set_model_source(get_model):
+    """
+    ตั้งฟังก์ชันที่คืนโมเดลปัจจุบัน สำหรับใช้ใน memory_summary()
+    """
+    global _model_source
+    _model_source = get_model
+
+
+# --- ขั้นตอนของ pipeline ---
+
+def enable_tracemalloc(frames=1):
+    """
+    เริ่ม tracemalloc (มี overhead จึงเปิดเฉพาะเมื่อต้องการดู breakdown)
+    """
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+@contextmanager
+def memory_stage(name):
+    """
+    วัด RSS และหน่วยความจำที่ Python จองเพิ่ม (ถ้าเปิด tracemalloc) ระหว่างขั้นตอน name
+
+    ค่า tracemalloc เป็นค่าโดยประมาณเมื่อหลาย session ทำงานพร้อมกัน เพราะตัวนับเป็นของทั้ง process
+    """
+    tracing = tracemalloc.is_tracing()
+    rss_before = current_rss_bytes()
+    traced_before = tracemalloc.get_traced_memory()[0] if tracing else 0
+    try:
+        yield
+    finally:
+        rss_delta = current_rss_bytes() - rss_before
+        traced_delta = tracemalloc.get_traced_memory()[0] - traced_before if tracing else None
+        with _LOCK:
+            stage = _STAGES.setdefault(name, {
+                "calls": 0, "rss_delta_last": 0, "rss_delta_max": 0, "traced_delta_last": None, "traced_delta_max": None,
+            })
+            stage["calls"] += 1
+            stage["rss_delta_last"] = rss_delta
+            stage["rss_delta_max"] = max(stage["rss_delta_max"], rss_delta)
+            if traced_delta is not None:
+                stage["traced_delta_last"] = traced_delta
+                stage["traced_delta_max"] = max(stage["traced_delta_max"] or 0, traced_delta)
+
+
+def stage_report():
+    """
+    สถิติหน่วยความจำของแต่ละขั้นตอน
+    """
+    with _LOCK:
+        return {name: dict(stage) for name, stage in _STAGES.items()}
+
+
+def top_allocations(limit=15):
+    """
+    ตำแหน่งในโค้ดที่จองหน่วยความจำมากที่สุด (ต้องเปิด tracemalloc)
+    """
+    if not tracemalloc.is_tracing():
+        return []
+    statistics = tracemalloc.take_snapshot().statistics("lineno")
+    return [(str(stat.traceback), stat.size, stat.count) for stat in statistics[:limit]]
+
+
+# --- session ---
+
+def record_session_usage(session_id, analysis_results):
+    """
+    บันทึกขนาดโดยประมาณของผลการวิเคราะห์ที่ session ถือไว้ใน session_state
+    """
+    with _LOCK:
+        _SESSIONS[session_id] = {
+            "bytes": estimate_bytes(analysis_results or []),
+            "results": len(analysis_results or []),
+            "updated_at": time.time(),
+        }
+
+
+def session_report(max_age=1800):
+    """
+    ขนาดโดยประมาณต่อ session (ตัด session ที่ไม่มีการอัปเดตนานกว่า max_age วินาทีออก)
+    """
+    now = time.time()
+    with _LOCK:
+        for session_id in [s for s, usage in _SESSIONS.items() if now - usage["updated_at"] > max_age]:
+            del _SESSIONS[session_id]
+        return {session_id: dict(usage) for session_id, usage in _SESSIONS.items()}
+
+
+def memory_summary(model=None):
+    """
+    สรุปหน่วยความจำทั้งหมดในรูปแบบ dict (ใช้ทั้งในหน้า Admin และ log)
+    """
+    if model is None and _model_source is not None:
+        model = _model_source()
+    sessions = session_report()
+    summary = {
+        "rss": current_rss_bytes(),
+        "model": estimate_model_bytes(model),
+        "sessions": len(sessions),
+        "session_bytes": sum(usage["bytes"] for usage in sessions.values()),
+    }
+    if tracemalloc.is_tracing():
+        summary["traced"], summary["traced_peak"] = tracemalloc.get_traced_memory()
+    return summary
+
+
+def format_summary(summary):
+    parts = [f"rss={format_bytes(summary['rss'])}", f"model={format_bytes(summary['model'])}",
+             f"sessions={summary['sessions']}", f"session_results={format_bytes(summary['session_bytes'])}"]
+    if "traced" in summary:
+        parts.append(f"traced={format_bytes(summary['traced'])}")
+    return " ".join(parts)
+
+
+def start_memory_logger(interval):
+    """
+    เริ่ม background thread ที่ log สรุปหน่วยความจำทุก interval วินาที
+    """
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                logger.info("memory %s", format_summary(memory_summary()))
+            except Exception as e:
+                logger.warning("memory report failed: %s", e)
+
+    thread = threading.Thread(target=run, name="memory-logger", daemon=True)
+    thread.start()
+    return thread
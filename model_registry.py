@@ -0,0 +1,169 @@
+"""
+Model Registry สำหรับสลับเวอร์ชันโมเดลโดยไม่ต้องรีสตาร์ทแอป (Hot-swap)
+
+- ระบุเวอร์ชันของโมเดลด้วย content hash ของไฟล์ที่โมเดลที่โหลดได้ใช้จริง (ไม่ใช่ทุกไฟล์ที่เฝ้าดู)
+- เฝ้าดูโฟลเดอร์ model/ และโหลดเวอร์ชันใหม่ใน background thread
+  ขณะที่เวอร์ชันเดิมยังให้บริการอยู่
+- สลับไปใช้เวอร์ชันใหม่แบบ atomic หลังจาก warm-up เสร็จแล้วเท่านั้น
+"""
+import hashlib
+import os
+import threading
+from collections import namedtuple
+
+MODEL_DIR = "model"
+MODEL_FILES = ("keras_model.h5", "model_lightweight.pkl", "model_lightweight.joblib", "labels.txt")
+
+# ข้อมูลโมเดลหนึ่งเวอร์ชัน ถูกแทนที่ทั้งก้อนเมื่อสลับเวอร์ชัน ผู้อ่านจึงไม่เห็นสถานะครึ่งๆ กลางๆ
+ModelSnapshot = namedtuple("ModelSnapshot", ["model", "class_names", "model_type", "version"])
+
+
+def directory_signature(model_dir=MODEL_DIR, file_names=MODEL_FILES):
+    """
+    สร้าง signature แบบถูกๆ จากชื่อไฟล์ ขนาด และเวลาแก้ไข (ใช้ตรวจจับการเปลี่ยนแปลงก่อนคำนวณ hash)
+    """
+    signature = []
+    for file_name in file_names:
+        path = os.path.join(model_dir, file_name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        signature.append((file_name, stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
+
+
+def compute_model_version(model_dir=MODEL_DIR, file_names=MODEL_FILES):
+    """
+    คำนวณ content hash ของไฟล์โมเดล ใช้เป็น version identifier ที่บันทึกลงในแต่ละแถว
+    """
+    digest = hashlib.sha256()
+    for file_name in file_names:
+        path = os.path.join(model_dir, file_name)
+        if not os.path.exists(path):
+            continue
+        digest.update(file_name.encode("utf-8"))
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+class ModelRegistry:
+    """
+    เก็บโมเดลเวอร์ชันที่กำลังให้บริการ และโหลดเวอร์ชันใหม่ใน background
+
+    loader() ต้องคืนค่า (model, class_names, model_type)
+    warmup(model, class_names, model_type) จะถูกเรียกก่อนสลับเวอร์ชัน เพื่อให้ผู้ใช้คนถัดไปไม่ต้องรอ cold load
+    file_names คือไฟล์ที่เฝ้าดู (ทุกไฟล์ที่ loader อาจเลือกใช้) ส่วน version_files(model_type, model) คืนไฟล์ที่
+    โมเดลที่โหลดได้ใช้จริงสำหรับคำนวณเวอร์ชัน (None = ใช้ file_names ทั้งหมด)
+    """
+
+    def __init__(self, loader, warmup=None, model_dir=MODEL_DIR, file_names=MODEL_FILES, poll_interval=5.0,
+                 version_files=None):
+        self.model_dir = model_dir
+        self.file_names = file_names
+        self.version_files = version_files
+        self.poll_interval = poll_interval
+        self.last_error = None
+        self._loader = loader
+        self._warmup = warmup
+        self._active = None
+        self._load_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._watcher = None
+        self._seen_signature = None
+        self._failed_signature = None
+
+    def current(self):
+        """
+        คืน ModelSnapshot ของเวอร์ชันที่กำลังให้บริการ (อ่านครั้งเดียวแล้วใช้ตลอดการรันสคริปต์)
+        """
+        if self._active is None:
+            self.load_initial()
+        return self._active
+
+    def load_initial(self):
+        """
+        โหลดโมเดลครั้งแรกแบบ synchronous
+        """
+        with self._load_lock:
+            if self._active is None:
+                self._seen_signature = directory_signature(self.model_dir, self.file_names)
+                self._active = self._warm(self._load_snapshot())
+        return self._active
+
+    def _load_snapshot(self):
+        # ตรวจ signature ทั้งก่อนและหลังโหลด ถ้าไม่ตรงกันแปลว่าไฟล์ถูกเขียนทับระหว่างโหลด
+        signature = directory_signature(self.model_dir, self.file_names)
+        model, class_names, model_type = self._loader()
+        file_names = self.version_files(model_type, model) if self.version_files else self.file_names
+        version = compute_model_version(self.model_dir, file_names)
+        if directory_signature(self.model_dir, self.file_names) != signature:
+            raise RuntimeError("ไฟล์โมเดลถูกแก้ไขระหว่างการโหลด")
+        return ModelSnapshot(model, class_names, model_type, version)
+
+    def _warm(self, snapshot):
+        if self._warmup is not None:
+            self._warmup(snapshot.model, snapshot.class_names, snapshot.model_type)
+        return snapshot
+
+    def reload_if_changed(self):
+        """
+        ตรวจสอบโฟลเดอร์ model/ และโหลดเวอร์ชันใหม่ถ้าเนื้อหาไฟล์เปลี่ยน
+
+        คืนค่า True เมื่อมีการสลับไปใช้เวอร์ชันใหม่
+        """
+        signature = directory_signature(self.model_dir, self.file_names)
+        if signature == self._seen_signature or signature == self._failed_signature:
+            return False
+        if not self._load_lock.acquire(blocking=False):
+            # มีการโหลดอยู่แล้ว รอบถัดไปจะตรวจใหม่
+            return False
+        try:
+            # ไฟล์ที่เปลี่ยนอาจเป็นของ backend ที่ loader เลือกก่อนตัวปัจจุบัน จึงต้องโหลดใหม่เพื่อดูว่าได้โมเดลไหน
+            try:
+                snapshot = self._load_snapshot()
+                if self._active is not None and (snapshot.model_type, snapshot.version) == \
+                        (self._active.model_type, self._active.version):
+                    # ไฟล์ที่เปลี่ยนไม่ใช่ของโมเดลที่ให้บริการ (หรือแค่ mtime เปลี่ยน) ไม่ต้องสลับ
+                    self._seen_signature = signature
+                    self._failed_signature = None
+                    return False
+                self._warm(snapshot)
+            except Exception as e:
+                # โหลดไม่สำเร็จ (เช่น ไฟล์ยังคัดลอกไม่เสร็จ) ให้เวอร์ชันเดิมให้บริการต่อ
+                self.last_error = str(e)
+                self._failed_signature = signature
+                return False
+            self._active = snapshot
+            self._seen_signature = signature
+            self._failed_signature = None
+            self.last_error = None
+            return True
+        finally:
+            self._load_lock.release()
+
+    def start_watching(self):
+        """
+        เริ่ม background thread ที่เฝ้าดูโฟลเดอร์ model/ ทุก poll_interval วินาที
+        """
+        if self._watcher is not None:
+            return
+        self._watcher = threading.Thread(target=self._watch_loop, name="model-registry-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop_event.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def _watch_loop(self):
+        previous = directory_signature(self.model_dir, self.file_names)
+        while not self._stop_event.wait(self.poll_interval):
+            signature = directory_signature(self.model_dir, self.file_names)
+            # รอให้ signature นิ่งสองรอบติดกันก่อน เพื่อไม่โหลดไฟล์ที่กำลังคัดลอกอยู่
+            if signature == previous:
+                self.reload_if_changed()
+            previous = signature
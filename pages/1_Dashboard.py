@@ -0,0 +1,131 @@
+import streamlit as st
+import os
+import tempfile
+from datetime import date, timedelta
+
+from history_export import EXPORT_FORMATS, export_history
+from history_store import HistoryStore
+from maincai import apply_custom_css
+from settings import get_setting
+
+# --- ฟังก์ชัน query (แคชตาม write version ของ history store) ---
+
+@st.cache_resource
+def get_history_store():
+    """
+    สร้าง HistoryStore หนึ่งตัวต่อ process
+    """
+    return HistoryStore()
+
+@st.cache_data(max_entries=32)
+def load_aggregates(write_version, start, end, branch_code):
+    """
+    อ่าน aggregate ตามช่วงวันที่/สาขา ผลลัพธ์ถูกแคชจนกว่า write version จะเปลี่ยน
+    """
+    table = get_history_store().aggregates(start, end, branch_code or None)
+    return table.to_pandas()
+
+def build_export(export_format, start, end, branch_code, max_rows):
+    """
+    ส่งออกประวัติลงไฟล์ชั่วคราวแบบ streaming แล้วคืนค่า (เนื้อหาไฟล์, จำนวนแถว)
+    st.download_button ต้องได้เนื้อหาทั้งไฟล์ในหน่วยความจำ จึงจำกัดไว้ที่ max_rows แถว
+    """
+    fd, path = tempfile.mkstemp(suffix=f".{export_format}")
+    os.close(fd)
+    try:
+        count = export_history(get_history_store(), path, export_format, start, end, branch_code or None, max_rows)
+        with open(path, 'rb') as f:
+            return f.read(), count
+    finally:
+        os.remove(path)
+
+def summarize(df, by):
+    """
+    รวมจำนวนภาพและค่าเฉลี่ย confidence ตามคอลัมน์ที่ระบุ
+    """
+    summary = df.groupby(by, as_index=False)[["count", "confidence_count", "confidence_sum"]].sum()
+    summary["mean_confidence"] = summary["confidence_sum"] / summary["confidence_count"].where(summary["confidence_count"] > 0)
+    return summary
+
+# --- หน้า Dashboard ---
+
+def main():
+    st.set_page_config(
+        page_title="7-Connect PM AI - Dashboard",
+        page_icon="📊",
+        layout="wide",
+        initial_sidebar_state="collapsed"
+    )
+    apply_custom_css()
+    st.markdown('<h1 style="text-align: center; color: var(--seven-green);">📊 Operations Dashboard</h1>', unsafe_allow_html=True)
+
+    store = get_history_store()
+    write_version = store.write_version()
+    if write_version == 0:
+        st.info("ยังไม่มีข้อมูลใน history store — บันทึกผลการตรวจสอบจากหน้าหลัก หรือนำเข้าประวัติเดิมด้วย `python history_store.py import data.xlsx`")
+        st.stop()
+
+    col1, col2 = st.columns(2)
+    with col1:
+        date_range = st.date_input("ช่วงวันที่:", value=(date.today() - timedelta(days=90), date.today()))
+    with col2:
+        branch_code = st.text_input("รหัสสาขา (เว้นว่างเพื่อดูทุกสาขา):", placeholder="เช่น 12345").strip()
+
+    if not isinstance(date_range, (list, tuple)) or len(date_range) != 2:
+        st.stop()
+    start, end = date_range
+
+    df = load_aggregates(write_version, start, end, branch_code)
+    if df.empty:
+        st.warning("ไม่พบข้อมูลในช่วงที่เลือก")
+        st.stop()
+
+    # --- ตัวเลขสรุป ---
+    by_phase = summarize(df, "phase").set_index("phase")
+    metric_cols = st.columns(2 + len(by_phase))
+    metric_cols[0].metric("จำนวนภาพทั้งหมด", f"{int(by_phase['count'].sum()):,}")
+    metric_cols[1].metric("จำนวนสาขา", f"{df['branch_code'].nunique():,}")
+    for col, (phase, row) in zip(metric_cols[2:], by_phase.iterrows()):
+        col.metric(phase, f"{int(row['count']):,}", f"ความมั่นใจเฉลี่ย {row['mean_confidence']:.0%}", delta_color="off")
+
+    # --- แนวโน้มรายวันแยกตาม phase ---
+    st.subheader("แนวโน้มรายวันแยกตาม Phase")
+    by_date = summarize(df, ["date", "phase"])
+    st.bar_chart(by_date.pivot(index="date", columns="phase", values="count").fillna(0))
+
+    st.subheader("ความมั่นใจเฉลี่ยรายวัน")
+    st.line_chart(by_date.pivot(index="date", columns="phase", values="mean_confidence"))
+
+    # --- รายสาขา ---
+    st.subheader("จำนวนภาพรายสาขาแยกตาม Phase")
+    by_branch = summarize(df, ["branch_code", "phase"]).pivot(index="branch_code", columns="phase", values="count").fillna(0).astype(int)
+    by_branch["รวม"] = by_branch.sum(axis=1)
+    st.dataframe(by_branch.sort_values("รวม", ascending=False), use_container_width=True)
+
+    # --- ดาวน์โหลดข้อมูลรายแถว ---
+    st.subheader("ดาวน์โหลดข้อมูล")
+    col1, col2 = st.columns(2)
+    with col1:
+        export_format = st.radio("รูปแบบไฟล์:", EXPORT_FORMATS, horizontal=True)
+    with col2:
+        all_dates = st.checkbox("ทุกช่วงวันที่ (ไม่กรองตามวันที่ด้านบน)")
+    max_rows = int(get_setting("dashboard_export_max_rows"))
+    st.caption(f"ดาวน์โหลดได้สูงสุด {max_rows:,} แถวต่อไฟล์ ข้อมูลที่มากกว่านี้ให้ส่งออกด้วย "
+               "`python history_export.py <ไฟล์> --start ... --end ...` บนเครื่องที่รันแอป")
+    if st.button("📥 เตรียมไฟล์"):
+        with st.spinner("กำลังสร้างไฟล์..."):
+            data, count = build_export(export_format, None if all_dates else start, None if all_dates else end,
+                                       branch_code, max_rows)
+        if count >= max_rows:
+            st.warning(f"⚠️ ไฟล์มีเฉพาะ {max_rows:,} แถวแรก ช่วงที่เลือกอาจมีข้อมูลมากกว่านี้")
+        st.download_button(
+            f"💾 ดาวน์โหลด ({count:,} แถว)",
+            data=data,
+            file_name=f"pm_history_{date.today():%Y%m%d}.{export_format}",
+            mime="text/csv" if export_format == "csv" else "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+
+    st.caption(f"History store version {write_version}")
+
+if __name__ == "__main__":
+    main()
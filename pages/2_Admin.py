@@ -0,0 +1,219 @@
+import streamlit as st
+
+from admission import admission_report
+from drift_monitor import drift_report
+from maincai import apply_custom_css
+from memory_report import (
+    enable_tracemalloc, format_bytes, memory_summary, session_report, stage_report, top_allocations
+)
+from rerun_profiler import section_report, session_rerun_report, slowest_reruns, trigger_report
+from settings import get_setting
+
+# --- หน้า Admin: การใช้หน่วยความจำ ---
+
+def display_memory_summary():
+    """
+    แสดง RSS, หน่วยความจำของโมเดล และผลการวิเคราะห์ที่ session ต่างๆ ถือไว้
+    """
+    summary = memory_summary()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("RSS ของ process", format_bytes(summary["rss"]))
+    col2.metric("โมเดลใน cache", format_bytes(summary["model"]))
+    col3.metric("Session ที่มีผลการวิเคราะห์", summary["sessions"])
+    col4.metric("ผลการวิเคราะห์ใน session_state", format_bytes(summary["session_bytes"]))
+    if "traced" in summary:
+        st.caption(f"tracemalloc: ปัจจุบัน {format_bytes(summary['traced'])} · สูงสุด {format_bytes(summary['traced_peak'])}")
+
+def display_stages():
+    """
+    แสดงหน่วยความจำที่เพิ่มขึ้นในแต่ละขั้นตอนของ pipeline
+    """
+    st.subheader("🧩 รายขั้นตอน")
+    stages = stage_report()
+    if not stages:
+        st.info("ยังไม่มีข้อมูล — ใช้งานหน้าหลักอย่างน้อยหนึ่งครั้ง")
+        return
+    st.dataframe([
+        {
+            "ขั้นตอน": name,
+            "จำนวนครั้ง": stage["calls"],
+            "RSS ล่าสุด": format_bytes(stage["rss_delta_last"]),
+            "RSS สูงสุด": format_bytes(stage["rss_delta_max"]),
+            "tracemalloc ล่าสุด": "-" if stage["traced_delta_last"] is None else format_bytes(stage["traced_delta_last"]),
+            "tracemalloc สูงสุด": "-" if stage["traced_delta_max"] is None else format_bytes(stage["traced_delta_max"]),
+        }
+        for name, stage in stages.items()
+    ], use_container_width=True)
+
+def display_sessions():
+    """
+    แสดงขนาดโดยประมาณของ st.session_state['analysis_results'] ต่อ session
+    """
+    st.subheader("👥 รายการ session")
+    sessions = session_report()
+    if not sessions:
+        st.info("ไม่มี session ที่ถือผลการวิเคราะห์อยู่")
+        return
+    st.dataframe([
+        {"Session": session_id[:8], "จำนวนภาพ": usage["results"], "ขนาดโดยประมาณ": format_bytes(usage["bytes"])}
+        for session_id, usage in sorted(sessions.items(), key=lambda item: -item[1]["bytes"])
+    ], use_container_width=True)
+
+def display_allocations():
+    """
+    แสดงตำแหน่งในโค้ดที่จองหน่วยความจำมากที่สุดจาก tracemalloc
+    """
+    st.subheader("🔬 tracemalloc")
+    allocations = top_allocations()
+    if not allocations:
+        st.caption("tracemalloc ยังไม่เปิด (ตั้งค่า memory_tracemalloc หรือกดปุ่มด้านล่าง; มี overhead ต่อการทำงาน)")
+        if st.button("เปิด tracemalloc"):
+            enable_tracemalloc()
+            st.rerun()
+        return
+    st.dataframe([
+        {"ตำแหน่ง": location, "ขนาด": format_bytes(size), "จำนวนบล็อก": count}
+        for location, size, count in allocations
+    ], use_container_width=True)
+
+# --- คิวงาน (admission control) ---
+
+def display_admission():
+    """
+    แสดง slot ที่ใช้อยู่ ความยาวคิว เวลารอ และจำนวนงานที่ถูกปฏิเสธของการเรียกโมเดลและการบันทึก
+    """
+    st.subheader("🚦 คิวงาน")
+    report = admission_report()
+    if not report:
+        st.info("ยังไม่มีข้อมูล — ใช้งานหน้าหลักอย่างน้อยหนึ่งครั้ง")
+        return
+    st.dataframe([
+        {
+            "งาน": name,
+            "slot ที่ใช้อยู่": f"{stats['active']}/{stats['slots']}",
+            "รอคิว": f"{stats['waiting']}/{stats['max_queue']}",
+            "รับแล้ว": stats["admitted"],
+            "ต้องรอ": stats["waited"],
+            "รอเฉลี่ย": f"{stats['total_wait'] / stats['waited']:.1f} s" if stats["waited"] else "-",
+            "รอนานสุด": f"{stats['max_wait']:.1f} s",
+            "ถูกปฏิเสธ": stats["rejected"],
+        }
+        for name, stats in report.items()
+    ], use_container_width=True)
+
+# --- การกระจายของผลทำนาย (drift) ---
+
+def format_quantiles(quantiles):
+    return " / ".join("-" if value is None else f"{value:.2f}" for value in quantiles)
+
+def display_drift():
+    """
+    เทียบสัดส่วน phase และความมั่นใจของการทำนายล่าสุดกับ reference จาก Base/data แยกตามเวอร์ชันโมเดล
+    """
+    window_hours = get_setting("drift_window_hours")
+    st.subheader(f"📈 การกระจายของผลทำนาย ({window_hours} ชั่วโมงล่าสุด)")
+    reports = drift_report(window_hours, get_setting("drift_min_samples"), get_setting("drift_threshold"))
+    if not reports:
+        st.info("ยังไม่มีการทำนายตั้งแต่เริ่ม process")
+        return
+    for version, report in reports.items():
+        if report is None:
+            st.caption(f"โมเดล {version}: ยังไม่มี reference — รัน `python drift_monitor.py reference`")
+            continue
+        st.caption(f"โมเดล {version} · {report['samples']} รูป · JS ของสัดส่วน phase {report['class_divergence']:.3f}")
+        for alert in report["alerts"]:
+            st.warning(f"⚠️ {alert}")
+        st.dataframe([
+            {
+                "Phase": name,
+                "จำนวน": stats["count"],
+                "สัดส่วน": "-" if stats["share"] is None else f"{stats['share']:.0%}",
+                "สัดส่วน (reference)": "-" if stats["reference_share"] is None else f"{stats['reference_share']:.0%}",
+                "ความมั่นใจ p10/p50/p90": format_quantiles(stats["quantiles"]),
+                "reference p10/p50/p90": format_quantiles(stats["reference_quantiles"]),
+                "JS ความมั่นใจ": round(stats["confidence_divergence"], 3),
+            }
+            for name, stats in report["classes"].items()
+        ], use_container_width=True)
+
+# --- การรันสคริปต์ซ้ำ (rerun) ---
+
+def format_ms(seconds):
+    return f"{seconds * 1000:,.0f} ms"
+
+def display_reruns():
+    """
+    แสดงเวลาการรันสคริปต์ของหน้าหลักแยกตามส่วน, widget ที่กระตุ้น, session และรอบที่ช้าที่สุด
+    """
+    st.subheader("⏱️ การรันสคริปต์")
+    sections = section_report()
+    if not sections:
+        st.info("ยังไม่มีข้อมูล — ใช้งานหน้าหลักอย่างน้อยหนึ่งครั้ง")
+        return
+    col1, col2 = st.columns(2)
+    with col1:
+        st.caption("เวลาต่อรอบแยกตามส่วน")
+        st.dataframe([
+            {
+                "ส่วน": name,
+                "จำนวนครั้ง": stats["calls"],
+                "เฉลี่ย": format_ms(stats["total"] / stats["calls"]),
+                "สูงสุด": format_ms(stats["max"]),
+                "ล่าสุด": format_ms(stats["last"]),
+            }
+            for name, stats in sorted(sections.items(), key=lambda item: -item[1]["total"])
+        ], use_container_width=True)
+    with col2:
+        st.caption("widget ที่ทำให้รันซ้ำ")
+        st.dataframe([
+            {"Widget": name, "จำนวนรอบ": stats["calls"], "เฉลี่ย": format_ms(stats["total"] / stats["calls"]),
+             "เวลารวม": format_ms(stats["total"])}
+            for name, stats in sorted(trigger_report().items(), key=lambda item: -item[1]["total"])
+        ], use_container_width=True)
+
+    st.caption("รายการ session")
+    st.dataframe([
+        {
+            "Session": str(session_id)[:8],
+            "จำนวนรอบ": report["reruns"],
+            "รอบ/นาที": round(report["per_minute"], 1),
+            "เฉลี่ย": format_ms(report["mean"]),
+            "สูงสุด": format_ms(report["max"]),
+            "widget ล่าสุด": report["last_trigger"],
+        }
+        for session_id, report in sorted(session_rerun_report().items(), key=lambda item: -item[1]["per_minute"])
+    ], use_container_width=True)
+
+    st.caption("รอบที่ช้าที่สุด")
+    st.dataframe([
+        {
+            "Session": str(run["session"])[:8],
+            "Widget": run["trigger"],
+            "รวม": format_ms(run["duration"]),
+            **{name: format_ms(duration) for name, duration in run["sections"].items()},
+        }
+        for run in slowest_reruns()
+    ], use_container_width=True)
+
+def main():
+    st.set_page_config(
+        page_title="7-Connect PM AI - Admin",
+        page_icon="🛠️",
+        layout="wide",
+        initial_sidebar_state="collapsed"
+    )
+    apply_custom_css()
+    st.markdown('<h1 style="text-align: center; color: var(--seven-green);">🛠️ Admin · หน่วยความจำและการรันสคริปต์</h1>', unsafe_allow_html=True)
+
+    if st.button("🔄 รีเฟรช"):
+        st.rerun()
+    display_memory_summary()
+    display_stages()
+    display_sessions()
+    display_allocations()
+    display_drift()
+    display_admission()
+    display_reruns()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+ตัวอัปโหลดรูปที่ย่อรูปในเบราว์เซอร์ก่อนส่ง (custom component ใน components/photo_uploader/)
+
+รูปจากมือถือ 5-15 MB ถูกย่อให้ด้านยาวไม่เกิน client_resize_max_edge และ encode เป็น JPEG ด้วย
+client_resize_quality ตาม EXIF orientation ของรูปก่อนส่ง ส่วนที่ server ได้รับเป็น ShrunkUpload
+ซึ่งใช้แทน UploadedFile ของ st.file_uploader ได้ (อ่านด้วย PIL, seek, .name, .size, .file_id)
+"""
+import base64
+import binascii
+import io
+import os
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+COMPONENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "components", "photo_uploader")
+
+_component = components.declare_component("photo_uploader", path=COMPONENT_DIR)
+
+
+class ShrunkUpload(io.BytesIO):
+    """
+    รูปหนึ่งไฟล์ที่ได้จากเบราว์เซอร์ (resized = False ถ้าเบราว์เซอร์ย่อไม่ได้และส่งไฟล์เดิมมา)
+    """
+
+    def __init__(self, data, name, type, file_id, original_size=None, resized=True):
+        super().__init__(data)
+        self.name = name
+        self.type = type
+        self.size = len(data)
+        self.file_id = file_id
+        self.original_size = original_size or self.size
+        self.resized = resized
+
+
+def decode_uploads(value):
+    """
+    แปลงค่าของ component ({"nonce": ..., "files": [...]}) เป็น ShrunkUpload ข้ามรายการที่ไม่ใช่ base64
+    """
+    if not value:
+        return []
+    uploads = []
+    for index, item in enumerate(value.get("files") or []):
+        try:
+            data = base64.b64decode(item["data"], validate=True)
+        except (KeyError, TypeError, binascii.Error):
+            continue
+        uploads.append(ShrunkUpload(
+            data,
+            item.get("name") or f"photo_{index + 1}.jpg",
+            item.get("type") or "image/jpeg",
+            f"{value.get('nonce')}-{index}",
+            item.get("original_size"),
+            bool(item.get("resized", True)),
+        ))
+    return uploads
+
+
+def photo_uploader(label, types, max_edge=1280, quality=0.85, key="photo_uploader", on_change=None):
+    """
+    แสดงตัวอัปโหลดและคืนค่ารายการ ShrunkUpload (ว่างถ้ายังไม่ได้เลือกรูป)
+    ผลการ decode ถูกเก็บใน session_state ตาม nonce ของชุดรูป จึง decode base64 ครั้งเดียวต่อการอัปโหลด
+    """
+    value = _component(label=label, types=list(types), max_edge=int(max_edge), quality=float(quality),
+                       key=key, default=None, on_change=on_change)
+    nonce = value.get("nonce") if value else None
+    cache_key = f"_{key}_uploads"
+    cached = st.session_state.get(cache_key)
+    if cached is None or cached[0] != nonce:
+        cached = (nonce, decode_uploads(value))
+        st.session_state[cache_key] = cached
+    for upload in cached[1]:
+        upload.seek(0)
+    return cached[1]
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+แปลง model/keras_model.h5 เป็นโมเดล TensorFlow Lite แบบ quantized สำหรับ backend "tflite"
+
+    python quantize_model.py                  # น้ำหนักเป็น float16 (ค่าเริ่มต้น: agreement กับ Keras ~99%)
+    python quantize_model.py --dynamic-range  # น้ำหนักเป็น int8 (ไฟล์เล็กกว่า แต่ agreement ~95% ต่ำกว่า min_backend_agreement)
+    python quantize_model.py --int8           # full integer quantization ใช้ภาพใน Base/data เป็น representative dataset
+"""
+import argparse
+import os
+import sys
+
+from backends import normalize_batch
+from dataset_cache import DATA_DIR, load_dataset
+
+
+def representative_images(data_dir, limit):
+    """
+    สุ่มภาพจากแคชของ data_dir เพื่อใช้ calibrate ช่วงค่าของ activation
+    """
+    dataset = load_dataset(data_dir)
+    for count, (images, _, _) in enumerate(dataset.iter_batches(batch_size=1, shuffle=True)):
+        if count >= limit:
+            break
+        yield [normalize_batch(images)]
+
+
+def configure_quantization(converter, dynamic_range=False):
+    """
+    ตั้งค่า quantization แบบเดียวกันทุกสคริปต์ที่สร้าง .tflite: float16 โดยค่าเริ่มต้น
+    (dynamic range ทำให้ผล top-1 ต่างจากโมเดลเดิมเกิน 5% ของภาพ)
+    """
+    import tensorflow as tf
+
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if not dynamic_range:
+        converter.target_spec.supported_types = [tf.float16]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="model/keras_model.h5")
+    parser.add_argument("--output", default="model/model_quantized.tflite")
+    parser.add_argument("--dynamic-range", action="store_true", help="น้ำหนักเป็น int8 แทน float16")
+    parser.add_argument("--int8", action="store_true", help="full integer quantization (ต้องใช้ภาพตัวอย่าง)")
+    parser.add_argument("--data", default=DATA_DIR)
+    parser.add_argument("--samples", type=int, default=100)
+    args = parser.parse_args()
+
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(args.model, compile=False)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    configure_quantization(converter, args.dynamic_range or args.int8)
+    if args.int8:
+        converter.representative_dataset = lambda: representative_images(args.data, args.samples)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.uint8
+        converter.inference_output_type = tf.uint8
+
+    tflite_model = converter.convert()
+    # เขียนไฟล์ชั่วคราวก่อนแล้วค่อยแทนที่ เพื่อไม่ให้ Model Registry โหลดไฟล์ที่เขียนไม่เสร็จ
+    tmp_path = args.output + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(tflite_model)
+    os.replace(tmp_path, args.output)
+    print(f"✅ บันทึกโมเดล {args.output} ({len(tflite_model) / 1024:.0f} KB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
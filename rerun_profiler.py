@@ -0,0 +1,134 @@
+"""
+บันทึกการรันสคริปต์ซ้ำ (rerun) ของ Streamlit: แต่ละ session รันบ่อยแค่ไหน widget ไหนเป็นตัวกระตุ้น
+และแต่ละรอบใช้เวลาเท่าไรแยกตามส่วน (header, model_load, upload_loop, result_grid, save)
+
+- profile_rerun(session_id, trigger) ครอบการรันสคริปต์หนึ่งรอบ
+- rerun_section(name) ครอบแต่ละส่วนภายในรอบนั้น (เรียกหลายครั้งในรอบเดียวได้ เวลาจะถูกรวมกัน)
+- เก็บประวัติล่าสุดแบบ rolling ทั้งรวมทุก session และแยกต่อ session และ log รอบที่ช้ากว่า slow_ms
+"""
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger("pm_ai.rerun")
+
+HISTORY_SIZE = 200
+SESSION_HISTORY_SIZE = 50
+
+_RERUNS = deque(maxlen=HISTORY_SIZE)
+_SESSIONS = {}
+_SECTIONS = {}
+_TRIGGERS = {}
+_LOCK = threading.Lock()
+# รอบที่กำลังรันของ thread นี้ (Streamlit รันสคริปต์ของแต่ละ session ใน thread ของตัวเอง)
+_CURRENT = threading.local()
+
+
+def _add_timing(stats, name, duration):
+    entry = stats.setdefault(name, {"calls": 0, "total": 0.0, "max": 0.0, "last": 0.0})
+    entry["calls"] += 1
+    entry["total"] += duration
+    entry["max"] = max(entry["max"], duration)
+    entry["last"] = duration
+
+
+@contextmanager
+def rerun_section(name):
+    """
+    จับเวลาส่วน name ของรอบที่กำลังรัน (ไม่มีผลถ้าไม่ได้อยู่ใน profile_rerun)
+    """
+    run = getattr(_CURRENT, "run", None)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if run is not None:
+            run["sections"][name] = run["sections"].get(name, 0.0) + time.perf_counter() - start
+
+
+@contextmanager
+def profile_rerun(session_id, trigger=None, slow_ms=None):
+    """
+    ครอบการรันสคริปต์หนึ่งรอบ บันทึกผลแม้รอบนั้นจบด้วย st.stop() หรือ st.rerun() (ซึ่งเป็น exception)
+    """
+    run = {"session": session_id, "trigger": trigger or "unknown", "started_at": time.time(), "sections": {}}
+    _CURRENT.run = run
+    start = time.perf_counter()
+    try:
+        yield run
+    finally:
+        _CURRENT.run = None
+        run["duration"] = time.perf_counter() - start
+        record_rerun(run)
+        if slow_ms and run["duration"] * 1000 > slow_ms:
+            logger.warning("slow rerun %s", format_rerun(run))
+
+
+def record_rerun(run):
+    with _LOCK:
+        _RERUNS.append(run)
+        _add_timing(_SECTIONS, "total", run["duration"])
+        for name, duration in run["sections"].items():
+            _add_timing(_SECTIONS, name, duration)
+        _add_timing(_TRIGGERS, run["trigger"], run["duration"])
+        session = _SESSIONS.setdefault(run["session"], {
+            "reruns": 0, "total": 0.0, "first_at": run["started_at"], "recent": deque(maxlen=SESSION_HISTORY_SIZE),
+        })
+        session["reruns"] += 1
+        session["total"] += run["duration"]
+        session["last_at"] = run["started_at"]
+        session["recent"].append(run)
+
+
+def format_rerun(run):
+    sections = " ".join(f"{name}={duration * 1000:.0f}ms" for name, duration in run["sections"].items())
+    return (f"session={str(run['session'])[:8]} trigger={run['trigger']} total={run['duration'] * 1000:.0f}ms"
+            + (f" {sections}" if sections else ""))
+
+
+def section_report():
+    """
+    สถิติเวลาต่อส่วน (และ "total" ของทั้งรอบ): calls, total, max, last เป็นวินาที
+    """
+    with _LOCK:
+        return {name: dict(stats) for name, stats in _SECTIONS.items()}
+
+
+def trigger_report():
+    """
+    จำนวนรอบและเวลารวมแยกตาม widget ที่กระตุ้น
+    """
+    with _LOCK:
+        return {name: dict(stats) for name, stats in _TRIGGERS.items()}
+
+
+def session_rerun_report(max_age=1800):
+    """
+    สรุปต่อ session (ตัด session ที่ไม่มีการรันนานกว่า max_age วินาทีออก)
+    """
+    now = time.time()
+    with _LOCK:
+        for session_id in [s for s, session in _SESSIONS.items() if now - session["last_at"] > max_age]:
+            del _SESSIONS[session_id]
+        report = {}
+        for session_id, session in _SESSIONS.items():
+            minutes = max((session["last_at"] - session["first_at"]) / 60, 1)
+            report[session_id] = {
+                "reruns": session["reruns"],
+                "per_minute": session["reruns"] / minutes,
+                "mean": session["total"] / session["reruns"],
+                "max": max(run["duration"] for run in session["recent"]),
+                "last_trigger": session["recent"][-1]["trigger"],
+            }
+        return report
+
+
+def slowest_reruns(limit=10):
+    """
+    รอบที่ช้าที่สุดในประวัติล่าสุด (รวมทุก session)
+    """
+    with _LOCK:
+        runs = list(_RERUNS)
+    return sorted(runs, key=lambda run: -run["duration"])[:limit]
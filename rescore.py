@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+วิเคราะห์รูปที่บันทึกไว้ซ้ำด้วยโมเดลปัจจุบัน (หลังเปลี่ยนไฟล์ใน model/)
+
+ทุกแถวบันทึก content hash ของโมเดลที่ใช้ (Model Version) ไว้แล้ว งานนี้เลือกเฉพาะแถวใน manifest ของ images/
+ที่ hash ต่างจากโมเดลปัจจุบัน อ่านรูปจาก images/ เป็น batch และเก็บผลใหม่ในตาราง rescores แยกจากผลเดิม
+(ผลเดิมใน data.xlsx และ manifest ไม่ถูกแก้) checkpoint ถูกบันทึกพร้อมผลของแต่ละ batch จึงรันต่อจากจุดที่หยุดได้
+
+    python rescore.py status                   # จำนวนแถวที่ยังไม่ได้วิเคราะห์ซ้ำด้วยโมเดลปัจจุบัน
+    python rescore.py run                      # วิเคราะห์ซ้ำ (รันต่อจาก checkpoint)
+    python rescore.py run --limit 500 --batch-size 32
+    python rescore.py compare --csv rescore.csv  # เทียบผลเดิมกับผลใหม่
+"""
+import argparse
+import csv
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+from PIL import Image
+
+from backends import (
+    backend_input_size, backend_model_files, classify_batch, load_backend, loaded_model_files, preprocess_image
+)
+from image_archive import ARCHIVE_DIR, ImageArchive
+from model_registry import ModelRegistry
+from runtime_profile import apply_runtime_profile
+from settings import get_setting
+
+
+def load_current_model(spec=None):
+    """
+    โหลดโมเดลตาม backend ที่ตั้งค่าไว้ คืนค่า ModelSnapshot (version = content hash แบบเดียวกับที่แอปบันทึก)
+    """
+    spec = spec or get_setting("backend")
+
+    def loader():
+        apply_runtime_profile()
+        return load_backend(spec)
+
+    registry = ModelRegistry(loader, file_names=backend_model_files(spec), version_files=loaded_model_files)
+    registry.load_initial()
+    return registry.current()
+
+
+def current_model_version(spec=None):
+    """
+    เวอร์ชันของโมเดลที่ spec โหลดได้จริง (ต้องโหลดเพื่อรู้ว่าได้ backend ไหน กฎเดียวกับแอป)
+    """
+    return load_current_model(spec).version
+
+
+def score_rows(archive, rows, snapshot):
+    """
+    วิเคราะห์รูปของแถวใน batch เดียว คืนค่าผลต่อแถว (รูปที่เปิดไม่ได้มี error แทนผล)
+    """
+    input_size = backend_input_size(snapshot.model_type)
+    results, arrays, scored = [], [], []
+    for row in rows:
+        try:
+            with Image.open(archive.absolute_path(row['path'])) as image:
+                arrays.append(preprocess_image(image.convert('RGB'), input_size))
+            scored.append(row)
+        except OSError as e:
+            results.append({'image_filename': row['image_filename'], 'error': str(e)})
+    if arrays:
+        probabilities = classify_batch(snapshot.model_type, snapshot.model, np.stack(arrays))
+        for row, image_probabilities in zip(scored, probabilities):
+            index = int(np.argmax(image_probabilities))
+            results.append({
+                'image_filename': row['image_filename'],
+                'phase': snapshot.class_names[index],
+                'confidence': float(image_probabilities[index]),
+            })
+    return results
+
+
+def rescore(archive, snapshot, batch_size=32, limit=None, restart=False, progress=print):
+    """
+    วิเคราะห์ซ้ำแถวที่ค้างอยู่ทีละ batch เริ่มต่อจาก checkpoint ของเวอร์ชันนี้ (restart = เริ่มจากต้น)
+    คืนค่าจำนวนแถวที่วิเคราะห์ในรอบนี้
+    """
+    after = None if restart else archive.rescore_checkpoint(snapshot.version)
+    done = 0
+    start = time.perf_counter()
+    while limit is None or done < limit:
+        size = batch_size if limit is None else min(batch_size, limit - done)
+        rows = archive.pending_rescore(snapshot.version, after=after, limit=size)
+        if not rows:
+            break
+        results = score_rows(archive, rows, snapshot)
+        archive.add_rescores(snapshot.version, results)
+        after = rows[-1]['image_filename']
+        done += len(rows)
+        progress(f"   {done} รูป · {done / (time.perf_counter() - start):.1f} รูป/วินาที · ล่าสุด {after}")
+    return done
+
+
+def comparison_summary(rows):
+    """
+    สรุปจำนวนรูปที่ผลใหม่ตรง/ไม่ตรงกับผลเดิม และคู่ (ผลเดิม → ผลใหม่) ที่เปลี่ยนบ่อยที่สุด
+    """
+    scored = [row for row in rows if not row['error']]
+    changes = Counter((row['old_phase'], row['new_phase']) for row in scored if row['old_phase'] != row['new_phase'])
+    return {
+        'scored': len(scored),
+        'errors': len(rows) - len(scored),
+        'unchanged': len(scored) - sum(changes.values()),
+        'changes': changes.most_common(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", default=ARCHIVE_DIR)
+    parser.add_argument("--backend", default=None, help="ค่าเริ่มต้นตาม backend ใน settings")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("status", help="จำนวนแถวที่รอวิเคราะห์ซ้ำ")
+    run_parser = subparsers.add_parser("run", help="วิเคราะห์ซ้ำด้วยโมเดลปัจจุบัน")
+    run_parser.add_argument("--batch-size", type=int, default=32)
+    run_parser.add_argument("--limit", type=int, default=None, help="จำนวนรูปสูงสุดในรอบนี้")
+    run_parser.add_argument("--restart", action="store_true", help="ไม่ใช้ checkpoint เริ่มตรวจจากแถวแรก")
+    compare_parser = subparsers.add_parser("compare", help="เทียบผลเดิมกับผลของโมเดลปัจจุบัน")
+    compare_parser.add_argument("--csv", default=None, help="เขียนผลรายรูปลงไฟล์ CSV")
+    args = parser.parse_args()
+
+    archive = ImageArchive(args.root)
+    if args.command == "run":
+        snapshot = load_current_model(args.backend)
+        print(f"🔁 วิเคราะห์ซ้ำด้วย {snapshot.model_type} เวอร์ชัน {snapshot.version}")
+        count = rescore(archive, snapshot, args.batch_size, args.limit, args.restart)
+        print(f"✅ วิเคราะห์ซ้ำ {count} รูป · เหลือ {archive.pending_rescore(snapshot.version, count=True)} รูป")
+        return 0
+
+    version = current_model_version(args.backend)
+    if args.command == "status":
+        print(f"โมเดลปัจจุบัน: {version}")
+        print(f"checkpoint: {archive.rescore_checkpoint(version) or '-'}")
+        print(f"รอวิเคราะห์ซ้ำ: {archive.pending_rescore(version, count=True)} จาก {archive.count()} รูป")
+        return 0
+
+    rows = archive.rescore_comparison(version)
+    summary = comparison_summary(rows)
+    print(f"โมเดลปัจจุบัน: {version} · วิเคราะห์ซ้ำแล้ว {summary['scored']} รูป (เปิดไม่ได้ {summary['errors']})")
+    if summary['scored']:
+        print(f"ผลเหมือนเดิม: {summary['unchanged']} รูป ({summary['unchanged'] / summary['scored']:.1%})")
+    for (old_phase, new_phase), count in summary['changes']:
+        print(f"   {old_phase or '-':<4} → {new_phase:<4} {count}")
+    if args.csv:
+        with open(args.csv, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ['image_filename'])
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"✅ บันทึก {args.csv}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
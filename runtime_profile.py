@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+โปรไฟล์การใช้ CPU ของ TensorFlow / TFLite (จำนวน thread, oneDNN และ CPU affinity)
+
+thread pool ค่าเริ่มต้นของ TensorFlow ใช้จำนวนคอร์ทั้งเครื่อง ไม่ใช่ CPU quota ของ container
+ถ้ามีหลาย replica บนเครื่องเดียวกันจะแย่งคอร์กันจน latency กระโดด โปรไฟล์นี้ถูกใช้ก่อนโหลดโมเดล
+("auto" = ใช้จำนวน CPU ตาม quota ของ cgroup / affinity)
+
+    python runtime_profile.py show                 # โปรไฟล์ปัจจุบันและ CPU quota ที่ตรวจพบ
+    python runtime_profile.py tune                 # วัดผลหลายชุดค่ากับโมเดลและรูปจริง แล้วบันทึกชุดที่ดีที่สุด
+    python runtime_profile.py tune --dry-run --images 20
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+
+from settings import DEFAULT_SETTINGS, get_setting, save_settings
+
+_applied = None
+
+
+def detect_cpu_quota():
+    """
+    จำนวน CPU ที่ process ใช้ได้จริง (ค่าต่ำสุดระหว่าง cgroup quota และ CPU affinity)
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quota = None
+    try:
+        # cgroup v2: "<quota> <period>" หรือ "max <period>"
+        with open("/sys/fs/cgroup/cpu.max", 'r') as f:
+            value, period = f.read().split()
+        if value != "max":
+            quota = int(value) / int(period)
+    except (OSError, ValueError):
+        try:
+            # cgroup v1
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us", 'r') as f:
+                value = int(f.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us", 'r') as f:
+                period = int(f.read())
+            if value > 0:
+                quota = value / period
+        except (OSError, ValueError):
+            pass
+    if quota is not None:
+        cpus = min(cpus, max(1, math.ceil(quota)))
+    return cpus
+
+
+def load_profile():
+    """
+    โปรไฟล์จาก settings ("runtime_profile") เติมค่าที่ไม่ได้ระบุด้วยค่าเริ่มต้น
+    """
+    return dict(DEFAULT_SETTINGS["runtime_profile"], **(get_setting("runtime_profile") or {}))
+
+
+def resolve_profile(profile=None):
+    """
+    แปลงค่า "auto" เป็นตัวเลขตาม CPU quota ที่ตรวจพบ
+    """
+    profile = dict(load_profile() if profile is None else profile)
+    cpus = detect_cpu_quota()
+    if profile.get("intra_op_threads") == "auto":
+        profile["intra_op_threads"] = cpus
+    if profile.get("inter_op_threads") == "auto":
+        profile["inter_op_threads"] = 1 if cpus <= 2 else 2
+    return profile
+
+
+def apply_runtime_profile(profile=None):
+    """
+    ตั้งค่า runtime ตามโปรไฟล์ (ทำครั้งเดียวต่อ process และต้องทำก่อน TensorFlow เริ่มทำงาน)
+    คืนค่าโปรไฟล์ที่ใช้จริง
+    """
+    global _applied
+    if _applied is not None:
+        return _applied
+    profile = resolve_profile(profile)
+
+    if profile.get("onednn") is not None:
+        # มีผลเฉพาะเมื่อตั้งก่อน import tensorflow
+        os.environ["TF_ENABLE_ONEDNN_OPTS"] = "1" if profile["onednn"] else "0"
+    if profile.get("cpu_affinity") and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, profile["cpu_affinity"])
+
+    if "tensorflow" in sys.modules:
+        import tensorflow as tf
+        try:
+            if profile.get("intra_op_threads"):
+                tf.config.threading.set_intra_op_parallelism_threads(int(profile["intra_op_threads"]))
+            if profile.get("inter_op_threads"):
+                tf.config.threading.set_inter_op_parallelism_threads(int(profile["inter_op_threads"]))
+        except RuntimeError as e:
+            # TensorFlow เริ่มทำงานไปแล้ว ค่า thread จะมีผลหลังรีสตาร์ท process
+            profile["error"] = str(e)
+    else:
+        # ยังไม่ได้ import tensorflow: ตั้งผ่าน environment variable ที่ TensorFlow/oneDNN อ่านตอนเริ่มทำงาน
+        # (ไม่ import tensorflow ที่นี่ เพื่อไม่ให้ backend ที่ไม่ใช้ TensorFlow ช้าลง)
+        if profile.get("intra_op_threads"):
+            os.environ["TF_NUM_INTRAOP_THREADS"] = str(int(profile["intra_op_threads"]))
+            os.environ["OMP_NUM_THREADS"] = str(int(profile["intra_op_threads"]))
+        if profile.get("inter_op_threads"):
+            os.environ["TF_NUM_INTEROP_THREADS"] = str(int(profile["inter_op_threads"]))
+    _applied = profile
+    return profile
+
+
+def tflite_num_threads():
+    """
+    จำนวน thread ของ TFLite Interpreter ตามโปรไฟล์ที่ใช้อยู่
+    """
+    profile = _applied or resolve_profile()
+    return int(profile["intra_op_threads"]) if profile.get("intra_op_threads") else None
+
+
+# --- auto-tune ---
+
+def benchmark(profile, backend, images, repeats=1):
+    """
+    ใช้โปรไฟล์ โหลดโมเดล แล้ววัดเวลาวิเคราะห์รูปทีละรูปแบบเดียวกับแอป (รันใน process ใหม่ของแต่ละโปรไฟล์)
+    """
+    import numpy as np
+    from PIL import Image
+
+    apply_runtime_profile(profile)
+    from backends import backend_input_size, classify_batch, load_backend, preprocess_image
+
+    model, _, model_type = load_backend(backend)
+    arrays = []
+    for path in images:
+        with Image.open(path) as image:
+            arrays.append(preprocess_image(image.convert('RGB'), backend_input_size(model_type)))
+    classify_batch(model_type, model, arrays[0][np.newaxis])
+
+    latencies = []
+    for _ in range(repeats):
+        for image_array in arrays:
+            start = time.perf_counter()
+            classify_batch(model_type, model, image_array[np.newaxis])
+            latencies.append((time.perf_counter() - start) * 1000)
+    p50, p95 = np.percentile(latencies, [50, 95])
+    return {"backend": model_type, "p50_ms": float(p50), "p95_ms": float(p95), "mean_ms": float(np.mean(latencies))}
+
+
+def candidate_profiles(cpus):
+    """
+    ชุดค่าที่จะทดลอง: จำนวน thread เป็นกำลังของ 2 จนถึง CPU quota และเปิด/ปิด oneDNN
+    """
+    threads = sorted({2 ** i for i in range(int(math.log2(cpus)) + 1)} | {cpus})
+    for intra, inter, onednn in itertools.product(threads, sorted({1, min(2, cpus)}), (True, False)):
+        yield {"intra_op_threads": intra, "inter_op_threads": inter, "onednn": onednn, "cpu_affinity": None}
+
+
+def run_candidate(profile, backend, images, repeats, timeout=600):
+    command = [sys.executable, os.path.abspath(__file__), "bench", "--profile", json.dumps(profile),
+               "--backend", backend, "--repeats", str(repeats), "--"] + images
+    result = subprocess.run(command, capture_output=True, text=True, timeout=timeout)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "benchmark failed")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def tune(backend, images, repeats, dry_run=False):
+    cpus = detect_cpu_quota()
+    print(f"🧮 CPU ที่ใช้ได้: {cpus} · backend: {backend} · {len(images)} รูป x {repeats} รอบ")
+    print(f"{'intra':>5} {'inter':>5} {'oneDNN':>6} {'p50':>8} {'p95':>8}")
+    results = []
+    for profile in candidate_profiles(cpus):
+        try:
+            report = run_candidate(profile, backend, images, repeats)
+        except Exception as e:
+            print(f"{profile['intra_op_threads']:>5} {profile['inter_op_threads']:>5} {str(profile['onednn']):>6}  ⚠️ {e}")
+            continue
+        results.append((profile, report))
+        print(f"{profile['intra_op_threads']:>5} {profile['inter_op_threads']:>5} {str(profile['onednn']):>6} "
+              f"{report['p50_ms']:>6.1f}ms {report['p95_ms']:>6.1f}ms")
+    if not results:
+        print("❌ ไม่มีโปรไฟล์ที่วัดผลได้")
+        return 1
+
+    # เลือกจาก p95 ก่อน เพราะปัญหาคือ latency กระโดด แล้วจึงดู p50
+    best, report = min(results, key=lambda item: (round(item[1]["p95_ms"], 1), item[1]["p50_ms"]))
+    print(f"\n🏆 โปรไฟล์ที่ดีที่สุด: {json.dumps(best)} (p50 {report['p50_ms']:.1f}ms, p95 {report['p95_ms']:.1f}ms)")
+    if dry_run:
+        return 0
+    save_settings({"runtime_profile": best})
+    print("✅ บันทึกลง settings.json แล้ว (มีผลเมื่อรีสตาร์ทแอป)")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("show", help="แสดงโปรไฟล์ปัจจุบัน")
+    tune_parser = subparsers.add_parser("tune", help="วัดผลหลายโปรไฟล์และบันทึกโปรไฟล์ที่ดีที่สุด")
+    tune_parser.add_argument("--backend", default=None, help="ค่าเริ่มต้นตาม backend ใน settings")
+    tune_parser.add_argument("--images", type=int, default=30, help="จำนวนรูปจริงที่ใช้วัดผล")
+    tune_parser.add_argument("--repeats", type=int, default=2)
+    tune_parser.add_argument("--data", default=None)
+    tune_parser.add_argument("--dry-run", action="store_true", help="แสดงผลอย่างเดียว ไม่บันทึก")
+    bench_parser = subparsers.add_parser("bench", help=argparse.SUPPRESS)
+    bench_parser.add_argument("--profile", required=True)
+    bench_parser.add_argument("--backend", required=True)
+    bench_parser.add_argument("--repeats", type=int, default=1)
+    bench_parser.add_argument("images", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "show":
+        print(f"CPU ที่ใช้ได้: {detect_cpu_quota()}")
+        print(f"โปรไฟล์ใน settings: {json.dumps(load_profile())}")
+        print(f"ค่าที่จะใช้: {json.dumps(resolve_profile())}")
+        return 0
+    if args.command == "bench":
+        print(json.dumps(benchmark(json.loads(args.profile), args.backend, args.images, args.repeats)))
+        return 0
+
+    from dataset_cache import DATA_DIR, IMAGE_EXTENSIONS, list_labelled_images
+    from backends import load_class_names
+    data_dir = args.data or DATA_DIR
+    items = list_labelled_images(data_dir, load_class_names())
+    # กระจายรูปจากทุกคลาสเท่าๆ กัน
+    step = max(1, len(items) // args.images)
+    images = [os.path.join(data_dir, path) for path, _ in items[::step][:args.images] if path.lower().endswith(IMAGE_EXTENSIONS)]
+    if not images:
+        print(f"❌ ไม่พบรูปภาพใน {data_dir}")
+        return 2
+    return tune(args.backend or get_setting("backend"), images, args.repeats, args.dry_run)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
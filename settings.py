@@ -0,0 +1,141 @@
+"""
+การตั้งค่าของแอปพลิเคชัน
+
+อ่านค่าเริ่มต้นจาก DEFAULT_SETTINGS แล้วทับด้วยไฟล์ settings.json (ถ้ามี)
+และทับอีกชั้นด้วย environment variable ที่ขึ้นต้นด้วย PM_AI_ เช่น PM_AI_BACKEND=pickle
+"""
+import json
+import os
+
+SETTINGS_PATH = "settings.json"
+ENV_PREFIX = "PM_AI_"
+
+DEFAULT_SETTINGS = {
+    # ลำดับ backend ที่จะลองโหลด คั่นด้วยจุลภาค หรือ "auto" เพื่อใช้ลำดับมาตรฐาน
+    "backend": "auto",
+    # โหมด cascade (backend = "cascade"): tier จากถูกไปแพง และ threshold ความมั่นใจที่ยอมรับผลของ tier ที่ถูกกว่า
+    "cascade_tiers": "tflite,tensorflow",
+    "cascade_threshold": 0.85,
+    # threshold แยกราย tier เช่น {"simple": 0.95} (ถ้าไม่ระบุใช้ cascade_threshold)
+    "cascade_thresholds": {},
+    # top-1 agreement ขั้นต่ำกับโมเดล Keras แบบ float ที่ evaluate_backends.py ยอมรับ
+    "min_backend_agreement": 0.95,
+    # log สรุปหน่วยความจำทุกกี่วินาที (0 = ปิด) และเปิด tracemalloc เพื่อดู breakdown รายขั้นตอนหรือไม่
+    "memory_log_interval": 300,
+    "memory_tracemalloc": False,
+    # การใช้ CPU ของ TensorFlow/TFLite ("auto" = ตาม CPU quota ของ container, onednn null = ค่าเริ่มต้นของ TensorFlow)
+    # ปรับอัตโนมัติด้วย python runtime_profile.py tune
+    "runtime_profile": {"intra_op_threads": "auto", "inter_op_threads": "auto", "onednn": None, "cpu_affinity": None},
+    # โหมดวิดีโอ: สุ่มอ่านกี่เฟรมต่อวินาที, "rate" = ตามอัตรา หรือ "scene" = เฉพาะเมื่อฉากเปลี่ยนเกิน video_scene_threshold
+    # ตัดเฟรมที่ต่างจากเฟรมก่อนหน้าน้อยกว่า video_dedup_threshold (ค่าเฉลี่ยความต่างของภาพขาวดำ 0..1)
+    "video_sample_fps": 2.0,
+    "video_sampling": "rate",
+    "video_scene_threshold": 0.12,
+    "video_dedup_threshold": 0.02,
+    "video_batch_size": 16,
+    "video_max_frames": 300,
+    "video_best_frames": 3,
+    # อัปโหลดแบบ ZIP: จำนวนรูปที่ decode พร้อมกันสูงสุด, จำนวนรูปสูงสุดต่อไฟล์ และขนาดสูงสุดของรูปหนึ่งไฟล์เมื่อแตกแล้ว
+    "zip_batch_size": 16,
+    "zip_max_images": 1000,
+    "zip_max_member_bytes": 52428800,
+    # จำนวนการตรวจสอบล่าสุดที่แสดงในประวัติของสาขา
+    "branch_history_limit": 12,
+    # จำนวนแถวสูงสุดของไฟล์ที่ดาวน์โหลดจากหน้า Dashboard (st.download_button ถือทั้งไฟล์ไว้ในหน่วยความจำ)
+    # ไฟล์ที่ใหญ่กว่านี้ส่งออกด้วย python history_export.py
+    "dashboard_export_max_rows": 100000,
+    # ตรวจคุณภาพรูปก่อนวิเคราะห์ (quality_gate.py) รูปที่ไม่ผ่านจะไม่ถูกส่งให้โมเดลถ้าผู้ใช้ไม่เลือกให้วิเคราะห์
+    # ค่าที่ตั้งไว้ต่ำ/สูงกว่ารูปใน Base/data ทุกรูปหลายเท่า (ความคมต่ำสุด ~320, ความสว่าง 77-195, clipping สูงสุด 0.28)
+    "quality_gate": True,
+    "quality_min_sharpness": 60,
+    "quality_min_brightness": 40,
+    "quality_max_brightness": 220,
+    "quality_max_clipped": 0.5,
+    # ย่อรูปในเบราว์เซอร์ก่อนอัปโหลด: ด้านยาวสูงสุด (pixel) และคุณภาพ JPEG (0..1)
+    # ปิด (false) เพื่อใช้ st.file_uploader ส่งไฟล์เต็มขนาดแบบเดิม
+    "client_resize": True,
+    "client_resize_max_edge": 1280,
+    "client_resize_quality": 0.85,
+    # admission control: จำนวนงานเรียกโมเดล/บันทึกที่รันพร้อมกันทั้ง process ("auto" = ครึ่งหนึ่งของ CPU)
+    # งานที่เกินต่อคิว ถ้าคิวยาวเกิน admission_max_queue หรือรอนานเกิน admission_max_wait วินาทีจะถูกปฏิเสธ
+    "inference_slots": "auto",
+    "save_slots": 1,
+    "admission_max_queue": 32,
+    "admission_max_wait": 120,
+    # drift monitor: เทียบการทำนายใน drift_window_hours ชั่วโมงล่าสุดกับ reference จาก Base/data
+    # เตือนเมื่อ Jensen-Shannon divergence เกิน drift_threshold (เมื่อมีอย่างน้อย drift_min_samples รูป)
+    # 0.1 สูงกว่า divergence ที่เกิดจากการสุ่มตัวอย่าง 50 รูปจาก reference เอง (p99 ~0.08)
+    "drift_window_hours": 24,
+    "drift_min_samples": 50,
+    "drift_threshold": 0.1,
+    # log รอบการรันสคริปต์ที่ใช้เวลานานกว่านี้ (มิลลิวินาที, 0 = ไม่ log) ดูสถิติทั้งหมดได้ในหน้า Admin
+    "rerun_slow_ms": 5000,
+}
+
+
+def _parse_env_value(value):
+    # ค่าใน environment เป็น string เสมอ ลองแปลงเป็นตัวเลข/boolean/list ด้วย JSON ก่อน
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+_FILE_CACHE = {}
+
+
+def _file_settings(path):
+    """
+    ค่าเริ่มต้นทับด้วย settings.json อ่านไฟล์ใหม่เมื่อ mtime หรือขนาดของไฟล์เปลี่ยนเท่านั้น
+    (ห้ามแก้ dict ที่คืนค่าไป เพราะใช้ร่วมกันทุกครั้งที่เรียก)
+    """
+    try:
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        version = None
+    cached = _FILE_CACHE.get(path)
+    if cached is None or cached[0] != version:
+        settings = dict(DEFAULT_SETTINGS)
+        if version is not None:
+            with open(path, 'r', encoding='utf-8') as f:
+                settings.update(json.load(f))
+        cached = _FILE_CACHE[path] = (version, settings)
+    return cached[1]
+
+
+def load_settings(path=SETTINGS_PATH):
+    """
+    โหลดการตั้งค่าทั้งหมด (ค่าเริ่มต้น → settings.json → environment variable)
+    """
+    settings = dict(_file_settings(path))
+    for key, value in os.environ.items():
+        if key.startswith(ENV_PREFIX):
+            settings[key[len(ENV_PREFIX):].lower()] = _parse_env_value(value)
+    return settings
+
+
+def get_setting(key, default=None, path=SETTINGS_PATH):
+    """
+    อ่านค่าการตั้งค่าหนึ่งค่า (environment variable ของ key นั้นก่อน แล้วจึงค่าที่ cache ไว้จาก settings.json)
+    """
+    value = os.environ.get(ENV_PREFIX + key.upper())
+    if value is not None:
+        return _parse_env_value(value)
+    return _file_settings(path).get(key, default)
+
+
+def save_settings(updates, path=SETTINGS_PATH):
+    """
+    เขียนค่าที่ระบุลงใน settings.json โดยคงค่าอื่นที่มีอยู่แล้วไว้
+    """
+    current = {}
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            current = json.load(f)
+    current.update(updates)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(current, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    return current
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+ไฟล์ static ของแอป (ฟอนต์ Mitr, โลโก้ และ CSS) ที่เสิร์ฟจากเครื่องเองผ่าน static file serving ของ Streamlit
+
+ไฟล์ในโฟลเดอร์ static/ ถูกเสิร์ฟที่ app/static/<ชื่อไฟล์> (enableStaticServing ใน .streamlit/config.toml)
+เบราว์เซอร์จึงเก็บ cache ไว้และตรวจด้วย ETag หน้าเว็บไม่โหลดอะไรจาก host ภายนอก
+(ถ้ายังไม่ได้ fetch ใช้ฟอนต์ไทยของระบบตาม font-family ใน style.css และแสดงหัวข้อเป็นข้อความแทนโลโก้)
+CSS และ @font-face ถูกสร้างครั้งเดียวต่อ process
+
+    python static_assets.py fetch     # ดาวน์โหลดฟอนต์และโลโก้ลง static/ (ทำครั้งเดียวแล้ว commit)
+    python static_assets.py status    # ไฟล์ที่มีอยู่ใน static/
+"""
+import argparse
+import os
+import re
+import sys
+import urllib.request
+from functools import lru_cache
+
+STATIC_DIR = "static"
+STATIC_URL = "app/static"
+STYLE_FILE = "style.css"
+FONT_DIR = "fonts"
+FONT_CSS_FILE = os.path.join(FONT_DIR, "mitr.css")
+LOGO_FILE = "7-eleven_logo.png"
+
+# แหล่งต้นฉบับ (ใช้ตอน fetch เท่านั้น)
+FONT_CSS_URL = "https://fonts.googleapis.com/css2?family=Mitr:wght@300;400;500;600&display=swap"
+LOGO_URL = "https://upload.wikimedia.org/wikipedia/commons/thumb/4/40/7-eleven_logo.svg/791px-7-eleven_logo.svg.png"
+# Google Fonts ส่ง woff2 เฉพาะเมื่อ User-Agent เป็นเบราว์เซอร์ที่รองรับ
+BROWSER_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+FONT_URL_PATTERN = re.compile(r"url\((https://[^)]+)\)")
+
+
+def asset_path(name, static_dir=STATIC_DIR):
+    return os.path.join(static_dir, name)
+
+
+def static_url(name):
+    """
+    URL ของไฟล์ใน static/ (relative เพื่อให้ใช้ได้เมื่อแอปอยู่หลัง path prefix)
+    """
+    return f"{STATIC_URL}/{name.replace(os.sep, '/')}"
+
+
+def _read_text(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+@lru_cache(maxsize=None)
+def page_css(static_dir=STATIC_DIR):
+    """
+    CSS ทั้งหมดของแอปใน <style> เดียว: @font-face ของฟอนต์ในเครื่อง (ถ้า fetch แล้ว) ตามด้วย static/style.css
+    """
+    font_css_path = asset_path(FONT_CSS_FILE, static_dir)
+    font_css = _read_text(font_css_path) if os.path.exists(font_css_path) else ""
+    return f"<style>\n{font_css}\n{_read_text(asset_path(STYLE_FILE, static_dir))}</style>"
+
+
+@lru_cache(maxsize=None)
+def logo_src(static_dir=STATIC_DIR):
+    """
+    URL ของโลโก้ใน static/ หรือ None ถ้ายังไม่ได้ fetch
+    """
+    return static_url(LOGO_FILE) if os.path.exists(asset_path(LOGO_FILE, static_dir)) else None
+
+
+# --- ดาวน์โหลดไฟล์ลง static/ ---
+
+def _download(url):
+    request = urllib.request.Request(url, headers={"User-Agent": BROWSER_USER_AGENT})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return response.read()
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def fetch_font(static_dir=STATIC_DIR):
+    """
+    ดาวน์โหลด CSS ของ Google Fonts และไฟล์ woff2 ทุกไฟล์ที่อ้างถึง แล้วเขียน CSS ใหม่ให้ชี้ไปที่ static/fonts/
+    คืนค่าจำนวนไฟล์ฟอนต์
+    """
+    css = _download(FONT_CSS_URL).decode('utf-8')
+    files = {}
+    for url in dict.fromkeys(FONT_URL_PATTERN.findall(css)):
+        name = os.path.join(FONT_DIR, f"mitr-{len(files)}{os.path.splitext(url)[1] or '.woff2'}")
+        _write_atomic(asset_path(name, static_dir), _download(url))
+        files[url] = static_url(name)
+    css = FONT_URL_PATTERN.sub(lambda match: f"url({files[match.group(1)]})", css)
+    _write_atomic(asset_path(FONT_CSS_FILE, static_dir), css.encode('utf-8'))
+    return len(files)
+
+
+def fetch_logo(static_dir=STATIC_DIR):
+    _write_atomic(asset_path(LOGO_FILE, static_dir), _download(LOGO_URL))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["fetch", "status"])
+    parser.add_argument("--static-dir", default=STATIC_DIR)
+    args = parser.parse_args()
+
+    if args.command == "fetch":
+        count = fetch_font(args.static_dir)
+        print(f"✅ ดาวน์โหลดฟอนต์ Mitr {count} ไฟล์")
+        fetch_logo(args.static_dir)
+        print(f"✅ ดาวน์โหลดโลโก้ {asset_path(LOGO_FILE, args.static_dir)}")
+        return 0
+
+    for name in (STYLE_FILE, FONT_CSS_FILE, LOGO_FILE):
+        path = asset_path(name, args.static_dir)
+        print(f"{'✅' if os.path.exists(path) else '❌'} {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -126,6 +126,1010 @@ def test_excel_functionality():
         print(f"❌ Excel functionality failed: {e}")
         return False
 
+def test_model_registry():
+    """Test model hot-swap via the model registry"""
+    print("\n🔍 Testing model registry...")
+    try:
+        import tempfile
+        from model_registry import ModelRegistry
+
+        with tempfile.TemporaryDirectory() as model_dir:
+            labels_path = os.path.join(model_dir, "labels.txt")
+            with open(labels_path, 'w', encoding='utf-8') as f:
+                f.write("0 P4\n")
+
+            loads = []
+            def loader():
+                with open(labels_path, 'r', encoding='utf-8') as f:
+                    loads.append(f.read())
+                return loads[-1], ["P4"], "simple"
+
+            registry = ModelRegistry(loader, model_dir=model_dir)
+            first = registry.current()
+            print(f"✅ Initial version loaded: {first.version}")
+
+            with open(labels_path, 'w', encoding='utf-8') as f:
+                f.write("0 P4\n1 P3\n")
+            swapped = registry.reload_if_changed()
+            second = registry.current()
+            if not swapped or second.version == first.version or second.model != loads[-1]:
+                print("❌ Registry did not swap to the new version")
+                return False
+            print(f"✅ Swapped to new version: {second.version}")
+
+            if registry.reload_if_changed():
+                print("❌ Registry reloaded an unchanged model")
+                return False
+            print("✅ Unchanged model is not reloaded")
+
+            # เวอร์ชันคิดจากไฟล์ของโมเดลที่โหลดได้เท่านั้น ไฟล์อื่นที่เฝ้าดูอยู่เปลี่ยนต้องไม่ทำให้เวอร์ชันเปลี่ยน
+            other_path = os.path.join(model_dir, "model_lightweight.pkl")
+            registry = ModelRegistry(loader, model_dir=model_dir, version_files=lambda model_type, model: ("labels.txt",))
+            before = registry.current()
+            with open(other_path, 'wb') as f:
+                f.write(b"unused fallback")
+            if registry.reload_if_changed() or registry.current().version != before.version:
+                print("❌ Unrelated model file changed the served version")
+                return False
+            print("✅ Version follows only the files of the loaded backend")
+
+        return True
+    except Exception as e:
+        print(f"❌ Model registry failed: {e}")
+        return False
+
+def test_backend_registry():
+    """Test backend selection and the labels.txt class mapping"""
+    print("\n🔍 Testing backend registry...")
+    try:
+        from backends import BACKENDS, classify_batch, load_backend, load_class_names, parse_backend_spec, resize_batch
+
+        class_names = load_class_names("model/labels.txt")
+        if class_names[0] != "P4":
+            print(f"❌ Unexpected class mapping: {class_names}")
+            return False
+        print(f"✅ Class mapping from labels.txt: {class_names}")
+
+        print(f"✅ Registered backends: {list(BACKENDS)}")
+        model, class_names, model_type = load_backend("pickle,simple")
+        batch = np.zeros((2, 224, 224, 3), dtype=np.uint8)
+        prediction = classify_batch(model_type, model, batch)
+        if prediction.shape != (2, len(class_names)):
+            print(f"❌ Unexpected prediction shape: {prediction.shape}")
+            return False
+        print(f"✅ Backend '{model_type}' classified a batch of {len(batch)} images")
+
+        if os.path.exists("model/model_uint8.tflite"):
+            model, _ = BACKENDS["tflite_uint8"].loader()
+            if model.input_details['dtype'] != np.uint8 or classify_batch("tflite_uint8", model, batch).shape != (2, 4):
+                print("❌ uint8-input TFLite model did not classify the raw batch")
+                return False
+            print("✅ uint8-input TFLite model classified the raw uint8 batch")
+
+        import json
+        import tempfile
+        from backends import backend_model_version, below_agreement_gate
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            record_path = os.path.join(tmp_dir, "backend_agreement.json")
+            version = backend_model_version("pickle", tmp_dir)
+            with open(record_path, 'w', encoding='utf-8') as f:
+                json.dump({"agreement": {
+                    "pickle": {"agreement": 0.8, "model_version": version},
+                    "joblib": {"agreement": 0.8, "model_version": "stale"},
+                    "tflite": {"agreement": 0.99, "model_version": backend_model_version("tflite", tmp_dir)},
+                }}, f)
+            if below_agreement_gate("pickle", record_path) != 0.8 or below_agreement_gate("tflite", record_path) is not None:
+                print("❌ Recorded agreement not compared with min_backend_agreement")
+                return False
+            if below_agreement_gate("joblib", record_path) is not None:
+                print("❌ Agreement recorded for other model files was still applied")
+                return False
+            with open(os.path.join(tmp_dir, "model_lightweight.pkl"), 'wb') as f:
+                f.write(b"retrained")
+            if below_agreement_gate("pickle", record_path) is not None:
+                print("❌ Agreement still applied after the model file changed")
+                return False
+            print("✅ Recorded agreement applies only to the model version it was measured on")
+        if below_agreement_gate("student128") is not None:
+            model, class_names, model_type = load_backend("student128,simple")
+            if model_type != "simple":
+                print(f"❌ Sub-gate student should be skipped in a fallback list, got {model_type}")
+                return False
+            print("✅ Sub-gate backend skipped in fallback list")
+
+        student_size = BACKENDS["student128"].input_size
+        if resize_batch(batch, student_size).shape != (2, 128, 128, 3):
+            print(f"❌ Batch was not resized for the student backend: {student_size}")
+            return False
+        print(f"✅ Batches are resized to the {student_size} student input")
+
+        try:
+            parse_backend_spec("no-such-backend")
+            print("❌ Unknown backend was accepted")
+            return False
+        except ValueError:
+            print("✅ Unknown backend is rejected")
+
+        return True
+    except Exception as e:
+        print(f"❌ Backend registry failed: {e}")
+        return False
+
+def test_import_time():
+    """Test that importing the app stays fast and does not load heavy backends"""
+    print("\n🔍 Testing app import time...")
+    try:
+        import subprocess
+        code = (
+            "import sys, time; import streamlit; start = time.perf_counter(); import maincai; "
+            "print(time.perf_counter() - start); "
+            "print(','.join(m for m in ('tensorflow', 'pandas', 'joblib') if m in sys.modules))"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.splitlines()
+        elapsed, heavy_modules = float(output[-2]), output[-1]
+        print(f"✅ maincai imported in {elapsed * 1000:.0f} ms")
+        if heavy_modules:
+            print(f"❌ Heavy modules imported at startup: {heavy_modules}")
+            return False
+        print("✅ No heavy backend modules imported at startup")
+        return True
+    except Exception as e:
+        print(f"❌ Import time check failed: {e}")
+        return False
+
+def test_cascade():
+    """Test that the cascade escalates only low-confidence images"""
+    print("\n🔍 Testing confidence cascade...")
+    try:
+        from backends import classify_batch, load_backend
+
+        batch = np.zeros((3, 224, 224, 3), dtype=np.uint8)
+        os.environ["PM_AI_CASCADE_TIERS"] = "demo,simple"
+        try:
+            for threshold, expected_tier in [(0.0, "demo"), (1.0, "simple")]:
+                os.environ["PM_AI_CASCADE_THRESHOLD"] = str(threshold)
+                model, class_names, model_type = load_backend("cascade")
+                classify_batch(model_type, model, batch)
+                counts = model.resolved_counts()
+                if counts[expected_tier] != len(batch):
+                    print(f"❌ Threshold {threshold}: unexpected tier counts {counts}")
+                    return False
+                print(f"✅ Threshold {threshold}: all images resolved by '{expected_tier}'")
+
+            os.environ["PM_AI_CASCADE_TIERS"] = "pickle,simple"
+            from backends import backend_model_files, loaded_model_files
+            if backend_model_files("cascade") != ("model_lightweight.pkl", "labels.txt"):
+                print(f"❌ Cascade watches files outside its tiers: {backend_model_files('cascade')}")
+                return False
+            model, class_names, model_type = load_backend("cascade")
+            if loaded_model_files(model_type, model) != ():
+                print(f"❌ Cascade version uses files of tiers that did not load: {loaded_model_files(model_type, model)}")
+                return False
+            print("✅ Cascade model files follow its configured and loaded tiers")
+        finally:
+            os.environ.pop("PM_AI_CASCADE_TIERS", None)
+            os.environ.pop("PM_AI_CASCADE_THRESHOLD", None)
+
+        return True
+    except Exception as e:
+        print(f"❌ Cascade failed: {e}")
+        return False
+
+def test_history_store():
+    """Test incremental aggregates and write versions of the history store"""
+    print("\n🔍 Testing history store...")
+    try:
+        import tempfile
+        from history_store import HistoryStore
+
+        row = {
+            'Employee name': 'Test User', 'Branch code': '12345', 'Sign type': 'pole',
+            'How many images': 1, 'Image Filename': 'test.png', 'Phase': 'P1',
+            'Confidence': '0.9000', 'Upload Time': '2024-08-19 11:10:17', 'Model Type': 'simple'
+        }
+        with tempfile.TemporaryDirectory() as root:
+            store = HistoryStore(root)
+            store.append([row])
+            version = store.append([dict(row, Confidence='0.7000'), dict(row, **{'Upload Time': '2024-09-01 08:00:00'})])
+            if version != 2:
+                print(f"❌ Unexpected write version: {version}")
+                return False
+            print(f"✅ Write version after two appends: {version}")
+
+            aggregates = store.aggregates().to_pylist()
+            august = [a for a in aggregates if a['date'].month == 8][0]
+            if august['count'] != 2 or abs(august['confidence_sum'] - 1.6) > 1e-9:
+                print(f"❌ Aggregates were not merged incrementally: {aggregates}")
+                return False
+            print(f"✅ Incremental aggregates for {store.months()}")
+
+            if store.read_rows(branch_code=12345).num_rows != 3:
+                print("❌ Branch filter returned the wrong number of rows")
+                return False
+            print("✅ Rows filtered by branch code")
+
+            store.append([dict(row, **{'Upload Time': None})])
+            rows = store.read_rows(branch_code=12345)
+            if rows.num_rows != 4 or rows['upload_time'].null_count != 1:
+                print("❌ Row without upload time was dropped or given a made-up time")
+                return False
+            if store.months() != ['2024-08', '2024-09'] or sum(a['count'] for a in store.aggregates().to_pylist()) != 3:
+                print(f"❌ Row without upload time counted in a monthly rollup: {store.months()}")
+                return False
+            print("✅ Row without upload time kept with a null time and left out of monthly rollups")
+
+            # อีก process ถือ lock การเขียนอยู่: append ต้องรอจนกว่า process นั้นจะปล่อย
+            import subprocess
+            import sys
+            import time
+            holder = subprocess.Popen(
+                [sys.executable, "-c",
+                 "import sys, time\n"
+                 "from admission import file_lock\n"
+                 "with file_lock(sys.argv[1]):\n"
+                 "    print('locked', flush=True)\n"
+                 "    time.sleep(1.0)\n",
+                 store.write_lock_path],
+                stdout=subprocess.PIPE, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+            )
+            try:
+                holder.stdout.readline()
+                start = time.perf_counter()
+                store.append([row])
+                waited = time.perf_counter() - start
+            finally:
+                holder.wait()
+            if waited < 0.5:
+                print(f"❌ Append did not wait for the write lock held by another process ({waited:.2f}s)")
+                return False
+            print(f"✅ Writes serialized across processes (waited {waited:.2f}s)")
+
+        return True
+    except Exception as e:
+        print(f"❌ History store failed: {e}")
+        return False
+
+def test_dataset_cache():
+    """Test that the preprocessed dataset cache only redoes changed files"""
+    print("\n🔍 Testing dataset cache...")
+    try:
+        import tempfile
+        from dataset_cache import build_cache, load_dataset
+
+        with tempfile.TemporaryDirectory() as root:
+            data_dir = os.path.join(root, "data")
+            cache_dir = os.path.join(root, "cache")
+            for class_name, color in [("P1", "red"), ("P4", "blue")]:
+                os.makedirs(os.path.join(data_dir, class_name))
+                Image.new('RGB', (300, 200), color=color).save(os.path.join(data_dir, class_name, "a.jpg"))
+
+            _, stats = build_cache(data_dir, cache_dir)
+            if stats["processed"] != 2:
+                print(f"❌ Unexpected first build: {stats}")
+                return False
+            print(f"✅ First build preprocessed {stats['processed']} images")
+
+            Image.new('RGB', (300, 200), color='green').save(os.path.join(data_dir, "P1", "a.jpg"))
+            _, stats = build_cache(data_dir, cache_dir)
+            if (stats["processed"], stats["reused"]) != (1, 1):
+                print(f"❌ Changed file was not detected: {stats}")
+                return False
+            print("✅ Only the changed image was preprocessed again")
+
+            dataset = load_dataset(data_dir, cache_dir)
+            images, labels, paths = next(dataset.iter_batches(batch_size=2))
+            if images.shape != (2, 224, 224, 3) or images.dtype != np.uint8:
+                print(f"❌ Unexpected batch: {images.shape} {images.dtype}")
+                return False
+            print(f"✅ Streamed a batch of {len(paths)} cached images")
+
+        return True
+    except Exception as e:
+        print(f"❌ Dataset cache failed: {e}")
+        return False
+
+def test_memory_report():
+    """Test per-stage memory tracking and per-session size estimates"""
+    print("\n🔍 Testing memory report...")
+    try:
+        from memory_report import estimate_bytes, memory_stage, memory_summary, record_session_usage, stage_report
+
+        with memory_stage("test_stage"):
+            buffer = np.zeros((512, 512, 3), dtype=np.uint8)
+        if stage_report()["test_stage"]["calls"] != 1:
+            print("❌ Stage was not recorded")
+            return False
+        print("✅ Stage memory recorded")
+
+        results = [{'image_object': Image.new('RGB', (400, 300)), 'class_name': 'P1', 'confidence': 0.9}]
+        size = estimate_bytes(results)
+        if size < 400 * 300 * 3:
+            print(f"❌ Image size underestimated: {size}")
+            return False
+        record_session_usage("test-session", results)
+        summary = memory_summary(model=buffer)
+        if summary["model"] != buffer.nbytes or summary["session_bytes"] < size:
+            print(f"❌ Unexpected summary: {summary}")
+            return False
+        print(f"✅ Session results estimated at {size} bytes")
+
+        return True
+    except Exception as e:
+        print(f"❌ Memory report failed: {e}")
+        return False
+
+def test_runtime_profile():
+    """Test that "auto" thread counts follow the CPU quota"""
+    print("\n🔍 Testing runtime profile...")
+    try:
+        from runtime_profile import candidate_profiles, detect_cpu_quota, resolve_profile
+
+        cpus = detect_cpu_quota()
+        profile = resolve_profile({"intra_op_threads": "auto", "inter_op_threads": "auto", "onednn": None})
+        if profile["intra_op_threads"] != cpus or profile["inter_op_threads"] < 1:
+            print(f"❌ Unexpected resolved profile: {profile}")
+            return False
+        print(f"✅ Resolved profile for {cpus} CPU(s): {profile}")
+
+        threads = sorted({p["intra_op_threads"] for p in candidate_profiles(6)})
+        if threads != [1, 2, 4, 6]:
+            print(f"❌ Unexpected tuning candidates: {threads}")
+            return False
+        print(f"✅ Tuning candidates use {threads} threads")
+
+        return True
+    except Exception as e:
+        print(f"❌ Runtime profile failed: {e}")
+        return False
+
+def test_image_archive():
+    """Test the sharded image archive, its manifest and the flat-folder migration"""
+    print("\n🔍 Testing image archive...")
+    try:
+        import tempfile
+        import image_archive
+        from image_archive import ImageArchive, migrate
+
+        with tempfile.TemporaryDirectory() as root:
+            archive = ImageArchive(root)
+            row = {'Branch code': '1114', 'Image Filename': '1114_P2_2024-08-19 11-10-17_1.png',
+                   'Phase': 'P2', 'Confidence': '0.8100', 'Upload Time': '2024-08-19 11:10:17'}
+            paths = archive.save_photos([(Image.new('RGB', (32, 32)), row)])
+            if paths != [os.path.join('1114', '2024-08', row['Image Filename'])]:
+                print(f"❌ Unexpected archive path: {paths}")
+                return False
+            print(f"✅ Photo stored at {paths[0]}")
+
+            Image.new('RGB', (32, 32)).save(os.path.join(root, '1115_P1_2024-09-02 08-00-00_1.png'))
+            if migrate(archive) != 1 or archive.find('1115_P1_2024-09-02 08-00-00_1.png')['path'] != os.path.join('1115', '2024-09', '1115_P1_2024-09-02 08-00-00_1.png'):
+                print("❌ Flat-folder photo was not migrated")
+                return False
+            print("✅ Flat-folder photo migrated into its branch/month shard")
+
+            photos = archive.photos_for_branch(1114)
+            if len(photos) != 1 or not os.path.exists(archive.absolute_path(photos[0]['path'])):
+                print(f"❌ Branch lookup failed: {photos}")
+                return False
+            print("✅ Branch lookup served from the manifest")
+
+            revision = archive.branch_revision('1114')
+            other_revision = archive.branch_revision('1115')
+            later = dict(row, **{'Image Filename': '1114_P1_2024-10-01 09-00-00_1.png', 'Upload Time': '2024-10-01 09:00:00'})
+            archive.save_photos([(Image.new('RGB', (32, 32)), later)])
+            # ImageArchive ใหม่ (เหมือน process อื่น) ต้องเห็นเลขรุ่นเดียวกัน
+            if ImageArchive(root).branch_revision('1114') != revision + 1 or archive.branch_revision('1115') != other_revision:
+                print("❌ Branch revision did not change with a save for that branch only")
+                return False
+            if [photo['image_filename'] for photo in archive.photos_for_branch('1114', limit=1)] != [later['Image Filename']]:
+                print("❌ Latest inspection is not returned first")
+                return False
+            print("✅ Saving a branch bumps only its history revision")
+
+            # หลังสร้าง schema ครั้งแรกแล้ว การอ่าน (เช่น branch_revision ทุกรอบ rerun) ใช้ connection เปล่า
+            statements = []
+            connect = image_archive.sqlite3.connect
+
+            def traced_connect(*args, **kwargs):
+                connection = connect(*args, **kwargs)
+                connection.set_trace_callback(statements.append)
+                return connection
+
+            image_archive.sqlite3.connect = traced_connect
+            try:
+                ImageArchive(root).branch_revision('1114')
+            finally:
+                image_archive.sqlite3.connect = connect
+            if any("CREATE" in statement or "journal_mode" in statement for statement in statements):
+                print(f"❌ Read connection re-ran the schema: {statements}")
+                return False
+            print("✅ Schema created once per manifest; reads open plain connections")
+
+        return True
+    except Exception as e:
+        print(f"❌ Image archive failed: {e}")
+        return False
+
+def test_video_inspection():
+    """Test frame sampling, near-duplicate removal and the per-video verdict"""
+    print("\n🔍 Testing video inspection...")
+    try:
+        import io
+        import tempfile
+        from backends import load_backend
+        from video_inspection import VideoUnavailable, classify_video, import_cv2, iter_video_frames, select_frames
+
+        try:
+            cv2 = import_cv2()
+        except VideoUnavailable as e:
+            print(f"⚠️ Skipped: {e}")
+            return True
+
+        with tempfile.TemporaryDirectory() as root:
+            # 4 วินาทีที่ 10 fps: 2 วินาทีแรกภาพนิ่งสีดำ 2 วินาทีหลังภาพนิ่งสีขาว
+            path = os.path.join(root, "walkthrough.avi")
+            writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (640, 480))
+            for i in range(40):
+                writer.write(np.full((480, 640, 3), 0 if i < 20 else 255, dtype=np.uint8))
+            writer.release()
+
+            sampled = list(iter_video_frames(path, sample_fps=2))
+            if [frame.index for frame in sampled] != list(range(0, 40, 5)):
+                print(f"❌ Unexpected sampled frames: {[frame.index for frame in sampled]}")
+                return False
+            print(f"✅ Sampled {len(sampled)} of 40 frames at 2 fps")
+
+            kept = list(select_frames(iter(sampled)))
+            if [frame.index for frame in kept] != [0, 20]:
+                print(f"❌ Near-identical frames were not dropped: {[frame.index for frame in kept]}")
+                return False
+            print("✅ Near-identical frames dropped")
+
+            model, class_names, model_type = load_backend("simple")
+            verdict = classify_video(path, model, class_names, model_type, sample_fps=2, batch_size=1)
+            if verdict.frames_classified != 2 or verdict.class_name not in class_names or not verdict.best_frames:
+                print(f"❌ Unexpected verdict: {verdict}")
+                return False
+            print(f"✅ Verdict {verdict.class_name} from {verdict.frames_classified} frames")
+            saved = Image.open(io.BytesIO(verdict.best_frames[0].image_png))
+            if saved.size != (640, 480) or verdict.best_frames[0].thumbnail.size != (480, 360):
+                print(f"❌ Supporting frame not kept at full resolution: {saved.size}")
+                return False
+            print("✅ Supporting frames kept at full resolution for the archive")
+
+        return True
+    except Exception as e:
+        print(f"❌ Video inspection failed: {e}")
+        return False
+
+def test_zip_upload():
+    """Test lazy ZIP iteration, branch codes from folder names and per-image errors"""
+    print("\n🔍 Testing ZIP upload...")
+    try:
+        import io
+        import zipfile
+        from backends import load_backend
+        import tempfile
+        from types import SimpleNamespace
+        from image_archive import ImageArchive
+        from zip_upload import branch_from_path, classify_zip, list_image_members, read_member
+
+        if branch_from_path("inspection/สาขา 1114/IMG_0001.jpg") != "1114" or branch_from_path("IMG_0001.jpg") is not None:
+            print("❌ Branch code was not inferred from the folder name")
+            return False
+        print("✅ Branch code inferred from folder names")
+
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            for name in ["1114/a.jpg", "1115/b.png", "loose.jpg"]:
+                image_bytes = io.BytesIO()
+                Image.new('RGB', (640, 480), 'red').save(image_bytes, format='PNG' if name.endswith('png') else 'JPEG')
+                archive.writestr(name, image_bytes.getvalue())
+            rotated = Image.new('RGB', (640, 480), 'blue')
+            exif = rotated.getexif()
+            exif[0x0112] = 6  # Orientation: หมุน 90° ตามเข็มนาฬิกา
+            image_bytes = io.BytesIO()
+            rotated.save(image_bytes, format='JPEG', exif=exif)
+            archive.writestr("1117/portrait.jpg", image_bytes.getvalue())
+            archive.writestr("1116/broken.jpg", b"not an image")
+            archive.writestr("__MACOSX/1114/._a.jpg", b"")
+            archive.writestr("notes.txt", b"")
+
+        with zipfile.ZipFile(buffer) as archive:
+            members = list_image_members(archive)
+            if [info.filename for info in members] != ["1114/a.jpg", "1115/b.png", "loose.jpg", "1117/portrait.jpg",
+                                                        "1116/broken.jpg"]:
+                print(f"❌ Unexpected members: {[info.filename for info in members]}")
+                return False
+            model, class_names, model_type = load_backend("simple")
+            decoded_sizes = []
+
+            def record_size(image):
+                decoded_sizes.append(image.size)
+                return SimpleNamespace(passed=True, issues=[])
+
+            results = list(classify_zip(archive, members, model, class_names, model_type, batch_size=2,
+                                        quality_check=record_size))
+            original = read_member(archive, "1114/a.jpg")
+
+        if [result['branch_code'] for result in results] != ["1114", "1115", None, "1117", "1116"]:
+            print(f"❌ Unexpected branch codes: {results}")
+            return False
+        if 'error' not in results[4] or any('error' in result for result in results[:4]):
+            print("❌ Broken member was not reported on its own")
+            return False
+        if max(results[0]['image_object'].size) > 480:
+            print("❌ Full-size image kept instead of a thumbnail")
+            return False
+        width, height = results[3]['image_object'].size
+        if width >= height:
+            print(f"❌ EXIF orientation not applied: {width}x{height}")
+            return False
+        if decoded_sizes[0] != (640, 480):
+            print(f"❌ Member was not decoded at full resolution before classification: {decoded_sizes[0]}")
+            return False
+        print("✅ Members classified in batches, thumbnails kept, EXIF orientation applied, broken file reported")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            archive = ImageArchive(tmp_dir)
+            row = {'Image Filename': "1114_P1_2024-01-01 00-00-00_1.jpg", 'Branch code': "1114",
+                   'Upload Time': "2024-01-01 00:00:00"}
+            path = archive.save_photos([(original, row)])[0]
+            with open(archive.absolute_path(path), 'rb') as f:
+                if f.read() != original:
+                    print("❌ Original ZIP member bytes were not archived unchanged")
+                    return False
+        print("✅ Original ZIP member bytes archived instead of the thumbnail")
+
+        return True
+    except Exception as e:
+        print(f"❌ ZIP upload failed: {e}")
+        return False
+
+def test_quality_gate():
+    """Test that blurry, dark and overexposed photos are flagged before classification"""
+    print("\n🔍 Testing quality gate...")
+    try:
+        import io
+        from quality_gate import assess_quality
+
+        thresholds = {"min_sharpness": 60, "min_brightness": 40, "max_brightness": 220, "max_clipped": 0.5}
+        rng = np.random.default_rng(0)
+        sharp = Image.fromarray(rng.integers(40, 215, (600, 800, 3), dtype=np.uint8))
+        cases = [
+            ("sharp", sharp, []),
+            ("blurry", Image.new('RGB', (800, 600), (128, 128, 128)), ["ภาพเบลอ"]),
+            ("black", Image.fromarray(rng.integers(0, 6, (600, 800, 3), dtype=np.uint8)), ["ภาพมืดเกินไป"]),
+            ("overexposed", Image.fromarray(rng.integers(250, 256, (600, 800, 3), dtype=np.uint8)), ["ภาพสว่างจ้าเกินไป"]),
+        ]
+        for name, image, expected in cases:
+            buffer = io.BytesIO()
+            image.save(buffer, format='JPEG', quality=95)
+            buffer.seek(0)
+            report = assess_quality(buffer, thresholds)
+            if not set(expected) <= set(report.issues) or report.passed != (not expected):
+                print(f"❌ {name}: unexpected issues {report.issues}")
+                return False
+            if buffer.tell() != 0 or max(report.preview.size) > 256:
+                print(f"❌ {name}: file not rewound or preview not downscaled")
+                return False
+        print("✅ Blurry, black and overexposed photos flagged; sharp photo passes")
+
+        return True
+    except Exception as e:
+        print(f"❌ Quality gate failed: {e}")
+        return False
+
+def test_rescore():
+    """Test that re-scoring skips current-model rows, resumes from its checkpoint and keeps old predictions"""
+    print("\n🔍 Testing re-scoring...")
+    try:
+        import tempfile
+        from backends import load_backend
+        from image_archive import ImageArchive
+        from model_registry import ModelSnapshot
+        from rescore import rescore
+
+        with tempfile.TemporaryDirectory() as root:
+            archive = ImageArchive(root)
+            rows = [
+                {'Branch code': '1114', 'Image Filename': f'1114_P2_2024-08-19 11-10-17_{i}.png', 'Phase': 'P2',
+                 'Confidence': '0.8', 'Upload Time': '2024-08-19 11:10:17', 'Model Version': version}
+                for i, version in enumerate([None, 'old', 'old', 'new'], start=1)
+            ]
+            archive.save_photos([(Image.new('RGB', (64, 64), 'gray'), row) for row in rows])
+            os.remove(archive.absolute_path(archive.find(rows[2]['Image Filename'])['path']))
+
+            model, class_names, model_type = load_backend("simple")
+            snapshot = ModelSnapshot(model, class_names, model_type, 'new')
+            if rescore(archive, snapshot, batch_size=1, limit=1, progress=lambda message: None) != 1:
+                print("❌ Limit not respected")
+                return False
+            if archive.rescore_checkpoint('new') != rows[0]['Image Filename']:
+                print("❌ Checkpoint not recorded")
+                return False
+            if rescore(archive, snapshot, batch_size=2, progress=lambda message: None) != 2:
+                print("❌ Resumed run did not pick up exactly the remaining old-model rows")
+                return False
+            print("✅ Only old-model rows re-scored, resumed from checkpoint")
+
+            comparison = archive.rescore_comparison('new')
+            if [row['old_phase'] for row in comparison] != ['P2'] * 3 or not comparison[2]['error']:
+                print(f"❌ Unexpected comparison rows: {comparison}")
+                return False
+            if archive.find(rows[0]['Image Filename'])['phase'] != 'P2':
+                print("❌ Original prediction was overwritten")
+                return False
+            print("✅ New predictions stored alongside the originals, missing photo reported")
+
+        return True
+    except Exception as e:
+        print(f"❌ Re-scoring failed: {e}")
+        return False
+
+def test_history_export():
+    """Test streaming export of the history store to .xlsx and .csv with filters"""
+    print("\n🔍 Testing history export...")
+    try:
+        import csv
+        import tempfile
+        from datetime import date
+        from openpyxl import load_workbook
+        from history_export import export_history
+        from history_store import HistoryStore
+
+        with tempfile.TemporaryDirectory() as root:
+            store = HistoryStore(os.path.join(root, "history"))
+            store.append([
+                {'Branch code': branch, 'Image Filename': f'{branch}_{day}.png', 'Phase': 'P3', 'Confidence': '0.7',
+                 'Upload Time': f'2024-08-{day:02d} 10:00:00', 'Model Version': 'abc'}
+                for branch in ('1114', '1115') for day in (1, 15, 28)
+            ])
+
+            xlsx_path = os.path.join(root, "export.xlsx")
+            if export_history(store, xlsx_path) != 6:
+                print("❌ Unfiltered export has the wrong row count")
+                return False
+            workbook = load_workbook(xlsx_path, read_only=True)
+            header = next(workbook.active.iter_rows(values_only=True))
+            workbook.close()
+            if header[1] != 'Branch code' or header[-1] != 'Model Version':
+                print(f"❌ Unexpected header: {header}")
+                return False
+            print("✅ Write-only .xlsx export keeps the data.xlsx columns")
+
+            csv_path = os.path.join(root, "export.csv")
+            count = export_history(store, csv_path, start=date(2024, 8, 10), end=date(2024, 8, 20), branch_code='1114')
+            with open(csv_path, encoding='utf-8-sig') as f:
+                rows = list(csv.DictReader(f))
+            if count != 1 or [row['Image Filename'] for row in rows] != ['1114_15.png']:
+                print(f"❌ Filtered CSV export returned {rows}")
+                return False
+            print("✅ CSV export filtered by date range and branch")
+
+            if export_history(store, csv_path, max_rows=4) != 4:
+                print("❌ Export was not capped at max_rows")
+                return False
+            print("✅ Export capped at max_rows for the Dashboard download")
+
+        return True
+    except Exception as e:
+        print(f"❌ History export failed: {e}")
+        return False
+
+def test_static_assets():
+    """Test that the committed static/ assets are what every app page loads, with nothing from external hosts"""
+    print("\n🔍 Testing static assets...")
+    try:
+        import glob
+        import re
+        from static_assets import FONT_CSS_FILE, LOGO_FILE, STYLE_FILE, asset_path, logo_src, page_css
+
+        with open(os.path.join('.streamlit', 'config.toml'), 'r', encoding='utf-8') as f:
+            if 'enableStaticServing = true' not in f.read():
+                print("❌ Static file serving is not enabled")
+                return False
+
+        if not os.path.exists(asset_path(STYLE_FILE)):
+            print(f"❌ {asset_path(STYLE_FILE)} is missing")
+            return False
+        page_css.cache_clear()
+        logo_src.cache_clear()
+        css = page_css()
+        if '--seven-green' not in css or '.demo-warning' not in css:
+            print("❌ Page CSS does not include static/style.css")
+            return False
+        urls = re.findall(r"url\(['\"]?([^)'\"]+)", css)
+        if '@import' in css or any(not url.startswith('app/static/') for url in urls):
+            print(f"❌ Page CSS loads from outside static/: {urls}")
+            return False
+        for url in urls:
+            if not os.path.exists(asset_path(url[len('app/static/'):])):
+                print(f"❌ Font referenced by {FONT_CSS_FILE} is not committed: {url}")
+                return False
+        logo_exists = os.path.exists(asset_path(LOGO_FILE))
+        if logo_src() != (f"app/static/{LOGO_FILE}" if logo_exists else None):
+            print(f"❌ Logo URL does not match static/: {logo_src()}")
+            return False
+        print(f"✅ CSS and logo served from static/ ({len(urls)} font files, logo {'present' if logo_exists else 'absent'})")
+
+        for path in sorted(glob.glob('maincai*.py') + glob.glob(os.path.join('pages', '*.py'))):
+            with open(path, 'r', encoding='utf-8') as f:
+                source = f.read()
+            if 'fonts.googleapis.com' in source or 'upload.wikimedia.org' in source:
+                print(f"❌ {path} still loads fonts or the logo from an external host")
+                return False
+        print("✅ No app page loads fonts or the logo from external hosts")
+
+        return True
+    except Exception as e:
+        print(f"❌ Static assets failed: {e}")
+        return False
+
+def test_rerun_profiler():
+    """Test that reruns are timed per section and counted per trigger"""
+    print("\n🔍 Testing rerun profiler...")
+    try:
+        import time
+        from rerun_profiler import (
+            profile_rerun, rerun_section, section_report, session_rerun_report, slowest_reruns, trigger_report
+        )
+
+        with profile_rerun("test-session", "initial"):
+            with rerun_section("upload_loop"):
+                time.sleep(0.01)
+            with rerun_section("upload_loop"):
+                time.sleep(0.01)
+        try:
+            with profile_rerun("test-session", "save_button"):
+                with rerun_section("save"):
+                    time.sleep(0.03)
+                    raise RuntimeError("st.stop")
+        except RuntimeError:
+            pass
+
+        sections = section_report()
+        if sections["upload_loop"]["last"] < 0.02 or sections["save"]["calls"] < 1:
+            print(f"❌ Unexpected section timings: {sections}")
+            return False
+        if trigger_report()["save_button"]["calls"] < 1:
+            print("❌ Rerun ending in an exception was not recorded")
+            return False
+        if session_rerun_report()["test-session"]["reruns"] != 2:
+            print("❌ Unexpected per-session rerun count")
+            return False
+        slowest = slowest_reruns(2)
+        if slowest[0]["duration"] < slowest[1]["duration"]:
+            print("❌ Slowest reruns not sorted")
+            return False
+        print("✅ Rerun sections and triggers recorded")
+        return True
+    except Exception as e:
+        print(f"❌ Rerun profiler failed: {e}")
+        return False
+
+def test_photo_uploader():
+    """Test that photos shrunk in the browser decode like regular uploads"""
+    print("\n🔍 Testing client-side photo uploader...")
+    try:
+        import base64
+        import io
+        from photo_uploader import COMPONENT_DIR, decode_uploads
+        from quality_gate import assess_quality
+
+        if not os.path.exists(os.path.join(COMPONENT_DIR, 'index.html')):
+            print("❌ Component frontend not found")
+            return False
+
+        buffer = io.BytesIO()
+        Image.new('RGB', (1280, 960), color=(0, 120, 60)).save(buffer, format='JPEG', quality=85)
+        value = {"nonce": 1, "files": [
+            {"name": "sign.jpg", "type": "image/jpeg", "data": base64.b64encode(buffer.getvalue()).decode(),
+             "original_size": 8_000_000, "resized": True},
+            {"name": "broken.jpg", "type": "image/jpeg", "data": "not base64!"},
+        ]}
+        uploads = decode_uploads(value)
+        if len(uploads) != 1 or uploads[0].name != "sign.jpg" or uploads[0].original_size != 8_000_000:
+            print(f"❌ Unexpected uploads: {[upload.name for upload in uploads]}")
+            return False
+        assess_quality(uploads[0])
+        if Image.open(uploads[0]).convert('RGB').size != (1280, 960):
+            print("❌ Shrunk upload not readable after the quality check")
+            return False
+        if decode_uploads(None) != []:
+            print("❌ Empty component value should give no uploads")
+            return False
+        print("✅ Shrunk uploads decode like st.file_uploader files")
+        return True
+    except Exception as e:
+        print(f"❌ Photo uploader failed: {e}")
+        return False
+
+def test_admission():
+    """Test bounded slots, FIFO queue positions and early rejection"""
+    print("\n🔍 Testing admission control...")
+    try:
+        import tempfile
+        import threading
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+        from admission import AdmissionController, AdmissionRejected
+        from maincai import save_to_excel
+
+        controller = AdmissionController("test", slots=1, max_queue=2)
+        order, positions = [], []
+        release = threading.Event()
+
+        def hold():
+            with controller.slot():
+                release.wait(5)
+
+        def queued(name):
+            with controller.slot(on_wait=lambda position: positions.append((name, position))):
+                order.append(name)
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        time.sleep(0.05)
+        waiters = []
+        for name in ("a", "b"):
+            waiters.append(threading.Thread(target=queued, args=(name,)))
+            waiters[-1].start()
+            time.sleep(0.05)
+        try:
+            controller.check()
+            print("❌ Full queue was not rejected")
+            return False
+        except AdmissionRejected:
+            pass
+        release.set()
+        for thread in [holder] + waiters:
+            thread.join(5)
+        if order != ["a", "b"] or ("b", 2) not in positions:
+            print(f"❌ Unexpected queue order {order} / positions {positions}")
+            return False
+        report = controller.report()
+        if report["active"] or report["waiting"] or report["rejected"] != 1 or report["admitted"] != 3:
+            print(f"❌ Unexpected admission report: {report}")
+            return False
+        print("✅ Slots bounded, queue FIFO with positions, full queue rejected")
+
+        # การบันทึกพร้อมกันต้องไม่ทำให้แถวหายหรืออ่านเจอไฟล์ที่เขียนไม่เสร็จ
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            excel_path = os.path.join(tmp_dir, 'data.xlsx')
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                outcomes = list(executor.map(
+                    lambda i: save_to_excel([{'Branch code': str(i), 'Phase': 'P1'}], excel_path), range(8)
+                ))
+            if not all(success for success, _ in outcomes) or len(pd.read_excel(excel_path)) != 8:
+                print(f"❌ Concurrent saves lost rows: {outcomes}")
+                return False
+        print("✅ Concurrent saves to data.xlsx keep every row")
+        return True
+    except Exception as e:
+        print(f"❌ Admission control failed: {e}")
+        return False
+
+def test_explain():
+    """Test Grad-CAM / occlusion heatmaps on the preprocessed input"""
+    print("\n🔍 Testing prediction heatmaps...")
+    try:
+        from backends import BackendUnavailable, load_backend
+        from explain import explain, image_hash
+
+        image_array = np.zeros((224, 224, 3), dtype=np.uint8)
+        image_array[60:160, 60:160] = (0, 160, 80)
+        if image_hash(image_array) != image_hash(image_array.copy()) or image_hash(image_array) == image_hash(image_array[::-1]):
+            print("❌ Image hash should depend only on pixel content")
+            return False
+
+        model, class_names, model_type = load_backend("simple")
+        explanation = explain(model_type, model, image_array, 0)
+        if explanation.method != "Occlusion" or explanation.heatmap.shape != (7, 7) or explanation.image.size != (224, 224):
+            print(f"❌ Unexpected occlusion explanation: {explanation.method} {explanation.heatmap.shape}")
+            return False
+        if not 0 <= explanation.heatmap.min() <= explanation.heatmap.max() <= 1:
+            print("❌ Heatmap not normalized")
+            return False
+        print("✅ Occlusion heatmap for backends without gradients")
+
+        try:
+            model, class_names, model_type = load_backend("tensorflow_uint8,tensorflow")
+        except BackendUnavailable:
+            print("⚠️ Keras model not available, skipping Grad-CAM")
+            return True
+        explanation = explain(model_type, model, image_array, 0)
+        if explanation.method != "Grad-CAM" or explanation.heatmap.ndim != 2 or explanation.image.size != (224, 224):
+            print(f"❌ Unexpected Grad-CAM explanation: {explanation.method} {explanation.heatmap.shape}")
+            return False
+        print(f"✅ Grad-CAM heatmap from {model_type} ({explanation.heatmap.shape[0]}x{explanation.heatmap.shape[1]})")
+        return True
+    except Exception as e:
+        print(f"❌ Prediction heatmaps failed: {e}")
+        return False
+
+def test_drift_monitor():
+    """Test streaming confidence sketches and divergence alerts"""
+    print("\n🔍 Testing drift monitor...")
+    try:
+        from drift_monitor import BUCKET_SECONDS, ConfidenceSketch, DriftMonitor, compare, js_divergence
+
+        rng = np.random.default_rng(0)
+        values = rng.beta(8, 2, size=5000)
+        sketch = ConfidenceSketch()
+        for value in values:
+            sketch.add(value)
+        if abs(sketch.quantile(0.5) - np.quantile(values, 0.5)) > 0.01 or sketch.quantile(1.0) > 1:
+            print(f"❌ Quantile off: {sketch.quantile(0.5)} vs {np.quantile(values, 0.5)}")
+            return False
+        if js_divergence([1, 2, 3], [2, 4, 6]) > 1e-9 or abs(js_divergence([1, 0], [0, 1]) - 1) > 1e-9:
+            print("❌ Unexpected Jensen-Shannon divergence")
+            return False
+
+        now = [1_000_000.0]
+        monitor = DriftMonitor(window_hours=2, clock=lambda: now[0])
+        reference_p1, reference_p2 = ConfidenceSketch(), ConfidenceSketch()
+        for value in rng.beta(8, 2, size=200):
+            reference_p1.add(value)
+            reference_p2.add(value)
+        reference = {"classes": {"P1": reference_p1.to_list(), "P2": reference_p2.to_list()}}
+
+        for i, value in enumerate(rng.beta(8, 2, size=400)):
+            monitor.record("v1", "P1" if i % 2 else "P2", value)
+        report = compare(monitor.window("v1"), reference, min_samples=50, threshold=0.1)
+        if report["samples"] != 400 or report["alerts"]:
+            print(f"❌ Matching distribution flagged: {report['alerts']}")
+            return False
+
+        # กล้องเปลี่ยน: ความมั่นใจของ P1 ลดลงทั้งหมด (window 2 ชั่วโมงไม่รวม bucket เดิมแล้ว)
+        now[0] += 3 * BUCKET_SECONDS
+        for value in rng.beta(3, 3, size=100):
+            monitor.record("v1", "P1", value)
+        report = compare(monitor.window("v1"), reference, min_samples=50, threshold=0.1)
+        if report["samples"] != 100 or not any("P1" in alert for alert in report["alerts"]):
+            print(f"❌ Shifted confidence not flagged: {report['alerts']}")
+            return False
+        print(f"✅ Sketch quantiles within 0.01, shift flagged: {report['alerts'][0]}")
+        return True
+    except Exception as e:
+        print(f"❌ Drift monitor failed: {e}")
+        return False
+
+def test_settings():
+    """Test that settings.json is cached until it changes and env variables still win"""
+    print("\n🔍 Testing settings cache...")
+    try:
+        import tempfile
+        from settings import get_setting, save_settings
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "settings.json")
+            if get_setting("zip_batch_size", path=path) != 16:
+                print("❌ Defaults not used without settings.json")
+                return False
+            save_settings({"zip_batch_size": 8}, path)
+            if get_setting("zip_batch_size", path=path) != 8:
+                print("❌ settings.json not read")
+                return False
+            save_settings({"zip_batch_size": 1024}, path)
+            if get_setting("zip_batch_size", path=path) != 1024:
+                print("❌ Changed settings.json not re-read")
+                return False
+            os.environ["PM_AI_ZIP_BATCH_SIZE"] = "4"
+            try:
+                if get_setting("zip_batch_size", path=path) != 4:
+                    print("❌ Environment variable did not override settings.json")
+                    return False
+            finally:
+                os.environ.pop("PM_AI_ZIP_BATCH_SIZE", None)
+        print("✅ settings.json re-read only on change, environment overrides applied")
+        return True
+    except Exception as e:
+        print(f"❌ Settings failed: {e}")
+        return False
+
 def main():
     """Run all tests"""
     print("🧪 7-Eleven AI Preventive Maintenance - System Test")
@@ -136,7 +1140,28 @@ def main():
         test_model_files,
         test_model_loading,
         test_image_processing,
-        test_excel_functionality
+        test_excel_functionality,
+        test_model_registry,
+        test_backend_registry,
+        test_import_time,
+        test_cascade,
+        test_history_store,
+        test_dataset_cache,
+        test_memory_report,
+        test_runtime_profile,
+        test_image_archive,
+        test_video_inspection,
+        test_zip_upload,
+        test_quality_gate,
+        test_rescore,
+        test_history_export,
+        test_static_assets,
+        test_rerun_profiler,
+        test_photo_uploader,
+        test_admission,
+        test_explain,
+        test_drift_monitor,
+        test_settings
     ]
     
     passed = 0
@@ -0,0 +1,189 @@
+"""
+ตรวจสอบป้ายจากวิดีโอเดินผ่านหน้าร้าน (video walkthrough)
+
+decode เฟรมจากวิดีโอทีละเฟรมแบบ stream (ไม่ถือวิดีโอที่ decode แล้วทั้งก้อนไว้ในหน่วยความจำ)
+เลือกเฟรมตามอัตราที่กำหนดหรือเมื่อฉากเปลี่ยน ตัดเฟรมที่แทบไม่ต่างจากเฟรมก่อนหน้า
+แล้ววิเคราะห์เป็น batch ด้วย classifier เดียวกับรูปภาพ และสรุปผลเป็น phase ของวิดีโอพร้อมเฟรมที่สนับสนุนผลนั้นมากที่สุด
+
+ต้องติดตั้ง opencv-python-headless (ไม่บังคับ ถ้าไม่มีจะใช้โหมดวิดีโอไม่ได้)
+"""
+import heapq
+import io
+import itertools
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+from contextlib import nullcontext
+
+import numpy as np
+from PIL import Image
+
+from backends import backend_input_size, classify_batch, preprocess_image
+
+VIDEO_TYPES = ['mp4', 'mov', 'avi', 'mkv', 'webm']
+THUMBNAIL_SIZE = (480, 480)
+# ขนาดภาพขาวดำที่ใช้เทียบความต่างระหว่างเฟรม
+SIGNATURE_SIZE = (32, 32)
+
+VideoFrame = namedtuple("VideoFrame", ["index", "timestamp", "image"])
+# thumbnail ใช้แสดงผล ส่วน image_png คือเฟรมเต็มความละเอียดที่ถูกวิเคราะห์ (PNG) สำหรับบันทึกลง archive
+FrameResult = namedtuple("FrameResult", ["index", "timestamp", "class_name", "confidence", "thumbnail", "image_png"])
+VideoVerdict = namedtuple("VideoVerdict", [
+    "class_name", "confidence", "class_scores", "frames_sampled", "frames_classified", "best_frames",
+])
+
+
+class VideoUnavailable(Exception):
+    """
+    ไม่มี OpenCV หรือเปิดไฟล์วิดีโอไม่ได้
+    """
+
+
+def import_cv2():
+    try:
+        import cv2
+    except ImportError:
+        raise VideoUnavailable("โหมดวิดีโอต้องติดตั้ง opencv-python-headless")
+    return cv2
+
+
+def iter_video_frames(path, sample_fps=2.0):
+    """
+    อ่านวิดีโอทีละเฟรม และคืนเฉพาะเฟรมตามอัตรา sample_fps เป็น VideoFrame (ภาพ RGB แบบ uint8)
+    เฟรมที่ข้ามใช้ grab() ซึ่งไม่ต้องแปลงสีและคัดลอกภาพออกมา
+    """
+    cv2 = import_cv2()
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise VideoUnavailable("เปิดไฟล์วิดีโอไม่ได้")
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        step = max(1, int(round(fps / sample_fps))) if sample_fps else 1
+        for index in itertools.count():
+            if not capture.grab():
+                break
+            if index % step:
+                continue
+            ok, frame = capture.retrieve()
+            if not ok:
+                break
+            yield VideoFrame(index, index / fps, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    finally:
+        capture.release()
+
+
+def frame_signature(image_array):
+    """
+    ภาพขาวดำขนาดเล็ก (ค่า 0..1) ใช้เทียบว่าเฟรมต่างกันแค่ไหน
+    """
+    gray = Image.fromarray(image_array).convert('L').resize(SIGNATURE_SIZE, Image.Resampling.BILINEAR)
+    return np.asarray(gray, dtype=np.float32) / 255.0
+
+
+def select_frames(frames, mode="rate", scene_threshold=0.12, dedup_threshold=0.02, max_frames=None):
+    """
+    กรองเฟรม: ตัดเฟรมที่แทบไม่ต่างจากเฟรมที่เลือกล่าสุด (dedup_threshold)
+    และในโหมด "scene" เลือกเฉพาะเฟรมที่ฉากเปลี่ยนเกิน scene_threshold (หยุดเมื่อครบ max_frames)
+    """
+    threshold = scene_threshold if mode == "scene" else dedup_threshold
+    previous = None
+    selected = 0
+    for frame in frames:
+        signature = frame_signature(frame.image)
+        if previous is not None and float(np.abs(signature - previous).mean()) < threshold:
+            continue
+        previous = signature
+        yield frame
+        selected += 1
+        if max_frames and selected >= max_frames:
+            break
+
+
+def make_thumbnail(image_array):
+    image = Image.fromarray(image_array)
+    image.thumbnail(THUMBNAIL_SIZE)
+    return image
+
+
+def encode_png(image_array):
+    buffer = io.BytesIO()
+    Image.fromarray(image_array).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def classify_video(path, model, class_names, model_type, sample_fps=2.0, mode="rate", scene_threshold=0.12,
+                   dedup_threshold=0.02, batch_size=16, max_frames=300, best_frames=3, progress=None,
+                   inference_slot=None):
+    """
+    วิเคราะห์วิดีโอทั้งไฟล์และคืนค่า VideoVerdict
+
+    ถือในหน่วยความจำเพียง batch ปัจจุบัน และเฟรมเต็มขนาดของเฟรมที่ดีที่สุดต่อคลาสไม่เกิน best_frames เฟรม
+    เฟรมที่สนับสนุนผลถูกเก็บต่อเป็น PNG เต็มความละเอียด (สำหรับบันทึก) พร้อม thumbnail (สำหรับแสดงผล)
+    ผลของวิดีโอคือคลาสที่ค่าเฉลี่ย probability สูงสุด
+    inference_slot: context manager factory ที่ครอบการเรียกโมเดลแต่ละ batch (admission control)
+    """
+    input_size = backend_input_size(model_type)
+    counts = {"sampled": 0, "classified": 0}
+    probability_sum = np.zeros(len(class_names), dtype=np.float64)
+    # heap ของเฟรมที่มั่นใจที่สุดแยกตามคลาส: (confidence, ลำดับ, คลาส, VideoFrame)
+    # เฟรมเต็มขนาดถูกเข้ารหัสเป็น PNG ตอนจบเฉพาะเฟรมที่สนับสนุนผล
+    best = {name: [] for name in class_names}
+
+    def counted(frames):
+        for frame in frames:
+            counts["sampled"] += 1
+            yield frame
+
+    frames = select_frames(counted(iter_video_frames(path, sample_fps)), mode, scene_threshold, dedup_threshold,
+                           max_frames)
+    while True:
+        batch = list(itertools.islice(frames, batch_size))
+        if not batch:
+            break
+        arrays = np.stack([preprocess_image(Image.fromarray(frame.image), input_size) for frame in batch])
+        with inference_slot() if inference_slot else nullcontext():
+            probabilities = np.asarray(classify_batch(model_type, model, arrays), dtype=np.float64)
+        probability_sum += probabilities.sum(axis=0)
+        for frame, frame_probabilities in zip(batch, probabilities):
+            index = int(np.argmax(frame_probabilities))
+            class_name, confidence = class_names[index], float(frame_probabilities[index])
+            heap = best[class_name]
+            if len(heap) < best_frames or confidence > heap[0][0]:
+                entry = (confidence, frame.index, class_name, frame)
+                if len(heap) < best_frames:
+                    heapq.heappush(heap, entry)
+                else:
+                    heapq.heapreplace(heap, entry)
+        counts["classified"] += len(batch)
+        del batch, arrays
+        if progress is not None:
+            progress(counts["classified"])
+
+    if counts["classified"] == 0:
+        raise VideoUnavailable("ไม่พบเฟรมที่อ่านได้ในวิดีโอ")
+    class_scores = probability_sum / counts["classified"]
+    verdict_index = int(np.argmax(class_scores))
+    verdict = class_names[verdict_index]
+    # ถ้าไม่มีเฟรมใดที่ชนะด้วยคลาสนี้ (ผลเฉลี่ยสูสี) ใช้เฟรมที่มั่นใจที่สุดของทุกคลาสแทน
+    candidates = best[verdict] or [entry for heap in best.values() for entry in heap]
+    ranked = sorted(candidates, key=lambda entry: entry[:2], reverse=True)[:best_frames]
+    supporting = [
+        FrameResult(frame.index, frame.timestamp, class_name, confidence, make_thumbnail(frame.image),
+                    encode_png(frame.image))
+        for confidence, _, class_name, frame in ranked
+    ]
+    return VideoVerdict(verdict, float(class_scores[verdict_index]),
+                        dict(zip(class_names, class_scores.tolist())),
+                        counts["sampled"], counts["classified"], supporting)
+
+
+def save_upload_to_temp(uploaded_file, suffix=None):
+    """
+    คัดลอกไฟล์ที่อัปโหลดลงไฟล์ชั่วคราวทีละส่วน (OpenCV ต้องการ path ของไฟล์)
+    """
+    suffix = suffix or os.path.splitext(getattr(uploaded_file, "name", ""))[1]
+    uploaded_file.seek(0)
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+        shutil.copyfileobj(uploaded_file, f, length=1 << 20)
+        return f.name
@@ -0,0 +1,140 @@
+"""
+อัปโหลดรูปจำนวนมากเป็นไฟล์ ZIP
+
+อ่านสมาชิกใน ZIP ทีละไฟล์ (ไม่แตกไฟล์ทั้งหมดลงหน่วยความจำหรือดิสก์) decode เต็มความละเอียดเหมือนโหมดรูปภาพ
+แล้วเก็บไว้เพียง array ขนาด input ของโมเดลและ thumbnail ก่อน decode รูปถัดไป จึงมีภาพเต็มขนาดค้างอยู่ครั้งละภาพเดียว
+และวิเคราะห์เป็น batch ขนาดจำกัดไม่ว่า ZIP จะใหญ่แค่ไหน
+ผลที่เก็บไว้มีเพียง thumbnail (สำหรับแสดงผล) และผลทำนาย ตอนบันทึกอ่าน bytes ต้นฉบับจาก ZIP ใหม่ (read_member)
+ถ้ารูปอยู่ในโฟลเดอร์ที่ตั้งชื่อเป็นรหัสสาขา (เช่น 1114/ หรือ สาขา 1114/) จะใช้รหัสสาขานั้นกับรูปในโฟลเดอร์
+"""
+import itertools
+import os
+import re
+import zipfile
+from contextlib import nullcontext
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from backends import backend_input_size, classify_batch, preprocess_image
+from video_inspection import THUMBNAIL_SIZE
+
+ZIP_IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+# ชื่อโฟลเดอร์ที่มีตัวเลข 3-6 หลักถือเป็นรหัสสาขา
+BRANCH_FOLDER_PATTERN = re.compile(r"(?<!\d)(\d{3,6})(?!\d)")
+
+
+def branch_from_path(member_name):
+    """
+    รหัสสาขาจากชื่อโฟลเดอร์ที่ใกล้ไฟล์ที่สุด (None ถ้าไม่มีโฟลเดอร์ใดเป็นรหัสสาขา)
+    """
+    for folder in reversed(member_name.replace('\\', '/').split('/')[:-1]):
+        match = BRANCH_FOLDER_PATTERN.search(folder)
+        if match:
+            return match.group(1)
+    return None
+
+
+def list_image_members(archive, max_member_bytes=None):
+    """
+    สมาชิกที่เป็นรูปภาพใน ZIP (ข้ามโฟลเดอร์, ไฟล์ซ่อน, __MACOSX และไฟล์ที่ใหญ่เกิน max_member_bytes เมื่อแตกแล้ว)
+    อ่านจาก central directory อย่างเดียว ยังไม่ decode รูป
+    """
+    members = []
+    for info in archive.infolist():
+        name = info.filename.replace('\\', '/')
+        if info.is_dir() or '__MACOSX/' in name or os.path.basename(name).startswith('.'):
+            continue
+        if not name.lower().endswith(ZIP_IMAGE_EXTENSIONS):
+            continue
+        if max_member_bytes and info.file_size > max_member_bytes:
+            continue
+        members.append(info)
+    return members
+
+
+def iter_zip_images(archive, members):
+    """
+    decode สมาชิกทีละไฟล์เต็มความละเอียด คืนค่า (ชื่อไฟล์ใน ZIP, รหัสสาขา, ภาพ RGB หรือ None, ข้อความผิดพลาด)
+    """
+    for info in members:
+        try:
+            with archive.open(info) as f:
+                image = Image.open(f)
+                # หมุนตาม EXIF orientation เหมือนโหมดรูปภาพ (รูปจากมือถือมักเก็บภาพแนวตั้งเป็นแนวนอน + tag)
+                image = ImageOps.exif_transpose(image).convert('RGB')
+            yield info.filename, branch_from_path(info.filename), image, None
+        except Exception as e:
+            yield info.filename, branch_from_path(info.filename), None, str(e)
+
+
+def make_thumbnail(image):
+    image = image.copy()
+    image.thumbnail(THUMBNAIL_SIZE)
+    return image
+
+
+def read_member(archive, name):
+    """
+    bytes ต้นฉบับของสมาชิกใน ZIP (สำหรับบันทึกรูปลง archive โดยไม่ encode ใหม่)
+    """
+    return archive.read(name)
+
+
+def classify_zip(archive, members, model, class_names, model_type, batch_size=16, quality_check=None,
+                 classify_rejected=False, inference_slot=None):
+    """
+    วิเคราะห์รูปใน ZIP เป็น batch และคืนค่าผลทีละรูปตามลำดับ (generator)
+    ผลแต่ละรูปเป็น dict: source_name, branch_code, image_object (thumbnail สำหรับแสดงผล), class_name, confidence
+    หรือ source_name, branch_code, error เมื่อ decode/วิเคราะห์ไม่ได้
+    หรือ source_name, branch_code, quality เมื่อ quality_check (ภาพ → QualityReport) ระบุว่าไม่ผ่าน (ไม่ส่งให้โมเดล)
+    ถ้า classify_rejected รูปที่ไม่ผ่านยังถูกวิเคราะห์ และผลมี quality_issues บอกปัญหาที่พบ
+    inference_slot: context manager factory ที่ครอบการเรียกโมเดลแต่ละ batch (admission control)
+    """
+    input_size = backend_input_size(model_type)
+    images = iter_zip_images(archive, members)
+    while True:
+        # แต่ละรูป: ตรวจคุณภาพและ preprocess จากภาพเต็ม แล้วเก็บไว้เพียง array และ thumbnail
+        batch = []
+        for name, branch_code, image, error in itertools.islice(images, batch_size):
+            item = {'source_name': name, 'branch_code': branch_code, 'error': error}
+            if image is not None:
+                report = quality_check(image) if quality_check is not None else None
+                if report is not None and not report.passed:
+                    item['quality'] = report
+                if classify_rejected or 'quality' not in item:
+                    item['array'] = preprocess_image(image, input_size)
+                    item['thumbnail'] = make_thumbnail(image)
+            del image
+            batch.append(item)
+        if not batch:
+            break
+        decoded = [item for item in batch if 'array' in item]
+        if decoded:
+            arrays = np.stack([item.pop('array') for item in decoded])
+            with inference_slot() if inference_slot else nullcontext():
+                probabilities = classify_batch(model_type, model, arrays)
+            for item, image_probabilities in zip(decoded, probabilities):
+                index = int(np.argmax(image_probabilities))
+                item['prediction'] = (class_names[index], float(image_probabilities[index]))
+            del arrays
+        for item in batch:
+            name, branch_code = item['source_name'], item['branch_code']
+            if 'prediction' in item:
+                class_name, confidence = item['prediction']
+                yield {'source_name': name, 'branch_code': branch_code, 'image_object': item['thumbnail'],
+                       'class_name': class_name, 'confidence': confidence,
+                       'quality_issues': item['quality'].issues if 'quality' in item else []}
+            elif 'quality' in item:
+                yield {'source_name': name, 'branch_code': branch_code, 'quality': item['quality']}
+            else:
+                yield {'source_name': name, 'branch_code': branch_code, 'error': item['error']}
+        del batch, decoded
+
+
+def open_zip(uploaded_file):
+    """
+    เปิดไฟล์ ZIP ที่อัปโหลด (zipfile อ่านเฉพาะส่วนที่ต้องใช้จาก file object จึงไม่ต้องแตกไฟล์ก่อน)
+    """
+    uploaded_file.seek(0)
+    return zipfile.ZipFile(uploaded_file)